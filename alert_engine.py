@@ -0,0 +1,279 @@
+"""
+Motor de alertas por reglas
+
+Las reglas son datos (ALERT_CONFIG['rules']) y cada una es una pequeña
+máquina de estados ok -> activa -> ok:
+
+- 'above' / 'below': umbral con histéresis (se activa al cruzar el umbral y
+  solo se limpia al retroceder `hysteresis` unidades),
+- 'change': variación respecto a la lectura más antigua de una ventana de
+  `window` segundos ('rise', 'fall' o 'both'),
+- 'stale': sin lecturas de la variable durante `timeout` segundos (se evalúa
+  en tick(), no por muestra).
+
+Cada lectura solo evalúa las reglas de su variable, en O(1) por regla: las
+ventanas de 'change' con la misma variable y duración comparten un único deque
+que se recorta por la izquierda (O(1) amortizado). Las notificaciones de
+activación respetan un enfriamiento por regla y se envían a sumideros
+intercambiables (log, tópico MQTT, LEDs).
+"""
+import json
+import threading
+from collections import deque
+
+import metrics
+from config import ALERT_CONFIG
+from logger_config import logger
+
+ALERTS_RAISED = metrics.counter('station_alerts_total', 'Alertas notificadas por regla y evento', ('rule', 'event'))
+ALERTS_ACTIVE = metrics.gauge('station_alerts_active', 'Reglas de alerta activas')
+
+class Alert:
+    """Transición de una regla: event es 'raise' o 'clear'"""
+    __slots__ = ('rule', 'event', 'severity', 'variable', 'value', 'timestamp', 'message', 'led')
+
+    def __init__(self, rule, event, value, timestamp, message):
+        self.rule = rule.name
+        self.event = event
+        self.severity = rule.severity
+        self.variable = rule.variable
+        self.value = value
+        self.timestamp = timestamp
+        self.message = message
+        self.led = rule.led
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class _Window:
+    """Lecturas (instante, valor) de los últimos `seconds` segundos de una variable"""
+    __slots__ = ('seconds', 'samples')
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.samples = deque()
+
+    def add(self, value, timestamp):
+        samples = self.samples
+        samples.append((timestamp, value))
+        cutoff = timestamp - self.seconds
+        while samples[0][0] < cutoff:
+            samples.popleft()
+
+    def oldest(self):
+        return self.samples[0][1]
+
+class Rule:
+    __slots__ = (
+        'name', 'kind', 'variable', 'threshold', 'hysteresis', 'cooldown', 'severity',
+        'message', 'clear_message', 'led', 'direction', 'timeout', 'window', 'sinks',
+        'active', 'notified', 'last_notified', 'last_seen'
+    )
+
+    def __init__(self, spec, now):
+        self.name = spec['name']
+        self.kind = spec['type']
+        self.variable = spec['variable']
+        self.threshold = spec.get('threshold')
+        self.hysteresis = spec.get('hysteresis', 0.0)
+        self.cooldown = spec.get('cooldown', ALERT_CONFIG['default_cooldown'])
+        self.severity = spec.get('severity', 'warning')
+        self.message = spec.get('message', f"Alerta {self.name}: {{value:.1f}}")
+        self.clear_message = spec.get('clear_message', f"Fin de alerta {self.name}")
+        self.led = spec.get('led')
+        self.direction = spec.get('direction', 'both')
+        self.timeout = spec.get('timeout')
+        self.window = None
+        self.sinks = spec.get('sinks')
+        self.active = False
+        self.notified = False
+        self.last_notified = float('-inf')
+        # Las reglas de inactividad cuentan desde el arranque
+        self.last_seen = now
+        if self.kind not in ('above', 'below', 'change', 'stale'):
+            raise ValueError(f"Tipo de regla desconocido en {self.name}: {self.kind}")
+
+    def evaluate(self, value, timestamp):
+        """Devuelve (nuevo estado activo, variación) para una lectura"""
+        kind = self.kind
+        if kind == 'above':
+            if self.active:
+                return value > self.threshold - self.hysteresis, None
+            return value >= self.threshold, None
+        if kind == 'below':
+            if self.active:
+                return value < self.threshold + self.hysteresis, None
+            return value <= self.threshold, None
+        if kind == 'change':
+            delta = value - self.window.oldest()
+            if self.direction == 'rise':
+                magnitude = delta
+            elif self.direction == 'fall':
+                magnitude = -delta
+            else:
+                magnitude = abs(delta)
+            if self.active:
+                return magnitude > self.threshold - self.hysteresis, delta
+            return magnitude >= self.threshold, delta
+        # 'stale': cualquier lectura la limpia
+        self.last_seen = timestamp
+        return False, None
+
+class AlertEngine:
+    def __init__(self, rules=None, now=0.0):
+        self._lock = threading.Lock()
+        self._rules = []
+        self._by_variable = {}
+        self._windows = {}
+        self._windows_by_variable = {}
+        self._stale = []
+        self._sinks = {}
+        self.samples = 0
+        for spec in rules if rules is not None else ALERT_CONFIG['rules']:
+            self.add_rule(spec, now)
+        ALERTS_ACTIVE.set_function(lambda: sum(rule.active for rule in self._rules))
+
+    # --- Configuración ----------------------------------------------------
+
+    def add_rule(self, spec, now=0.0):
+        """Registra una regla a partir de su especificación"""
+        rule = Rule(spec, now)
+        with self._lock:
+            if rule.kind == 'change':
+                key = (rule.variable, spec['window'])
+                window = self._windows.get(key)
+                if window is None:
+                    window = self._windows[key] = _Window(spec['window'])
+                    self._windows_by_variable.setdefault(rule.variable, []).append(window)
+                rule.window = window
+            self._rules.append(rule)
+            self._by_variable.setdefault(rule.variable, []).append(rule)
+            if rule.kind == 'stale':
+                self._stale.append(rule)
+        return rule
+
+    def add_sink(self, name, sink):
+        """Añade un sumidero con método emit(alert)"""
+        self._sinks[name] = sink
+
+    # --- Evaluación -------------------------------------------------------
+
+    def observe(self, variable, value, timestamp):
+        """Evalúa las reglas de una variable con una lectura nueva"""
+        rules = self._by_variable.get(variable)
+        if not rules:
+            return
+        alerts = []
+        with self._lock:
+            self.samples += 1
+            # Las ventanas compartidas se actualizan antes de evaluar las reglas que las usan
+            for window in self._windows_by_variable.get(variable, ()):
+                window.add(value, timestamp)
+            for rule in rules:
+                active, delta = rule.evaluate(value, timestamp)
+                if active != rule.active:
+                    alert = self._transition(rule, active, value, timestamp, delta)
+                    if alert:
+                        alerts.append((rule, alert))
+        self._emit(alerts)
+
+    def tick(self, now):
+        """Evalúa las reglas de inactividad"""
+        alerts = []
+        with self._lock:
+            for rule in self._stale:
+                active = now - rule.last_seen > rule.timeout
+                if active != rule.active:
+                    alert = self._transition(rule, active, now - rule.last_seen, now, None)
+                    if alert:
+                        alerts.append((rule, alert))
+        self._emit(alerts)
+
+    def _transition(self, rule, active, value, timestamp, delta):
+        """Cambia el estado de la regla y devuelve la alerta a notificar (o None por enfriamiento)"""
+        rule.active = active
+        if active:
+            # Dentro del enfriamiento la regla se activa sin avisar, y tampoco se avisará su fin
+            rule.notified = timestamp - rule.last_notified >= rule.cooldown
+            if not rule.notified:
+                return None
+            rule.last_notified = timestamp
+            message = rule.message.format(value=value, delta=delta or 0.0, threshold=rule.threshold)
+            return Alert(rule, 'raise', value, timestamp, message)
+        if not rule.notified:
+            return None
+        rule.notified = False
+        message = rule.clear_message.format(value=value, delta=delta or 0.0, threshold=rule.threshold)
+        return Alert(rule, 'clear', value, timestamp, message)
+
+    def _emit(self, alerts):
+        for rule, alert in alerts:
+            ALERTS_RAISED.labels(alert.rule, alert.event).inc()
+            for name, sink in self._sinks.items():
+                if rule.sinks is not None and name not in rule.sinks:
+                    continue
+                try:
+                    sink.emit(alert)
+                except Exception as e:
+                    logger.error(f"Error enviando alerta {alert.rule} a {name}: {e}")
+
+    def active(self):
+        """Nombres de las reglas activas"""
+        return [rule.name for rule in self._rules if rule.active]
+
+    def get_stats(self):
+        return {
+            'rules': len(self._rules),
+            'samples': self.samples,
+            'active': self.active()
+        }
+
+# --- Sumideros ----------------------------------------------------------------
+
+class LogSink:
+    """Escribe las alertas en el log (warning al activarse, info al limpiarse)"""
+
+    def emit(self, alert):
+        if alert.event == 'raise':
+            logger.warning(alert.message)
+        else:
+            logger.info(alert.message)
+
+class MqttSink:
+    """Publica cada transición como JSON en un tópico del broker local"""
+
+    def __init__(self, get_client, topic=None):
+        self._get_client = get_client
+        self.topic = topic or ALERT_CONFIG['mqtt_topic']
+
+    def emit(self, alert):
+        client = self._get_client()
+        if client is None:
+            return
+        client.publish(self.topic, json.dumps(alert.as_dict()), qos=1)
+
+class LedSink:
+    """Mantiene el color de la alerta activa más reciente con LED y lo notifica al cambiar"""
+
+    def __init__(self, on_change):
+        self._on_change = on_change
+        self._active = {}
+
+    def emit(self, alert):
+        if alert.led is None:
+            return
+        if alert.event == 'raise':
+            self._active[alert.rule] = tuple(alert.led)
+        else:
+            self._active.pop(alert.rule, None)
+        color = next(reversed(self._active.values()), None) if self._active else None
+        self._on_change(color)
+
+class CallbackSink:
+    """Adapta una función f(alert) a sumidero"""
+
+    def __init__(self, callback):
+        self._callback = callback
+
+    def emit(self, alert):
+        self._callback(alert)
@@ -0,0 +1,194 @@
+"""
+Benchmark de ingesta MQTT con muchos módulos exteriores
+
+Modo en proceso (por defecto): se llama a MqttIngest.on_message
+con mensajes falsos, sin broker, y se mide throughput y latencia por mensaje.
+Modo broker (--broker host:port): un publicador envía a un mosquitto local y
+la estación lo recibe por su cliente real.
+
+    python benchmarks/bench_mqtt_ingest.py --devices 200 --messages 100000
+    python benchmarks/bench_mqtt_ingest.py --broker localhost:1883 --rate 10000
+
+Con --write-capture se guardan los mensajes generados como captura MQTT
+(a --rate mensajes/s) para reproducirlos con replay_capture.py.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import MQTT_CONFIG, STORAGE_CONFIG, ROLLUP_CONFIG, TELEMETRY_CONFIG, CAPTURE_CONFIG
+from logger_config import logger
+
+MEASUREMENTS = ('temperatura', 'humedad', 'presion', 'estado')
+
+class FakeMessage:
+    __slots__ = ('topic', 'payload')
+
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+
+def make_messages(devices, count, primary_share):
+    """Genera mensajes mezclando el módulo principal con `devices` módulos adicionales"""
+    device_ids = [f"nodo{i:03d}" for i in range(devices)]
+    primary = MQTT_CONFIG['LOCAL_BROKER']['primary_device']
+    # Cada módulo sigue un paseo aleatorio suave para que pase el control de calidad
+    walks = {}
+    messages = []
+    for _ in range(count):
+        device = primary if random.random() < primary_share else random.choice(device_ids)
+        measurement = random.choice(MEASUREMENTS)
+        if measurement == 'estado':
+            messages.append(FakeMessage(f"estacion/{device}/{measurement}", b'online'))
+            continue
+        walk = walks.get(device)
+        if walk is None:
+            walk = walks[device] = {
+                'temperatura': random.uniform(-5, 35),
+                'humedad': random.uniform(20, 95),
+                'presion': random.uniform(990, 1030)
+            }
+        walk[measurement] += random.gauss(0, 0.05)
+        payload = f"{walk[measurement]:.2f}".encode()
+        messages.append(FakeMessage(f"estacion/{device}/{measurement}", payload))
+    return messages
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+def build_station(data_dir, mqtt_enabled=False, clock=None, backend=None):
+    """Construye una estación con hardware simulado y datos en `data_dir`"""
+    STORAGE_CONFIG['data_dir'] = os.path.join(data_dir, 'data')
+    ROLLUP_CONFIG['data_dir'] = os.path.join(data_dir, 'rollups')
+    TELEMETRY_CONFIG['spool_dir'] = os.path.join(data_dir, 'uplink')
+    # Un benchmark nunca envía a ThingsBoard: sin envío y, por si acaso, apuntando al broker local
+    TELEMETRY_CONFIG['enabled'] = False
+    MQTT_CONFIG['THINGSBOARD'] = {
+        **MQTT_CONFIG['THINGSBOARD'],
+        'host': MQTT_CONFIG['LOCAL_BROKER']['host'],
+        'port': MQTT_CONFIG['LOCAL_BROKER']['port']
+    }
+    from hardware_manager import HardwareManager
+    from hardware_simulator import SimBackend
+    from main import WeatherStation
+    hardware = HardwareManager(backend or SimBackend(clock=clock), clock=clock)
+    return WeatherStation(hardware=hardware, mqtt_enabled=mqtt_enabled, clock=clock)
+
+def run_in_process(station, messages):
+    callback = station.ingest.on_message
+    clock = time.perf_counter_ns
+    latencies = []
+    start = clock()
+    for msg in messages:
+        t0 = clock()
+        callback(None, None, msg)
+        latencies.append(clock() - t0)
+    elapsed = (clock() - start) / 1e9
+    latencies.sort()
+    return {
+        'mode': 'in-process',
+        'messages': len(messages),
+        'devices': len(station.devices),
+        'elapsed_s': elapsed,
+        'msgs_per_s': len(messages) / elapsed,
+        'latency_us': {
+            'p50': percentile(latencies, 0.50) / 1000,
+            'p95': percentile(latencies, 0.95) / 1000,
+            'p99': percentile(latencies, 0.99) / 1000,
+            'max': latencies[-1] / 1000
+        }
+    }
+
+def run_with_broker(station, messages, host, port, rate):
+    import paho.mqtt.client as mqtt
+
+    publisher = mqtt.Client()
+    publisher.connect(host, port, 60)
+    publisher.loop_start()
+    time.sleep(1.0)
+
+    received_before = sum(station.devices.messages[:len(station.devices)])
+    interval = 1.0 / rate if rate else 0.0
+    start = time.perf_counter()
+    for i, msg in enumerate(messages):
+        publisher.publish(msg.topic, msg.payload)
+        if interval:
+            delay = start + (i + 1) * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    publish_elapsed = time.perf_counter() - start
+
+    # Esperar a que la estación procese lo publicado
+    deadline = time.perf_counter() + 10
+    received = 0
+    while time.perf_counter() < deadline:
+        received = sum(station.devices.messages[:len(station.devices)]) - received_before
+        if received >= len(messages):
+            break
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    publisher.loop_stop()
+    publisher.disconnect()
+    return {
+        'mode': 'broker',
+        'messages': len(messages),
+        'received': received,
+        'devices': len(station.devices),
+        'publish_rate': len(messages) / publish_elapsed,
+        'msgs_per_s': received / elapsed
+    }
+
+def write_capture(path, messages, rate):
+    from mqtt_capture import MqttCapture
+    capture = MqttCapture(path, {**CAPTURE_CONFIG, 'max_bytes': float('inf')})
+    start = time.time()
+    for i, msg in enumerate(messages):
+        capture.record(msg.topic, msg.payload, start + i / rate)
+    capture.close()
+    print(f"capture: {path} {capture.get_stats()}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--devices', type=int, default=200)
+    parser.add_argument('--messages', type=int, default=100000)
+    parser.add_argument('--primary-share', type=float, default=0.05,
+                        help='fracción de mensajes del módulo principal')
+    parser.add_argument('--broker', help='host:port de un mosquitto local')
+    parser.add_argument('--rate', type=int, default=10000, help='mensajes/s a publicar en modo broker')
+    parser.add_argument('--write-capture', metavar='PATH',
+                        help='guarda los mensajes como captura MQTT en lugar de medir')
+    parser.add_argument('--with-logging', action='store_true',
+                        help='activa el log DEBUG por mensaje (pasa por la cola y el límite de ritmo)')
+    args = parser.parse_args()
+
+    logger.setLevel('DEBUG' if args.with_logging else 'WARNING')
+
+    random.seed(1234)
+    messages = make_messages(args.devices, args.messages, args.primary_share)
+    if args.write_capture:
+        write_capture(args.write_capture, messages, args.rate)
+        return
+    with tempfile.TemporaryDirectory() as data_dir:
+        if args.broker:
+            host, port = args.broker.split(':')
+            MQTT_CONFIG['LOCAL_BROKER']['host'] = host
+            MQTT_CONFIG['LOCAL_BROKER']['port'] = int(port)
+            station = build_station(data_dir, mqtt_enabled=True)
+            result = run_with_broker(station, messages, host, int(port), args.rate)
+        else:
+            station = build_station(data_dir)
+            result = run_in_process(station, messages)
+        station.ingest.stop()
+        station.storage.close()
+        station.hardware.close()
+
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Simulación sin pantalla de la estación completa, más rápida que el tiempo real
+
+Ejecuta el bucle real del planificador con un reloj virtual y hardware
+simulado. Un módulo exterior sintético publica cada --exterior-interval
+segundos y el botón se pulsa cada --click-every segundos. Al terminar se
+guardan PNG de las dos páginas si se indica --png.
+
+    python benchmarks/bench_station_sim.py --hours 24
+    python benchmarks/bench_station_sim.py --hours 1 --speed 60 --png /tmp/frames
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_mqtt_ingest import FakeMessage, build_station
+from clock import SimulatedClock
+from config import MQTT_CONFIG
+from hardware_simulator import SimBackend
+from logger_config import logger
+
+def exterior_feeder(station, clock):
+    """Publica temperatura, humedad y presión del módulo exterior siguiendo un ciclo diario"""
+    prefix = f"estacion/{MQTT_CONFIG['LOCAL_BROKER']['primary_device']}"
+    callback = station.ingest.on_message
+
+    def publish():
+        phase = 2 * math.pi * (clock.time() % 86400) / 86400
+        temp = 15.0 + 10.0 * math.sin(phase - math.pi / 2) + random.gauss(0, 0.2)
+        callback(None, None, FakeMessage(f"{prefix}/temperatura", f"{temp:.2f}".encode()))
+        callback(None, None, FakeMessage(f"{prefix}/humedad", f"{60 - temp:.1f}".encode()))
+        callback(None, None, FakeMessage(f"{prefix}/presion", f"{1013 + random.gauss(0, 0.1):.1f}".encode()))
+    return publish
+
+def save_pages(station, backend, png_dir):
+    """Dibuja ambas páginas de forma síncrona y las guarda como PNG"""
+    os.makedirs(png_dir, exist_ok=True)
+    hardware = station.hardware
+    state = station.data_store
+    status, status_color = hardware.get_weather_status_description(state.exterior_temp)
+    now = station.clock.time()
+    hardware.renderer.render_main(state, status, status_color, list(state.temp_history), now)
+    backend.tft.save_png(os.path.join(png_dir, 'main.png'))
+    hardware.renderer.render_stats(station.stats_data, station._get_system_info(), now)
+    backend.tft.save_png(os.path.join(png_dir, 'stats.png'))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hours', type=float, default=24.0, help='horas simuladas')
+    parser.add_argument('--speed', type=float, default=None, help='límite de velocidad (x tiempo real)')
+    parser.add_argument('--exterior-interval', type=float, default=10.0)
+    parser.add_argument('--click-every', type=float, default=600.0)
+    parser.add_argument('--png', help='directorio donde guardar las páginas finales')
+    parser.add_argument('--with-logging', action='store_true')
+    args = parser.parse_args()
+
+    if not args.with_logging:
+        logger.setLevel('WARNING')
+
+    random.seed(1234)
+    duration = args.hours * 3600
+    clock = SimulatedClock(speed=args.speed)
+    backend = SimBackend(clock=clock)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        station = build_station(data_dir, clock=clock, backend=backend)
+        scheduler = station.scheduler
+        scheduler.add_task('sim_exterior', args.exterior_interval, exterior_feeder(station, clock))
+        scheduler.add_task('sim_button', args.click_every, backend.button.click, delay=args.click_every)
+        scheduler.add_task('sim_stop', duration, scheduler.stop, delay=duration)
+
+        start = time.perf_counter()
+        station.run()
+        elapsed = time.perf_counter() - start
+
+        if args.png:
+            save_pages(station, backend, args.png)
+
+    worker = station.hardware.display_worker
+    tasks = station.get_scheduler_stats()
+    print(f"simulated_s: {duration:.0f}")
+    print(f"wall_s: {elapsed:.3f}")
+    print(f"speedup: {duration / elapsed:.0f}x")
+    print(f"task_runs: { {name: stats['runs'] for name, stats in tasks.items()} }")
+    print(f"frames: submitted={worker.submitted} rendered={worker.rendered} dropped={worker.dropped}")
+    print(f"tft: blocks={backend.tft.blocks} bytes={backend.tft.bytes}")
+    print(f"leds: shows={backend.neopixels.shows} last={backend.neopixels.frames[-1] if backend.neopixels.frames else None}")
+    print(f"sensor_reads: {backend.bmp280.reads}")
+    print(f"stats: {station.stats_data}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Reproducción de una captura MQTT (mqtt_capture) sin broker
+
+La captura se proyecta con mmap y cada mensaje se entrega a
+MqttIngest.on_message con un reloj simulado que se adelanta al
+instante en que se recibió, así que el control de calidad, las alertas y las
+estadísticas ven la misma secuencia temporal que en producción. Con --speed N
+se respeta el ritmo original acelerado N veces (1 = tiempo real) y se mide
+también el retraso respecto al instante previsto; --speed max entrega todo
+lo más rápido posible.
+
+    python benchmarks/replay_capture.py /home/pi/weather_station/data/mqtt-capture.bin
+    python benchmarks/replay_capture.py captura.bin --speed 60 --limit 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_mqtt_ingest import FakeMessage, build_station, percentile
+from clock import SimulatedClock
+from logger_config import logger
+from mqtt_capture import CaptureReader
+
+def replay(station, clock, reader, speed=None, limit=None):
+    callback = station.ingest.on_message
+    perf = time.perf_counter_ns
+    latencies = []
+    lags = []
+    first = last = None
+    count = 0
+    start = perf()
+    for timestamp, topic, payload in reader:
+        if limit and count >= limit:
+            break
+        if first is None:
+            first = timestamp
+        if speed:
+            # Instante previsto en tiempo real según el ritmo original
+            target = start + (timestamp - first) / speed * 1e9
+            delay = target - perf()
+            if delay > 0:
+                time.sleep(delay / 1e9)
+            lags.append(max(perf() - target, 0))
+        last = timestamp
+        clock.advance(timestamp - clock.time())
+        t0 = perf()
+        callback(None, None, FakeMessage(topic, payload))
+        latencies.append(perf() - t0)
+        count += 1
+    elapsed = (perf() - start) / 1e9
+    if not count:
+        return {'messages': 0}
+
+    latencies.sort()
+    span = last - first
+    result = {
+        'messages': count,
+        'topics': len(reader.topics),
+        'devices': len(station.devices),
+        'capture_span_s': span,
+        'elapsed_s': elapsed,
+        'msgs_per_s': count / elapsed,
+        'speedup': span / elapsed if elapsed else None,
+        'latency_us': {
+            'p50': percentile(latencies, 0.50) / 1000,
+            'p95': percentile(latencies, 0.95) / 1000,
+            'p99': percentile(latencies, 0.99) / 1000,
+            'max': latencies[-1] / 1000
+        },
+        'quality': {key: value for key, value in station.get_quality_stats().items() if key != 'recent_rejected'},
+        'alerts': station.get_alert_stats()
+    }
+    if lags:
+        lags.sort()
+        result['lag_ms'] = {'p50': percentile(lags, 0.50) / 1e6, 'p99': percentile(lags, 0.99) / 1e6,
+                            'max': lags[-1] / 1e6}
+    return result
+
+def parse_speed(value):
+    if value == 'max':
+        return None
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("la velocidad debe ser positiva o 'max'")
+    return speed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('capture', help='fichero de captura (CAPTURE_CONFIG[\'path\'])')
+    parser.add_argument('--speed', type=parse_speed, default=None,
+                        help="factor de aceleración respecto al ritmo original o 'max' (por defecto)")
+    parser.add_argument('--limit', type=int, help='reproducir solo los primeros N mensajes')
+    args = parser.parse_args()
+
+    logger.setLevel('WARNING')
+
+    with CaptureReader(args.capture) as reader, tempfile.TemporaryDirectory() as data_dir:
+        span = reader.time_span()
+        if span is None:
+            print("captura vacía")
+            return
+        clock = SimulatedClock(start=span[0])
+        station = build_station(data_dir, clock=clock)
+        try:
+            result = replay(station, clock, reader, args.speed, args.limit)
+        finally:
+            station.storage.close()
+            station.hardware.close()
+
+    for key, value in result.items():
+        print(f"{key}: {value}")
+
+if __name__ == '__main__':
+    main()
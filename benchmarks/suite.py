@@ -0,0 +1,673 @@
+"""
+Suite de benchmarks de los caminos críticos de la estación
+
+Mide ingesta MQTT, estadísticas e historial a 1k/100k/10M muestras, LEDs y
+clasificación, un fotograma completo y parcial del dashboard y la lectura de
+información del sistema. Usa el backend simulado, así que los mismos scripts
+funcionan en CI x86 y en la Raspberry Pi.
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --save-baseline            # guarda baselines/<arquitectura>.json
+    python benchmarks/suite.py --baseline auto            # compara y falla si algo empeora
+    python benchmarks/suite.py --quick --filter 'stats|render'
+
+La comparación usa la mediana por operación; un caso es una regresión si
+supera a la línea base en más de --threshold (25 % por defecto) y el proceso
+termina con código 1. Si se pide --baseline y el fichero no existe también
+termina con código 1 (antes de medir nada), salvo con --allow-missing-baseline.
+
+baselines/x86_64.json es la referencia del CI: se genera en el runner con
+--save-baseline y se vuelve a guardar cuando un cambio empeora un caso a
+propósito. Las medidas solo son comparables en la misma clase de máquina;
+la Raspberry Pi guarda la suya como baselines/aarch64.json o armv7l.json.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from bench_mqtt_ingest import make_messages, build_station, percentile
+from logger_config import CONSOLE_FORMAT, logger, pipeline
+
+SIZES = (1_000, 100_000, 10_000_000)
+QUICK_SIZES = (1_000, 100_000)
+BASELINE_DIR = os.path.join(BENCH_DIR, 'baselines')
+
+CASES = []
+
+def case(name, sized=False):
+    """
+    Registra un caso. La función recibe el contexto (y el tamaño si `sized`) y
+    devuelve (función_a_medir, operaciones_por_llamada[, métricas_extra]).
+    """
+    def register(setup):
+        CASES.append((name, sized, setup))
+        return setup
+    return register
+
+class Context:
+    """Estación simulada y datos compartidos entre casos"""
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self._station = None
+        self.rings = []
+
+    def ring(self, capacity):
+        """Anillo en memoria compartida que se elimina al terminar la suite"""
+        from shm_ring import SampleRing
+        ring = SampleRing.create(f"estacion-bench-{os.getpid()}-{len(self.rings)}", capacity)
+        self.rings.append(ring)
+        return ring
+
+    @property
+    def station(self):
+        if self._station is None:
+            self._station = build_station(self.data_dir)
+        return self._station
+
+    def close(self):
+        if self._station:
+            self._station.storage.close()
+            self._station.hardware.close()
+        for ring in self.rings:
+            ring.close()
+            ring.unlink()
+
+def synthetic_series(n, span=86000.0, end=None):
+    """Serie de temperatura con ciclo diario y ruido, ordenada por tiempo"""
+    end = end if end is not None else time.time()
+    rng = np.random.default_rng(n)
+    timestamps = np.linspace(end - span, end, n)
+    values = 15.0 + 10.0 * np.sin(2 * np.pi * timestamps / 86400) + rng.normal(0, 0.3, n)
+    return timestamps, values
+
+# --- Casos -----------------------------------------------------------------
+
+@case('mqtt_ingest')
+def bench_mqtt_ingest(ctx):
+    station = ctx.station
+    random.seed(1234)
+    messages = make_messages(200, 5000, 0.05)
+    callback = station.ingest.on_message
+
+    def run():
+        for msg in messages:
+            callback(None, None, msg)
+
+    def latency():
+        clock = time.perf_counter_ns
+        samples = []
+        for msg in messages:
+            t0 = clock()
+            callback(None, None, msg)
+            samples.append(clock() - t0)
+        samples.sort()
+        return {'p50_us': percentile(samples, 0.50) / 1000, 'p99_us': percentile(samples, 0.99) / 1000}
+    return run, len(messages), latency
+
+@case('mqtt_ingest_logged')
+def bench_mqtt_ingest_logged(ctx):
+    """Igual que mqtt_ingest con el log DEBUG por mensaje activo, escrito a /dev/null"""
+    run, ops, latency = bench_mqtt_ingest(ctx)
+    devnull = logging.StreamHandler(open(os.devnull, 'w'))
+    devnull.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+
+    def logged(func):
+        def wrapper():
+            level, sinks = logger.level, pipeline.listener.handlers
+            logger.setLevel('DEBUG')
+            pipeline.set_sinks(devnull)
+            try:
+                return func()
+            finally:
+                logger.setLevel(level)
+                pipeline.set_sinks(*sinks)
+        return wrapper
+    return logged(run), ops, logged(latency)
+
+@case('capture_record')
+def bench_capture_record(ctx):
+    """Coste añadido en el callback MQTT con la captura activa (volcado incluido)"""
+    from mqtt_capture import MqttCapture
+    random.seed(1234)
+    messages = make_messages(200, 5000, 0.05)
+    capture = MqttCapture(os.path.join(tempfile.mkdtemp(dir=ctx.data_dir), 'capture.bin'),
+                          {'flush_bytes': 65536, 'flush_interval': 10, 'max_bytes': float('inf')})
+    now = time.time()
+
+    def run():
+        for msg in messages:
+            capture.record(msg.topic, msg.payload, now)
+    return run, len(messages)
+
+@case('capture_replay_read', sized=True)
+def bench_capture_replay_read(ctx, n):
+    """Recorrer una captura proyectada con mmap (sin ingesta)"""
+    from mqtt_capture import MqttCapture, CaptureReader
+    random.seed(1234)
+    messages = make_messages(200, min(n, 100_000), 0.05)
+    path = os.path.join(tempfile.mkdtemp(dir=ctx.data_dir), 'capture.bin')
+    capture = MqttCapture(path, {'flush_bytes': 1 << 20, 'flush_interval': 10, 'max_bytes': float('inf')})
+    for i in range(n):
+        msg = messages[i % len(messages)]
+        capture.record(msg.topic, msg.payload, float(i))
+    capture.close()
+    reader = CaptureReader(path)
+
+    def run():
+        for _ in reader:
+            pass
+    return run, n
+
+@case('shm_ring_write')
+def bench_shm_ring_write(ctx):
+    """Coste por lectura de la ingesta en el modo multiproceso"""
+    ring = ctx.ring(65536)
+    now = time.time()
+
+    def run():
+        for i in range(10_000):
+            ring.write(1, 20.0, now + i)
+    return run, 10_000
+
+@case('shm_ring_read')
+def bench_shm_ring_read(ctx):
+    """Escritura de 4096 registros y lectura en un lote con validación de secuencia"""
+    ring = ctx.ring(8192)
+    reader = ring.reader(0)
+    now = time.time()
+
+    def run():
+        for i in range(4096):
+            ring.write(1, 20.0, now + i)
+        reader.read()
+    return run, 4096
+
+@case('calculate_stats', sized=True)
+def bench_calculate_stats(ctx, n):
+    from rolling_stats import RollingStatsEngine
+    storage = ctx.station.storage
+    # Una sola ventana del día para que 10M muestras quepan en memoria
+    storage.stats = RollingStatsEngine(['exterior_temp'], {'24h': 86400})
+    timestamps, values = synthetic_series(n)
+    storage.stats.load('exterior_temp', timestamps, values)
+    return storage.calculate_stats, 1
+
+@case('stats_load', sized=True)
+def bench_stats_load(ctx, n):
+    from rolling_stats import WindowedStats
+    timestamps, values = synthetic_series(n)
+    stats = WindowedStats(86400)
+    return (lambda: stats.load(timestamps, values)), n
+
+@case('stats_add', sized=True)
+def bench_stats_add(ctx, n):
+    from rolling_stats import WindowedStats
+    timestamps, values = synthetic_series(n)
+    stats = WindowedStats(86400)
+    stats.load(timestamps, values)
+    # Cada muestra nueva también expulsa la más antigua de la ventana
+    step = timestamps[1] - timestamps[0] if n > 1 else 1.0
+    state = {'t': timestamps[-1]}
+    new_values = values[:1000].tolist()
+
+    def run():
+        t = state['t']
+        for value in new_values:
+            t += step
+            stats.add(t, value)
+        state['t'] = t
+    return run, len(new_values)
+
+@case('store_read_range', sized=True)
+def bench_store_read_range(ctx, n):
+    from timeseries_store import TimeSeriesStore, RECORD_DTYPE, RECORD_MARKER
+    data_dir = tempfile.mkdtemp(dir=ctx.data_dir)
+    store = TimeSeriesStore(data_dir=data_dir)
+    end = time.time()
+    timestamps, values = synthetic_series(n, span=3600.0, end=end)
+    records = np.empty(n, dtype=RECORD_DTYPE)
+    records['ts'] = timestamps
+    records['value'] = values
+    records['var'] = 1
+    records['marker'] = RECORD_MARKER
+    # Mismo formato que escribe el almacén; se genera de golpe para no tardar minutos
+    records.tofile(store._segment_path(store._day_key(end)))
+    return (lambda: store.read_range(end - 3600, end)), n
+
+@case('history_chart', sized=True)
+def bench_history_chart(ctx, n):
+    renderer = ctx.station.hardware.renderer
+    timestamps, values = synthetic_series(n)
+    history = list(zip(timestamps.tolist(), values.tolist()))
+
+    def run():
+        renderer._history_cache = None
+        renderer._history_block(history)
+    return run, 1
+
+@case('classify_array', sized=True)
+def bench_classify_array(ctx, n):
+    from climate_bands import classifier
+    _, values = synthetic_series(n)
+    return (lambda: classifier.colors565(values)), n
+
+@case('classify_scalar')
+def bench_classify_scalar(ctx):
+    from climate_bands import classifier
+    values = np.linspace(-15, 45, 1000).tolist()
+
+    def run():
+        classify = classifier.classify
+        for value in values:
+            classify(value)
+    return run, len(values)
+
+@case('quality_check')
+def bench_quality_check(ctx):
+    from data_quality import DataQuality
+    quality = DataQuality()
+    timestamps, values = synthetic_series(1000)
+    samples = list(zip(timestamps.tolist(), values.tolist()))
+
+    def run():
+        check = quality.check
+        for timestamp, value in samples:
+            check('exterior_temp', value, timestamp)
+    return run, len(samples)
+
+@case('quality_clean_bulk', sized=True)
+def bench_quality_clean_bulk(ctx, n):
+    from data_quality import DataQuality
+    quality = DataQuality()
+    timestamps, values = synthetic_series(n)
+    return (lambda: quality.clean_bulk('exterior_temp', timestamps, values)), n
+
+def alert_rules(count):
+    """`count` reglas sobre la temperatura exterior: umbrales y variaciones con 10 ventanas distintas"""
+    rules = []
+    for i in range(count):
+        kind = ('above', 'below', 'change')[i % 3]
+        rule = {'name': f"r{i}", 'type': kind, 'variable': 'exterior_temp', 'hysteresis': 0.5}
+        if kind == 'change':
+            rule.update(window=600 * (1 + i % 10), threshold=2.0 + i % 5)
+        else:
+            rule['threshold'] = -10.0 + (i % 50)
+        rules.append(rule)
+    return rules
+
+def bench_alerts(count):
+    from alert_engine import AlertEngine
+    timestamps, values = synthetic_series(5000)
+    engine = AlertEngine(alert_rules(count) if count else None, now=timestamps[0])
+    samples = list(zip(timestamps.tolist(), values.tolist()))
+    state = {'offset': 0.0}
+
+    def run():
+        observe = engine.observe
+        offset = state['offset']
+        for timestamp, value in samples:
+            observe('exterior_temp', value, timestamp + offset)
+        state['offset'] = offset + 86400
+    return run, len(samples)
+
+@case('alert_observe_default')
+def bench_alert_default(ctx):
+    return bench_alerts(0)
+
+@case('alert_observe_300_rules')
+def bench_alert_300(ctx):
+    return bench_alerts(300)
+
+@case('button_event_latency')
+def bench_button_latency(ctx):
+    """Desde el flanco de soltar un botón simulado hasta que el bucle del planificador atiende el evento"""
+    from button_input import ButtonInput
+    from hardware_simulator import VirtualButton
+    from scheduler import Scheduler
+    scheduler = Scheduler()
+    handled = threading.Event()
+    latencies = []
+    buttons = ButtonInput()
+    clock = time.perf_counter
+    state = {'edge_time': 0.0, 'sent': 0.0}
+
+    def handle():
+        for event in buttons.drain():
+            if event.kind == 'press':
+                latencies.append(clock() - state['sent'])
+                handled.set()
+
+    buttons.on_event = lambda: scheduler.call_soon(handle)
+    button = VirtualButton()
+    buttons.attach(button, scheduler.time_source)
+    threading.Thread(target=scheduler.run_forever, name='bench-scheduler', daemon=True).start()
+
+    def run():
+        # Instantes de flanco virtuales separados 1 s: sin rebotes ni dobles pulsaciones
+        handled.clear()
+        edge_time = state['edge_time'] = state['edge_time'] + 1.0
+        button.press(edge_time)
+        state['sent'] = clock()
+        button.release(edge_time + 0.1)
+        handled.wait(1.0)
+
+    def latency():
+        samples = sorted(latencies[-1000:])
+        return {'p50_us': percentile(samples, 0.50) * 1e6, 'p99_us': percentile(samples, 0.99) * 1e6}
+    return run, 1, latency
+
+@case('rollup_query_30d')
+def bench_rollup_query(ctx):
+    from rollup_index import RollupIndex
+    rollups = RollupIndex(['exterior_temp'], data_dir=tempfile.mkdtemp(dir=ctx.data_dir))
+    end = time.time()
+    for level in rollups._levels['exterior_temp']:
+        # Anillo lleno de intervalos válidos sin pasar muestra a muestra
+        buckets = np.arange(int(end // level.resolution) - level.capacity + 1, int(end // level.resolution) + 1)
+        slots = buckets % level.capacity
+        level.bucket[slots] = buckets
+        level.count[slots] = 6
+        level.min[slots] = 10.0
+        level.max[slots] = 20.0
+        level.sum[slots] = 90.0
+    # Inicio desalineado para recorrer minutos, horas y días
+    start = end - 30 * 86400 + 1234
+    return (lambda: rollups.query('exterior_temp', start, end)), 1
+
+@case('update_leds')
+def bench_update_leds(ctx):
+    hardware = ctx.station.hardware
+    now = time.time()
+    temps = np.linspace(-10, 40, 100).tolist()
+
+    def run():
+        for temp in temps:
+            hardware.update_leds(21.0, temp, True, now)
+    return run, len(temps)
+
+def led_animator(patterns):
+    from hardware_simulator import VirtualNeoPixels
+    from led_animator import LedAnimator
+    strip = VirtualNeoPixels()
+    animator = LedAnimator(lambda: strip, len(patterns))
+    for index, pattern in enumerate(patterns):
+        animator.set_pattern(index, pattern, now=0.0)
+    return animator, strip
+
+@case('led_animator_hour')
+def bench_led_animator_hour(ctx):
+    """Una hora de destellos de alerta y parpadeo de banda, saltando de cambio en cambio como el hilo"""
+    from climate_bands import classifier
+    animator, strip = led_animator([{'kind': 'flash', 'color': (255, 0, 0)}, classifier.bands[0].led_pattern()])
+    min_wait = 1.0 / animator.fps
+    state = {'wakeups': 0}
+
+    def run():
+        now, wakeups = 0.0, 0
+        while now < 3600.0:
+            now += max(animator.step(now), min_wait)
+            wakeups += 1
+        state['wakeups'] = wakeups
+
+    def stats():
+        return {'wakeups_per_s': state['wakeups'] / 3600.0, 'shows': strip.shows, 'skipped': animator.skipped}
+    return run, 1, stats
+
+@case('led_animator_breathe_frame')
+def bench_led_animator_breathe(ctx):
+    animator, strip = led_animator([{'kind': 'breathe', 'color': (0, 255, 0)}, {'kind': 'solid', 'color': (0, 0, 255)}])
+    times = [i / animator.fps for i in range(animator.fps * 4)]
+
+    def run():
+        for now in times:
+            animator.step(now)
+    return run, len(times)
+
+class _FakeTransport:
+    def get_write_buffer_size(self):
+        return 0
+
+class _FakeWriter:
+    """Cliente WebSocket que descarta lo recibido"""
+    transport = _FakeTransport()
+
+    def write(self, data):
+        pass
+
+@case('live_api_snapshot')
+def bench_live_snapshot(ctx):
+    """Reconstruir y codificar la instantánea tras cada cambio de estado"""
+    station = ctx.station
+    api = station.live_api
+
+    def run():
+        station.state.publish(exterior_temp=20.0 + random.random())
+        api.current()
+    return run, 1
+
+@case('live_api_push_100_clients')
+def bench_live_push(ctx):
+    """Un delta a 100 clientes: se calcula y codifica una vez, se escribe 100 veces"""
+    station = ctx.station
+    api = station.live_api
+    api._clients = {_FakeWriter() for _ in range(100)}
+    api._pushed = api.current().payload
+    api._pushed_history = float('inf')
+
+    def run():
+        station.state.publish(exterior_temp=20.0 + random.random())
+        api._push()
+    return run, 1
+
+@case('render_main_full')
+def bench_render_full(ctx):
+    station = ctx.station
+    renderer = station.hardware.renderer
+    state = station.data_store
+    history = list(state.temp_history)
+
+    def run():
+        renderer.invalidate()
+        renderer.render_main(state, 'OPTIMO', (0, 255, 0), history)
+    return run, 1
+
+@case('render_main_partial')
+def bench_render_partial(ctx):
+    station = ctx.station
+    renderer = station.hardware.renderer
+    base = station.data_store
+    history = list(base.temp_history)
+    # Dos estados que solo difieren en la temperatura exterior
+    states = [base.evolve(base.seq + i + 1, {'exterior_temp': 20.0 + i / 10}) for i in range(2)]
+    counter = {'i': 0}
+
+    def run():
+        counter['i'] ^= 1
+        renderer.render_main(states[counter['i']], 'OPTIMO', (0, 255, 0), history)
+    return run, 1
+
+@case('system_info')
+def bench_system_info(ctx):
+    return ctx.station._get_system_info, 1
+
+# --- Medición --------------------------------------------------------------
+
+def measure(func, ops, repeat, min_time, budget):
+    """Devuelve tiempos por operación (s) de cada repetición, calibrando llamadas por repetición"""
+    start = time.perf_counter()
+    func()
+    single = time.perf_counter() - start
+    number = max(1, int(min_time / single)) if single > 0 else 1000
+    repeat = max(1, min(repeat, int(budget / max(single * number, 1e-9))))
+
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - t0) / (number * ops))
+    return samples, number
+
+def run_case(ctx, name, setup, size, args):
+    label = f"{name}[{size}]" if size is not None else name
+    try:
+        spec = setup(ctx, size) if size is not None else setup(ctx)
+        func, ops = spec[0], spec[1]
+        samples, number = measure(func, ops, args.repeat, args.min_time, args.budget)
+        samples.sort()
+        result = {
+            'median_us': samples[len(samples) // 2] * 1e6,
+            'min_us': samples[0] * 1e6,
+            'max_us': samples[-1] * 1e6,
+            'ops_per_s': 1.0 / samples[len(samples) // 2] if samples[len(samples) // 2] else math.inf,
+            'repeat': len(samples),
+            'number': number,
+            'ops': ops
+        }
+        if len(spec) > 2:
+            result.update(spec[2]())
+    except MemoryError:
+        result = {'error': 'MemoryError'}
+    except Exception as e:
+        result = {'error': f"{type(e).__name__}: {e}"}
+    return label, result
+
+def machine_info():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'cpus': os.cpu_count(),
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+def compare(results, baseline, threshold):
+    """Compara medianas con la línea base; devuelve la lista de regresiones"""
+    regressions = []
+    for label, result in results.items():
+        base = baseline.get('results', {}).get(label)
+        if not base or 'median_us' not in base or 'median_us' not in result:
+            continue
+        ratio = result['median_us'] / base['median_us'] if base['median_us'] else 1.0
+        result['baseline_median_us'] = base['median_us']
+        result['ratio'] = ratio
+        if ratio > 1.0 + threshold:
+            regressions.append((label, ratio))
+    return regressions
+
+def print_table(results):
+    print(f"{'caso':<32} {'mediana':>12} {'mín':>12} {'ops/s':>14} {'vs base':>9}")
+    for label, result in results.items():
+        if 'error' in result:
+            print(f"{label:<32} ERROR {result['error']}")
+            continue
+        ratio = f"{result['ratio']:.2f}x" if 'ratio' in result else '-'
+        print(
+            f"{label:<32} {result['median_us']:>10.2f}us {result['min_us']:>10.2f}us "
+            f"{result['ops_per_s']:>14.0f} {ratio:>9}"
+        )
+
+def baseline_path(path):
+    if path == 'auto':
+        return os.path.join(BASELINE_DIR, f"{platform.machine()}.json")
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', help='fichero JSON con los resultados')
+    parser.add_argument('--baseline', help="JSON de referencia ('auto' = baselines/<arquitectura>.json)")
+    parser.add_argument('--allow-missing-baseline', action='store_true', help='no falla si no existe la línea base')
+    parser.add_argument('--save-baseline', nargs='?', const='auto', help='guarda los resultados como línea base')
+    parser.add_argument('--threshold', type=float, default=0.25, help='empeoramiento tolerado (0.25 = 25 %%)')
+    parser.add_argument('--filter', help='expresión regular sobre el nombre del caso')
+    parser.add_argument('--quick', action='store_true', help='sin el tamaño de 10M (Pi con poca RAM)')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--min-time', type=float, default=0.05, help='segundos mínimos por repetición')
+    parser.add_argument('--budget', type=float, default=10.0, help='segundos máximos por caso')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        path = baseline_path(args.baseline)
+        if os.path.exists(path):
+            with open(path) as f:
+                baseline = json.load(f)
+        elif args.allow_missing_baseline:
+            print(f"Sin línea base en {path}, no se compara", file=sys.stderr)
+        else:
+            # Un CI sin referencia no puede detectar regresiones: mejor fallar que pasar en verde
+            print(f"❌ No existe la línea base {path} (genérala con --save-baseline)", file=sys.stderr)
+            sys.exit(1)
+
+    logger.setLevel('WARNING')
+    sizes = QUICK_SIZES if args.quick else SIZES
+    pattern = re.compile(args.filter) if args.filter else None
+
+    results = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        ctx = Context(data_dir)
+        try:
+            for name, sized, setup in CASES:
+                if pattern and not pattern.search(name):
+                    continue
+                for size in (sizes if sized else (None,)):
+                    label, result = run_case(ctx, name, setup, size, args)
+                    results[label] = result
+                    print(f"  {label}: {result.get('median_us', result.get('error'))}", file=sys.stderr)
+        finally:
+            ctx.close()
+
+    report = {'meta': machine_info(), 'results': results}
+    regressions = []
+    if baseline is not None:
+        report['baseline'] = {'path': baseline_path(args.baseline), 'meta': baseline.get('meta')}
+        regressions = compare(results, baseline, args.threshold)
+
+    print_table(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        path = baseline_path(args.save_baseline)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Línea base guardada en {path}")
+
+    errors = [label for label, result in results.items() if 'error' in result]
+    if regressions:
+        for label, ratio in regressions:
+            print(f"❌ REGRESIÓN {label}: {ratio:.2f}x más lento que la línea base", file=sys.stderr)
+    if errors:
+        print(f"❌ Casos con error: {', '.join(errors)}", file=sys.stderr)
+    if regressions or errors:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
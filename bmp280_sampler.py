@@ -0,0 +1,248 @@
+"""
+Adquisición del BMP280 interior en segundo plano
+
+El sensor se configura una vez con un perfil de sobremuestreo, filtro IIR y
+tiempo de reposo (BMP280_CONFIG['profiles']). Cada lectura es una sola ráfaga
+I2C de los seis registros de presión y temperatura (0xF7-0xFC) compensada en
+Python, y la altitud se deriva de esa presión sin más tráfico en el bus.
+
+Un hilo propio muestrea cada BMP280_CONFIG['sample_interval'] segundos, con
+reintentos y espera exponencial ante errores de bus, y acumula las lecturas;
+el bucle principal recoge la media de lo acumulado desde la última recogida.
+"""
+import math
+import threading
+import time
+
+import metrics
+from config import BMP280_CONFIG
+from logger_config import logger
+
+BMP280_BURST_SECONDS = metrics.histogram('station_bmp280_burst_seconds', 'Duración de una ráfaga I2C del BMP280')
+BMP280_ERRORS = metrics.counter('station_bmp280_errors_total', 'Lecturas fallidas del BMP280 tras agotar reintentos')
+BMP280_RETRIES = metrics.counter('station_bmp280_retries_total', 'Reintentos de lectura del BMP280')
+
+def pressure_to_altitude(pressure, sea_level_pressure):
+    """Altitud barométrica (m) a partir de la presión en hPa"""
+    return 44330 * (1.0 - math.pow(pressure / sea_level_pressure, 0.1903))
+
+class AdafruitBurstDriver:
+    """
+    Envoltorio de adafruit_bmp280 con lectura en ráfaga.
+
+    La librería lanza una conversión por cada propiedad (temperature,
+    pressure, altitude) y recompensa la temperatura en cada una; aquí se usa
+    solo para configurar el sensor y para sus registros y coeficientes de
+    calibración, y la compensación es la de coma flotante de la hoja de datos.
+    """
+    _REG_STATUS = 0xF3
+    _REG_DATA = 0xF7
+
+    def __init__(self, device):
+        import adafruit_bmp280
+        self.device = device
+        self._lib = adafruit_bmp280
+        self._forced = False
+        self._conversion_time = 0.0
+
+    def configure(self, profile):
+        lib = self._lib
+        oversampling = {1: lib.OVERSCAN_X1, 2: lib.OVERSCAN_X2, 4: lib.OVERSCAN_X4,
+                        8: lib.OVERSCAN_X8, 16: lib.OVERSCAN_X16}
+        iir = {0: lib.IIR_FILTER_DISABLE, 2: lib.IIR_FILTER_X2, 4: lib.IIR_FILTER_X4,
+               8: lib.IIR_FILTER_X8, 16: lib.IIR_FILTER_X16}
+        standby = {0.5: lib.STANDBY_TC_0_5, 62.5: lib.STANDBY_TC_62_5, 125: lib.STANDBY_TC_125,
+                   250: lib.STANDBY_TC_250, 500: lib.STANDBY_TC_500, 1000: lib.STANDBY_TC_1000,
+                   2000: lib.STANDBY_TC_2000, 4000: lib.STANDBY_TC_4000}
+
+        device = self.device
+        # En modo sleep mientras se cambia la configuración (la hoja de datos lo exige para el IIR)
+        device.mode = lib.MODE_SLEEP
+        device.overscan_temperature = oversampling[profile['temperature_oversampling']]
+        device.overscan_pressure = oversampling[profile['pressure_oversampling']]
+        device.iir_filter = iir[profile['iir_filter']]
+        device.standby_period = standby[profile['standby_ms']]
+        self._forced = profile['mode'] == 'forced'
+        device.mode = lib.MODE_FORCE if self._forced else lib.MODE_NORMAL
+        # Tiempo máximo de conversión según la hoja de datos (ms)
+        self._conversion_time = (1.25 + 2.3 * profile['temperature_oversampling']
+                                 + 2.3 * profile['pressure_oversampling'] + 0.575) / 1000
+
+    def read_burst(self):
+        """Devuelve (temperatura °C, presión hPa) de una única lectura de registros"""
+        device = self.device
+        if self._forced:
+            # Cada escritura de ctrl_meas en modo forzado lanza una conversión
+            device.mode = self._lib.MODE_FORCE
+            time.sleep(self._conversion_time)
+            deadline = time.monotonic() + 0.1
+            while device._read_byte(self._REG_STATUS) & 0x08:
+                if time.monotonic() > deadline:
+                    raise OSError("BMP280: conversión sin terminar")
+                time.sleep(0.001)
+
+        data = device._read_register(self._REG_DATA, 6)
+        raw_pressure = (data[0] << 12) | (data[1] << 4) | (data[2] >> 4)
+        raw_temperature = (data[3] << 12) | (data[4] << 4) | (data[5] >> 4)
+
+        t1, t2, t3 = device._temp_calib
+        var1 = (raw_temperature / 16384.0 - t1 / 1024.0) * t2
+        var2 = (raw_temperature / 131072.0 - t1 / 8192.0) ** 2 * t3
+        t_fine = var1 + var2
+        temperature = t_fine / 5120.0
+
+        p1, p2, p3, p4, p5, p6, p7, p8, p9 = device._pressure_calib
+        var1 = t_fine / 2.0 - 64000.0
+        var2 = var1 * var1 * p6 / 32768.0
+        var2 = var2 + var1 * p5 * 2.0
+        var2 = var2 / 4.0 + p4 * 65536.0
+        var1 = (p3 * var1 * var1 / 524288.0 + p2 * var1) / 524288.0
+        var1 = (1.0 + var1 / 32768.0) * p1
+        if not var1:
+            raise OSError("BMP280: calibración de presión no válida")
+        pressure = 1048576.0 - raw_pressure
+        pressure = ((pressure - var2 / 4096.0) * 6250.0) / var1
+        var1 = p9 * pressure * pressure / 2147483648.0
+        var2 = pressure * p8 / 32768.0
+        pressure = pressure + (var1 + var2 + p7) / 16.0
+        return temperature, pressure / 100
+
+class BMP280Sampler:
+    def __init__(self, get_device, clock, config=None):
+        self.config = config or BMP280_CONFIG
+        self.clock = clock
+        self._get_device = get_device
+        self._device = None
+        self._configured = False
+        self._bus_lock = threading.Lock()
+        self._acc_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._reset_accumulator()
+
+        self.reads = 0
+        self.errors = 0
+        self.retries = 0
+        self.consecutive_failures = 0
+        self.last_error = None
+
+    # --- API para la estación ---------------------------------------------
+
+    def start(self):
+        """Arranca el hilo de muestreo; el sensor se espera y configura dentro del hilo"""
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='bmp280-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def take(self):
+        """
+        Devuelve la media de las lecturas acumuladas desde la última llamada.
+
+        Si el hilo aún no ha leído nada (sensor recién listo o reloj simulado
+        más rápido que el tiempo real) se hace una lectura en el momento.
+        """
+        with self._acc_lock:
+            count, sum_t, sum_p, last_ts = self._count, self._sum_t, self._sum_p, self._last_ts
+            self._reset_accumulator()
+        if not count:
+            sample = self._sample()
+            if sample is None:
+                return None
+            count, sum_t, sum_p, last_ts = 1, sample[0], sample[1], sample[2]
+
+        pressure = sum_p / count
+        return {
+            'temperature': round(sum_t / count, 1),
+            'pressure': round(pressure, 1),
+            'altitude': round(pressure_to_altitude(pressure, self.config['sea_level_pressure']), 1),
+            'timestamp': last_ts,
+            'samples': count,
+            'online': True
+        }
+
+    def get_stats(self):
+        """Devuelve contadores de lecturas, reintentos y errores del bus"""
+        return {
+            'profile': self.config['profile'],
+            'reads': self.reads,
+            'errors': self.errors,
+            'retries': self.retries,
+            'consecutive_failures': self.consecutive_failures,
+            'last_error': self.last_error
+        }
+
+    # --- Muestreo ---------------------------------------------------------
+
+    def _reset_accumulator(self):
+        self._count = 0
+        self._sum_t = 0.0
+        self._sum_p = 0.0
+        self._last_ts = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            sample = self._sample()
+            if sample is not None:
+                with self._acc_lock:
+                    self._count += 1
+                    self._sum_t += sample[0]
+                    self._sum_p += sample[1]
+                    self._last_ts = sample[2]
+            self._stop.wait(self._next_delay())
+
+    def _next_delay(self):
+        """Intervalo normal, o espera exponencial mientras el sensor siga fallando"""
+        interval = self.config['sample_interval']
+        if not self.consecutive_failures:
+            return interval
+        return min(interval * 2 ** self.consecutive_failures, self.config['max_backoff'])
+
+    def _ready_device(self):
+        """Devuelve el sensor configurado con el perfil activo, o None si no está disponible"""
+        if self._device is None:
+            self._device = self._get_device()
+            if self._device is None:
+                return None
+        if not self._configured:
+            profile = self.config['profiles'][self.config['profile']]
+            self._device.configure(profile)
+            self._configured = True
+            logger.info(f"BMP280 configurado con el perfil '{self.config['profile']}'")
+        return self._device
+
+    def _sample(self):
+        """Una lectura en ráfaga con reintentos; (temperatura, presión, instante) o None"""
+        attempts = self.config['retries'] + 1
+        for attempt in range(attempts):
+            try:
+                with self._bus_lock:
+                    device = self._ready_device()
+                    if device is None:
+                        return None
+                    with BMP280_BURST_SECONDS.time():
+                        temperature, pressure = device.read_burst()
+                self.reads += 1
+                self.consecutive_failures = 0
+                return temperature, pressure, self.clock.time()
+            except Exception as e:
+                self.last_error = str(e)
+                if attempt + 1 < attempts:
+                    self.retries += 1
+                    BMP280_RETRIES.inc()
+                    time.sleep(self.config['retry_delay'] * 2 ** attempt)
+
+        self.errors += 1
+        self.consecutive_failures += 1
+        BMP280_ERRORS.inc()
+        # Tras un fallo completo se vuelve a configurar por si el sensor se reinició
+        self._configured = False
+        logger.error(f"Error leyendo BMP280 ({self.consecutive_failures} seguidos): {self.last_error}")
+        return None
@@ -0,0 +1,148 @@
+"""
+Entrada del botón por flancos con cola de eventos
+
+El backend avisa de cada flanco (pulsado/soltado, instante monotónico) desde
+su hilo de interrupciones. ButtonInput filtra los rebotes, clasifica cada
+pulsación y encola eventos con marca de tiempo; on_event() despierta al bucle
+principal, que vacía la cola. Si el botón no admite flancos, un hilo ligero
+muestrea el nivel y genera los mismos flancos.
+
+Eventos (al soltar):
+- 'press': pulsación corta,
+- 'double_press': segunda pulsación corta dentro de double_press_window
+  (se emite además de su 'press'),
+- 'long_press': pulsación de al menos long_press segundos (sin 'press').
+"""
+import threading
+from collections import deque
+
+import metrics
+from config import BUTTON_CONFIG
+from logger_config import logger
+
+BUTTON_EVENTS = metrics.counter('station_button_events_total', 'Eventos del botón por tipo', ('kind',))
+BUTTON_BOUNCES = metrics.counter('station_button_bounces_total', 'Flancos del botón descartados por rebote')
+
+class ButtonEvent:
+    __slots__ = ('kind', 'timestamp', 'duration')
+
+    def __init__(self, kind, timestamp, duration):
+        self.kind = kind
+        self.timestamp = timestamp      # Instante monotónico del flanco que lo originó
+        self.duration = duration
+
+    def __repr__(self):
+        return f"ButtonEvent({self.kind}, {self.timestamp:.3f}, {self.duration:.3f})"
+
+class ButtonInput:
+    def __init__(self, on_event=None, config=None):
+        self.config = config or BUTTON_CONFIG
+        self.on_event = on_event
+        self._events = deque(maxlen=self.config['queue_size'])
+        self._lock = threading.Lock()
+        self._pressed = False
+        self._last_edge = float('-inf')
+        self._press_start = None
+        self._last_short_release = float('-inf')
+        self._poll_thread = None
+        self._stop = threading.Event()
+
+        self.edges = 0
+        self.bounces = 0
+
+    # --- Flancos ----------------------------------------------------------
+
+    def on_edge(self, pressed, timestamp):
+        """Procesa un flanco; seguro desde el hilo de interrupciones del GPIO"""
+        with self._lock:
+            self.edges += 1
+            if timestamp - self._last_edge < self.config['debounce']:
+                self.bounces += 1
+                BUTTON_BOUNCES.inc()
+                return
+            if pressed == self._pressed:
+                # Se perdió el flanco contrario: una pulsación repetida reinicia la cuenta
+                if pressed:
+                    self._press_start = timestamp
+                    self._last_edge = timestamp
+                return
+            self._pressed = pressed
+            self._last_edge = timestamp
+            if pressed:
+                self._press_start = timestamp
+                return
+            event = self._classify(timestamp)
+        if event:
+            self._notify(event)
+
+    def _classify(self, released_at):
+        start = self._press_start
+        self._press_start = None
+        if start is None:
+            return None
+        duration = released_at - start
+        if duration >= self.config['long_press']:
+            self._last_short_release = float('-inf')
+            return [ButtonEvent('long_press', start, duration)]
+        events = [ButtonEvent('press', start, duration)]
+        if start - self._last_short_release <= self.config['double_press_window']:
+            events.append(ButtonEvent('double_press', start, duration))
+            # Una tercera pulsación empieza una nueva serie
+            self._last_short_release = float('-inf')
+        else:
+            self._last_short_release = released_at
+        return events
+
+    def _notify(self, events):
+        for event in events:
+            self._events.append(event)
+            BUTTON_EVENTS.labels(event.kind).inc()
+        if self.on_event:
+            self.on_event()
+
+    def drain(self):
+        """Devuelve y vacía los eventos pendientes (en orden)"""
+        events = []
+        while self._events:
+            events.append(self._events.popleft())
+        return events
+
+    # --- Fuentes ----------------------------------------------------------
+
+    def attach(self, button, clock):
+        """
+        Conecta un botón: por flancos si ofrece set_edge_callback(), si no
+        muestreando su nivel en un hilo propio. Devuelve 'edges' o 'polling'.
+        """
+        if hasattr(button, 'set_edge_callback'):
+            button.set_edge_callback(self.on_edge)
+            return 'edges'
+        self._stop.clear()
+        self._poll_thread = threading.Thread(
+            target=self._poll, args=(button, clock), name='button-poll', daemon=True
+        )
+        self._poll_thread.start()
+        logger.warning("Botón sin interrupciones: muestreando su nivel")
+        return 'polling'
+
+    def _poll(self, button, clock):
+        interval = self.config['poll_interval']
+        last = False
+        while not self._stop.wait(interval):
+            try:
+                pressed = not button.value
+            except Exception as e:
+                logger.error(f"Error leyendo botón: {e}")
+                continue
+            if pressed != last:
+                last = pressed
+                self.on_edge(pressed, clock.monotonic())
+
+    def stop(self):
+        self._stop.set()
+        if self._poll_thread:
+            self._poll_thread.join(1.0)
+            self._poll_thread = None
+
+    def get_stats(self):
+        return {'edges': self.edges, 'bounces': self.bounces, 'pending': len(self._events)}
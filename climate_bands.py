@@ -0,0 +1,78 @@
+"""
+Clasificador de bandas climáticas basado en tabla
+
+Una única tabla (CLIMATE_BANDS en config.py) define límites, nombres, colores
+y parpadeo. Los valores sueltos se clasifican con bisect y los historiales
+completos con numpy.searchsorted.
+"""
+import math
+from bisect import bisect_right
+
+import numpy as np
+
+from config import CLIMATE_BANDS, CLIMATE_NO_DATA
+
+def _rgb565(rgb):
+    r, g, b = rgb
+    return ((r & 0xF8) << 8) | ((g & 0xFC) << 3) | (b >> 3)
+
+class ClimateBand:
+    __slots__ = ('index', 'lower', 'name', 'led_name', 'rgb', 'dim_rgb', 'led_rgb', 'rgb565', 'blink')
+
+    def __init__(self, index, spec):
+        self.index = index
+        self.lower = spec['lower']
+        self.name = spec['name']
+        self.led_name = spec['led_name']
+        self.rgb = spec['rgb']
+        self.led_rgb = spec.get('led_rgb', self.rgb)
+        self.dim_rgb = spec.get('dim_rgb', self.led_rgb)
+        self.rgb565 = _rgb565(self.rgb)
+        self.blink = spec['blink']
+
+    def led_color(self, blink_on=True):
+        """Color del LED para la fase de parpadeo indicada"""
+        if self.blink and not blink_on:
+            return self.dim_rgb
+        return self.led_rgb
+
+    def led_pattern(self):
+        """Patrón de animación del LED de la banda (ver led_animator)"""
+        if self.blink:
+            return {'kind': 'blink', 'color': self.led_rgb, 'off': self.dim_rgb}
+        return {'kind': 'solid', 'color': self.led_rgb}
+
+class ClimateClassifier:
+    def __init__(self, bands=None, no_data=None):
+        specs = bands or CLIMATE_BANDS
+        self.bands = [ClimateBand(i, spec) for i, spec in enumerate(specs)]
+        # El índice len(bands) corresponde a "sin datos" en las tablas vectorizadas
+        self.no_data = ClimateBand(len(self.bands), no_data or CLIMATE_NO_DATA)
+        self.bounds = [band.lower for band in self.bands[1:]]
+
+        self._bounds_array = np.array(self.bounds, dtype=np.float64)
+        self._rgb565_table = np.array([band.rgb565 for band in self.bands] + [self.no_data.rgb565], dtype=np.uint16)
+        self._rgb_table = np.array([band.rgb for band in self.bands] + [self.no_data.rgb], dtype=np.uint8)
+
+    def classify(self, temp):
+        """Devuelve la banda de una temperatura (o la banda sin datos)"""
+        if temp is None or math.isnan(temp):
+            return self.no_data
+        return self.bands[bisect_right(self.bounds, temp)]
+
+    def classify_array(self, temps):
+        """Devuelve el índice de banda de cada valor; NaN se asigna a la banda sin datos"""
+        temps = np.asarray(temps, dtype=np.float64)
+        indices = np.searchsorted(self._bounds_array, temps, side='right')
+        indices[np.isnan(temps)] = self.no_data.index
+        return indices
+
+    def colors565(self, temps):
+        """Color RGB565 de cada valor de un historial"""
+        return self._rgb565_table[self.classify_array(temps)]
+
+    def colors_rgb(self, temps):
+        """Color RGB888 (n, 3) de cada valor de un historial"""
+        return self._rgb_table[self.classify_array(temps)]
+
+classifier = ClimateClassifier()
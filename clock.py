@@ -0,0 +1,65 @@
+"""
+Relojes intercambiables para la estación
+
+SystemClock usa la hora real. SimulatedClock avanza solo cuando alguien espera,
+de modo que el bucle completo puede ejecutarse sin pantalla y más rápido que
+el tiempo real (pruebas de carga y de regresión).
+"""
+import threading
+import time
+
+class SystemClock:
+    """Reloj real del sistema"""
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def wait(self, event, timeout=None):
+        """Espera a un evento como mucho `timeout` segundos"""
+        return event.wait(timeout)
+
+class SimulatedClock:
+    """
+    Reloj virtual: cada espera sin evento pendiente adelanta el tiempo
+    hasta el plazo en lugar de dormir.
+
+    `speed` limita el avance a N veces el tiempo real (None = sin límite).
+    """
+
+    def __init__(self, start=None, speed=None):
+        self._origin = time.time() if start is None else float(start)
+        # Se acumula el tiempo transcurrido aparte: sumar plazos pequeños a una
+        # marca de época perdería precisión y el reloj podría no avanzar
+        self._elapsed = 0.0
+        self._speed = speed
+        self._lock = threading.Lock()
+
+    def time(self):
+        return self._origin + self._elapsed
+
+    def monotonic(self):
+        return self._elapsed
+
+    def advance(self, seconds):
+        """Adelanta el reloj `seconds` segundos"""
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._elapsed += seconds
+
+    def wait(self, event, timeout=None):
+        if event.is_set():
+            return True
+        if timeout is None:
+            # Sin plazo no hay nada que adelantar: se espera al evento real
+            return event.wait()
+        if self._speed:
+            if event.wait(timeout / self._speed):
+                return True
+        self.advance(timeout)
+        return event.is_set()
+
+SYSTEM_CLOCK = SystemClock()
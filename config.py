@@ -19,12 +19,15 @@ MQTT_CONFIG = {
     'LOCAL_BROKER': {
         'host': '192.168.1.184',  # Tu broker MQTT
         'port': 1883,
-        'topics': {
-            'exterior_temp': 'estacion/exterior/temperatura',
-            'exterior_hum': 'estacion/exterior/humedad', 
-            'exterior_pres': 'estacion/exterior/presion',
-            'exterior_status': 'estacion/exterior/estado'
-        }
+        # Suscripciones comodín: estacion/<dispositivo>/<medida>
+        'subscriptions': [
+            'estacion/+/temperatura',
+            'estacion/+/humedad',
+            'estacion/+/presion',
+            'estacion/+/estado'
+        ],
+        'primary_device': 'exterior',   # Módulo que alimenta la pantalla, LEDs y alertas
+        'max_devices': 256
     },
     'THINGSBOARD': {
         'host': 'thingsboard.cloud',
@@ -37,8 +40,17 @@ MQTT_CONFIG = {
 TFT_CONFIG = {
     'width': 320,
     'height': 240,
-    'rotation': 1,
-    'spi_speed': 64000000
+    'rotation': 1,            # Cuartos de vuelta respecto a la orientación nativa (240x320)
+    'spi_speed': 64000000,
+    'tile_size': 16,          # Resolución de la detección de regiones cambiadas
+    'full_refresh_ratio': 0.5,  # Fracción de bloques cambiados a partir de la que se envía el fotograma entero
+    'glyph_cache_size': 512,  # Glifos y etiquetas RGB565 en caché (LRU)
+    'font_path': '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf',
+    'font_sizes': {
+        'small': 13,
+        'medium': 22,
+        'large': 44
+    }
 }
 
 # Umbrales de temperatura - SINCRONIZADOS con ESP32
@@ -48,6 +60,53 @@ TEMP_THRESHOLDS = {
     'temp_change_alarm': 3.0
 }
 
+# Control de calidad de lecturas: rango físico, filtro de Hampel y ritmo de cambio máximo
+# (max_step + max_rate * segundos desde la última lectura aceptada). min_mad debe ser al
+# menos el ruido del sensor: con ventanas cortas la MAD estimada se queda corta a menudo
+QUALITY_CONFIG = {
+    'window': 9,              # Lecturas en la ventana del filtro de Hampel
+    'n_sigmas': 3.5,          # Con min_mad, ~5 σ del ruido de los sensores: el ruido normal no es un pico
+    'keep_rejected': 500,     # Últimas lecturas descartadas guardadas para consulta
+    'variables': {
+        'exterior_temp': {'range': (-40.0, 60.0), 'min_mad': 0.3, 'max_step': 1.0, 'max_rate': 0.05},
+        'exterior_humidity': {'range': (0.0, 100.0), 'min_mad': 1.0, 'max_step': 5.0, 'max_rate': 0.2},
+        'exterior_pressure': {'range': (870.0, 1085.0), 'min_mad': 0.2, 'max_step': 1.0, 'max_rate': 0.01},
+        'interior_temp': {'range': (-10.0, 50.0), 'min_mad': 0.3, 'max_step': 1.0, 'max_rate': 0.05},
+        'interior_humidity': {'range': (0.0, 100.0), 'min_mad': 1.0, 'max_step': 5.0, 'max_rate': 0.2},
+        'interior_pressure': {'range': (870.0, 1085.0), 'min_mad': 0.2, 'max_step': 1.0, 'max_rate': 0.01}
+    }
+}
+
+# Bandas climáticas (de menor a mayor): cada una empieza en 'lower' (inclusive).
+# Los límites de helada y calor extremo salen de TEMP_THRESHOLDS para que LEDs,
+# pantalla y alertas usen exactamente los mismos valores.
+CLIMATE_BANDS = [
+    {'lower': float('-inf'), 'name': 'H.EXTREMA', 'led_name': 'Violeta Parpadeante',
+     'rgb': (128, 0, 255), 'dim_rgb': (50, 0, 100), 'blink': True},
+    {'lower': -5.0, 'name': 'HELADA', 'led_name': 'Azul Parpadeante',
+     'rgb': (0, 0, 255), 'dim_rgb': (0, 0, 100), 'blink': True},
+    {'lower': TEMP_THRESHOLDS['freeze_warning'], 'name': 'MUY FRÍO', 'led_name': 'Azul',
+     'rgb': (0, 100, 255), 'blink': False},
+    {'lower': 10.0, 'name': 'FRÍO', 'led_name': 'Cian',
+     'rgb': (0, 255, 255), 'blink': False},
+    {'lower': 18.0, 'name': 'FRESCO', 'led_name': 'Verde Claro',
+     'rgb': (100, 255, 100), 'blink': False},
+    {'lower': 23.0, 'name': 'ÓPTIMO', 'led_name': 'Verde',
+     'rgb': (0, 255, 0), 'blink': False},
+    {'lower': 26.0, 'name': 'CÁLIDO', 'led_name': 'Amarillo',
+     'rgb': (255, 255, 0), 'blink': False},
+    {'lower': 30.0, 'name': 'CALUROSO', 'led_name': 'Naranja',
+     'rgb': (255, 165, 0), 'blink': False},
+    {'lower': TEMP_THRESHOLDS['heat_warning'], 'name': 'EXTREMO', 'led_name': 'Rojo Parpadeante',
+     'rgb': (255, 0, 0), 'dim_rgb': (100, 0, 0), 'blink': True}
+]
+
+# Banda usada cuando no hay lectura válida
+CLIMATE_NO_DATA = {
+    'lower': float('nan'), 'name': 'SIN DATOS', 'led_name': 'Gris',
+    'rgb': (128, 128, 128), 'led_rgb': (50, 50, 50), 'blink': False
+}
+
 # Colores de la interfaz (RGB565)
 UI_COLORS = {
     'primary': 0x06B6,      # Cyan
@@ -68,5 +127,210 @@ NEOPIXEL_CONFIG = {
     'auto_write': False
 }
 
+# Animación de los NeoPixels: el hilo de LEDs solo despierta en cada cambio de
+# fase ('blink', 'flash') o a `fps` fotogramas por segundo ('breathe')
+LED_ANIMATION_CONFIG = {
+    'fps': 30,
+    'periods': {'blink': 1.0, 'breathe': 4.0, 'flash': 1.5},   # Periodo por defecto de cada patrón (s)
+    'flash_on': 0.08          # Duración de cada destello (y de la pausa entre destellos)
+}
+
+# Sensor BMP280 interior: perfiles recomendados por la hoja de datos de Bosch
+BMP280_CONFIG = {
+    'profile': 'weather',
+    'profiles': {
+        # Monitorización meteorológica: mínimo consumo y sin filtro, una conversión por lectura
+        'weather': {'mode': 'forced', 'temperature_oversampling': 1, 'pressure_oversampling': 1,
+                    'iir_filter': 0, 'standby_ms': 0.5},
+        # Navegación en interiores: máxima resolución con filtro IIR fuerte
+        'indoor': {'mode': 'normal', 'temperature_oversampling': 2, 'pressure_oversampling': 16,
+                   'iir_filter': 16, 'standby_ms': 0.5},
+        # Dispositivo de mano de bajo consumo
+        'handheld': {'mode': 'normal', 'temperature_oversampling': 2, 'pressure_oversampling': 16,
+                     'iir_filter': 4, 'standby_ms': 62.5}
+    },
+    'sample_interval': 5,     # Segundos entre lecturas en segundo plano (se promedian hasta la siguiente recogida)
+    'retries': 2,             # Reintentos inmediatos por lectura fallida
+    'retry_delay': 0.05,      # Espera antes del primer reintento (se duplica en cada uno)
+    'max_backoff': 300,       # Espera máxima entre lecturas mientras el sensor siga fallando
+    'sea_level_pressure': 1013.25
+}
+
+# Backend de hardware: 'pi' (Raspberry Pi) o 'sim' (simulador sin periféricos)
+HARDWARE_CONFIG = {
+    'backend': 'pi',
+    'snapshot_dir': None      # El simulador guarda un PNG por fotograma aquí (None = no guardar)
+}
+
+# Intervalos del planificador (segundos)
+SCHEDULER_CONFIG = {
+    'sensor_read': 30,
+    'led_update': 5,
+    'display_update': 2,
+    'liveness_check': 5,
+    'exterior_timeout': 300   # 5 minutos sin datos = módulo offline
+}
+
+# Reglas de alerta: 'above'/'below' (umbral con histéresis), 'change' (variación en una
+# ventana de `window` segundos) y 'stale' (sin lecturas en `timeout` segundos).
+# Los mensajes admiten {value}, {delta} y {threshold}; 'led' pone el LED de estado a
+# parpadear en ese color mientras la alerta esté activa; 'sinks' limita los destinos.
+ALERT_CONFIG = {
+    'default_cooldown': 300,          # Segundos mínimos entre dos avisos de la misma regla
+    'mqtt_topic': 'estacion/alertas',
+    'rules': [
+        {'name': 'heat', 'type': 'above', 'variable': 'exterior_temp',
+         'threshold': TEMP_THRESHOLDS['heat_warning'], 'hysteresis': 1.0, 'led': (255, 0, 0),
+         'message': "🔥 ALERTA CALOR EXTREMO: {value:.1f}°C",
+         'clear_message': "Fin de alerta de calor: {value:.1f}°C"},
+        {'name': 'freeze', 'type': 'below', 'variable': 'exterior_temp',
+         'threshold': TEMP_THRESHOLDS['freeze_warning'], 'hysteresis': 1.0, 'led': (0, 0, 255),
+         'message': "❄️ ALERTA HELADA: {value:.1f}°C",
+         'clear_message': "Fin de alerta de helada: {value:.1f}°C"},
+        {'name': 'temp_change', 'type': 'change', 'variable': 'exterior_temp', 'window': 3600,
+         'threshold': TEMP_THRESHOLDS['temp_change_alarm'], 'hysteresis': 0.5,
+         'message': "🌡️ Cambio brusco de temperatura: {delta:+.1f}°C en 1 h",
+         'clear_message': "Temperatura estabilizada: {value:.1f}°C"},
+        {'name': 'humidity_high', 'type': 'above', 'variable': 'exterior_humidity',
+         'threshold': 95.0, 'hysteresis': 5.0, 'severity': 'info',
+         'message': "💧 Humedad muy alta: {value:.0f}%",
+         'clear_message': "Humedad normal: {value:.0f}%"},
+        {'name': 'pressure_drop', 'type': 'change', 'variable': 'exterior_pressure', 'window': 10800,
+         'threshold': 3.0, 'direction': 'fall', 'hysteresis': 0.5, 'cooldown': 3600,
+         'message': "🌀 Caída de presión: {delta:+.1f} hPa en 3 h (posible tormenta)",
+         'clear_message': "Presión estable: {value:.1f} hPa"},
+        {'name': 'exterior_stale', 'type': 'stale', 'variable': 'exterior_temp',
+         'timeout': SCHEDULER_CONFIG['exterior_timeout'],
+         'message': "⚠️ Módulo exterior sin lecturas desde hace {value:.0f} s",
+         'clear_message': "Módulo exterior enviando lecturas de nuevo"}
+    ]
+}
+
+# Botón: eventos por flancos (interrupciones GPIO)
+BUTTON_CONFIG = {
+    'debounce': 0.03,             # Flancos a menos de 30 ms del anterior son rebotes
+    'long_press': 1.0,            # Segundos pulsado para una pulsación larga
+    'double_press_window': 0.4,   # Segundos entre soltar y volver a pulsar para una doble pulsación
+    'poll_interval': 0.01,        # Muestreo de reserva si el botón no admite flancos
+    'queue_size': 64
+}
+
+# Almacenamiento persistente de lecturas (tarjeta SD)
+STORAGE_CONFIG = {
+    'data_dir': '/home/pi/weather_station/data',
+    'variables': {            # Identificadores fijos en disco: no reutilizar
+        'exterior_temp': 1,
+        'exterior_humidity': 2,
+        'exterior_pressure': 3,
+        'interior_temp': 4,
+        'interior_humidity': 5,
+        'interior_pressure': 6
+    },
+    'min_interval': 10,       # Máximo una lectura persistida por variable cada 10 s
+    'flush_interval': 60,     # Un fsync por minuto
+    'max_batch': 512,         # Volcado anticipado si se acumulan más lecturas
+    'history_hours': 24,      # Historial recuperado en memoria al arrancar
+    'retention_days': 400
+}
+
+# Captura del flujo MQTT recibido para reproducirlo después (benchmarks/replay_capture.py)
+CAPTURE_CONFIG = {
+    'enabled': False,
+    'path': '/home/pi/weather_station/data/mqtt-capture.bin',
+    'flush_bytes': 65536,     # Volcado al acumular este tamaño...
+    'flush_interval': 10,     # ...o al pasar estos segundos desde el anterior
+    'max_bytes': 512 * 1024 * 1024   # Límite del fichero para no llenar la tarjeta SD
+}
+
+# Índice de agregados históricos: (resolución en segundos, número de intervalos)
+ROLLUP_CONFIG = {
+    'data_dir': '/home/pi/weather_station/data/rollups',
+    'levels': [
+        (60, 20160),          # 1 minuto durante 14 días
+        (3600, 17520),        # 1 hora durante 2 años
+        (86400, 3660)         # 1 día durante 10 años
+    ]
+}
+
+# Estadísticas móviles (ventanas en segundos)
+STATS_CONFIG = {
+    'windows': {
+        '1h': 3600,
+        '24h': 86400,
+        '7d': 604800
+    },
+    'day_window': '24h'       # Ventana usada para las estadísticas diarias de la pantalla
+}
+
+# Envío de telemetría a ThingsBoard por lotes
+TELEMETRY_CONFIG = {
+    'enabled': True,
+    'topic': 'v1/devices/me/telemetry',
+    'batch_interval': 60,         # Segundos entre lotes
+    'max_batch': 500,             # Lecturas máximas por lote
+    'max_pending': 20000,         # Lecturas en memoria antes de descartar las más antiguas
+    'spool_dir': '/home/pi/weather_station/data/uplink',
+    'max_spool_files': 10000,     # Lotes guardados en disco durante cortes
+    'drain_rate': 5,              # Lotes reenviados por segundo al reconectar
+    'max_reconnect_delay': 120,
+    'compress': False,            # ThingsBoard espera JSON; solo para pasarelas que descompriman
+    'compression_level': 6
+}
+
+# Métricas internas (formato Prometheus en http://host:port/metrics)
+METRICS_CONFIG = {
+    'enabled': True,          # False = instrumentación sin coste (objetos nulos)
+    'host': '127.0.0.1',
+    'port': 9108
+}
+
+# API de datos en vivo para el dashboard web (HTTP + WebSocket en la red local)
+LIVE_API_CONFIG = {
+    'enabled': True,
+    'host': '0.0.0.0',
+    'port': 8080,
+    'push_interval': 1.0,     # Como mucho un delta por segundo a todos los clientes
+    'max_clients': 32,
+    'max_buffer': 256 * 1024, # Bytes pendientes de enviar a un cliente antes de desconectarlo
+    'allow_origin': '*',      # CORS para el dashboard servido desde otro origen
+    'history_variable': 'exterior_temp'   # Serie de la gráfica (y de los deltas de historial)
+}
+
+# Modo multiproceso: ingesta MQTT, almacenamiento/estadísticas y pantalla/LEDs en procesos
+# separados que intercambian muestras por anillos en memoria compartida; un supervisor
+# reinicia el proceso que falle sin reiniciar el servicio completo
+MULTIPROCESS_CONFIG = {
+    'enabled': False,
+    'shm_prefix': 'estacion',     # Prefijo de los segmentos en /dev/shm (se añade el PID)
+    'ring_capacity': 65536,       # Registros de 32 bytes por anillo (2 MB)
+    'poll_interval': 0.05,        # Segundos entre lecturas de los anillos
+    'heartbeat_interval': 1.0,
+    'heartbeat_timeout': 60,      # Sin latido en este tiempo = proceso colgado
+    'restart_delay': 1.0,         # Primer reintento; se duplica en fallos seguidos
+    'max_restart_delay': 60,
+    'stable_after': 300           # Segundos en marcha tras los que se olvidan los fallos
+}
+
+# Métricas del sistema para la página de estadísticas (muestreadas en segundo plano)
+SYSTEM_METRICS_CONFIG = {
+    'interval': 2,            # Segundos entre muestreos
+    'history': 60,            # Muestreos guardados para las minigráficas (2 minutos)
+    'wifi_interface': 'wlan0',
+    'thermal_path': '/sys/class/thermal/thermal_zone0/temp'   # cpu_thermal en la Raspberry Pi
+}
+
+# Logging: escritura en segundo plano, límite por línea de código y fichero opcional
+LOGGING_CONFIG = {
+    'level': 'INFO',
+    'queue_size': 10000,      # mensajes pendientes antes de descartar
+    'rate_limit': 5.0,        # mensajes/s por línea de código (0 = sin límite)
+    'burst': 20,              # ráfaga permitida por línea de código
+    'dedup_window': 60,       # segundos durante los que se agrupan mensajes idénticos
+    'file': None,             # p. ej. '/home/pi/weather_station/logs/station.log'
+    'file_level': 'INFO',
+    'file_max_bytes': 1_000_000,
+    'file_backups': 3
+}
+
 # Modo de prueba para demostrar todos los estados
 TEST_MODE = False  # Cambiar a False para uso real
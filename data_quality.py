@@ -0,0 +1,197 @@
+"""
+Control de calidad de las lecturas de sensores
+
+Cada lectura pasa tres comprobaciones con coste constante por muestra:
+
+- rango físico de la variable (descarta p. ej. los -127 °C de una sonda
+  desconectada o NaN),
+- filtro de Hampel sobre las últimas QUALITY_CONFIG['window'] lecturas en
+  rango: se descarta si se aleja de la mediana más de n_sigmas veces la
+  desviación robusta (1.4826 * MAD, con un mínimo por variable),
+- ritmo de cambio máximo respecto a la última lectura aceptada, salvo que la
+  mediana de la ventana ya haya seguido al cambio (cambio de nivel real).
+
+Las lecturas descartadas no se pierden sin más: se etiquetan con el motivo,
+se cuentan por variable y motivo y se guardan las últimas para consulta.
+clean_bulk() aplica las mismas comprobaciones vectorizadas con numpy sobre
+series históricas.
+"""
+import threading
+from collections import deque
+
+import numpy as np
+
+import metrics
+from config import QUALITY_CONFIG
+from logger_config import logger
+
+# Códigos de motivo de clean_bulk(); el índice coincide con el nombre
+REASONS = ('ok', 'range', 'spike', 'rate')
+OK, RANGE, SPIKE, RATE = range(len(REASONS))
+
+# Para acotar la memoria, las ventanas deslizantes de clean_bulk() se procesan por bloques
+BULK_CHUNK = 1 << 18
+
+QUALITY_REJECTED = metrics.counter(
+    'station_quality_rejected_total', 'Lecturas descartadas por control de calidad', ('variable', 'reason')
+)
+
+class VariableFilter:
+    """Estado del filtro de una variable de una fuente concreta"""
+    __slots__ = ('spec', 'n_sigmas', 'window', 'middle', 'last_value', 'last_ts')
+
+    def __init__(self, spec, window, n_sigmas):
+        self.spec = spec
+        self.n_sigmas = n_sigmas
+        self.window = deque(maxlen=window)
+        self.middle = window // 2
+        self.last_value = None
+        self.last_ts = None
+
+    def check(self, value, timestamp):
+        """Devuelve None si la lectura es válida o el motivo del descarte"""
+        low, high = self.spec['range']
+        # Las comparaciones con NaN son falsas: también se descarta por rango
+        if not low <= value <= high:
+            return 'range'
+
+        window = self.window
+        window.append(value)
+        median = None
+        if len(window) == window.maxlen:
+            median = sorted(window)[self.middle]
+            mad = sorted(abs(sample - median) for sample in window)[self.middle]
+            if abs(value - median) > self.n_sigmas * max(1.4826 * mad, self.spec['min_mad']):
+                return 'spike'
+
+        if self.last_ts is not None:
+            allowed = self.spec['max_step'] + self.spec['max_rate'] * (timestamp - self.last_ts)
+            reference = self.last_value
+            if abs(value - reference) > allowed and (median is None or abs(median - reference) <= allowed):
+                return 'rate'
+
+        self.last_value = value
+        self.last_ts = timestamp
+        return None
+
+    def seed(self, values, timestamp):
+        """Precarga la ventana con lecturas ya aceptadas (p. ej. el historial en disco)"""
+        for value in values[-self.window.maxlen:]:
+            self.window.append(value)
+        if len(values):
+            self.last_value = values[-1]
+            self.last_ts = timestamp
+
+class DataQuality:
+    def __init__(self, config=None):
+        self.config = config or QUALITY_CONFIG
+        self.specs = self.config['variables']
+        self._filters = {}
+        self._lock = threading.Lock()
+        self.rejected = deque(maxlen=self.config['keep_rejected'])
+        self.accepted = 0
+        self.rejected_total = 0
+
+    def _filter(self, name, source):
+        key = (name, source)
+        variable_filter = self._filters.get(key)
+        if variable_filter is None:
+            variable_filter = VariableFilter(self.specs[name], self.config['window'], self.config['n_sigmas'])
+            self._filters[key] = variable_filter
+        return variable_filter
+
+    def check(self, name, value, timestamp, source='local'):
+        """
+        Comprueba una lectura; devuelve None si se acepta o el motivo del descarte.
+
+        Las variables sin especificación en QUALITY_CONFIG se aceptan siempre.
+        """
+        if name not in self.specs:
+            return None
+        with self._lock:
+            reason = self._filter(name, source).check(value, timestamp)
+            # Contadores exactos aunque varios hilos de ingesta comprueben a la vez
+            if reason is None:
+                self.accepted += 1
+                return None
+            self.rejected_total += 1
+
+        self.rejected.append({
+            'ts': timestamp,
+            'variable': name,
+            'source': source,
+            'value': value,
+            'reason': reason
+        })
+        QUALITY_REJECTED.labels(name, reason).inc()
+        logger.warning(f"🚫 Lectura descartada ({reason}): {source}/{name} = {value}")
+        return reason
+
+    def seed(self, name, values, timestamp, source='local'):
+        """Inicializa el filtro de una variable con lecturas históricas ya limpias"""
+        if name not in self.specs:
+            return
+        with self._lock:
+            self._filter(name, source).seed(list(values), timestamp)
+
+    def clean_bulk(self, name, timestamps, values):
+        """
+        Versión vectorizada para series históricas ordenadas por tiempo.
+
+        Devuelve un array uint8 con el motivo de cada muestra (índices de
+        REASONS; OK = 0). El ritmo de cambio se compara con la muestra
+        anterior que pasó rango y Hampel, no con la última aceptada, así que
+        una racha de muestras demasiado rápidas puede diferir del filtro en
+        línea en la primera muestra tras la racha.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        reasons = np.zeros(len(values), dtype=np.uint8)
+        spec = self.specs.get(name)
+        if spec is None or not len(values):
+            return reasons
+
+        low, high = spec['range']
+        with np.errstate(invalid='ignore'):
+            in_range = (values >= low) & (values <= high)
+        reasons[~in_range] = RANGE
+        index = np.flatnonzero(in_range)
+        kept, kept_ts = values[index], timestamps[index]
+
+        # Hampel con ventana que termina en cada muestra, como en línea
+        width = self.config['window']
+        middle = width // 2
+        medians = np.full(len(kept), np.nan)
+        spikes = np.zeros(len(kept), dtype=bool)
+        for start in range(0, max(len(kept) - width + 1, 0), BULK_CHUNK):
+            stop = min(start + BULK_CHUNK, len(kept) - width + 1)
+            windows = np.lib.stride_tricks.sliding_window_view(kept[start:stop + width - 1], width)
+            median = np.partition(windows, middle, axis=1)[:, middle]
+            deviations = np.abs(windows - median[:, None])
+            mad = np.partition(deviations, middle, axis=1)[:, middle]
+            threshold = self.config['n_sigmas'] * np.maximum(1.4826 * mad, spec['min_mad'])
+            current = kept[start + width - 1:stop + width - 1]
+            medians[start + width - 1:stop + width - 1] = median
+            spikes[start + width - 1:stop + width - 1] = np.abs(current - median) > threshold
+        reasons[index[spikes]] = SPIKE
+
+        # Ritmo de cambio entre muestras consecutivas que pasaron los filtros anteriores
+        passed = ~spikes
+        index, kept, kept_ts, medians = index[passed], kept[passed], kept_ts[passed], medians[passed]
+        if len(kept) > 1:
+            allowed = spec['max_step'] + spec['max_rate'] * np.diff(kept_ts)
+            previous = kept[:-1]
+            jumps = np.abs(np.diff(kept)) > allowed
+            # Sin ventana completa la mediana es NaN y la comparación es falsa: no hubo cambio de nivel
+            with np.errstate(invalid='ignore'):
+                followed = np.abs(medians[1:] - previous) > allowed
+            reasons[index[1:][jumps & ~followed]] = RATE
+        return reasons
+
+    def get_stats(self):
+        """Devuelve lecturas aceptadas, descartadas y las últimas descartadas"""
+        return {
+            'accepted': self.accepted,
+            'rejected': self.rejected_total,
+            'recent_rejected': list(self.rejected)[-10:]
+        }
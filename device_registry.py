@@ -0,0 +1,72 @@
+"""
+Estado por dispositivo de los módulos exteriores
+
+Cada módulo que publica en estacion/<id>/... recibe un índice fijo y sus
+últimos valores se guardan en columnas array('d') compactas, sin un
+diccionario por dispositivo.
+"""
+import math
+from array import array
+
+from logger_config import logger
+
+FIELDS = ('temperature', 'humidity', 'pressure')
+
+class DeviceTable:
+    __slots__ = (
+        'capacity', '_index', 'ids',
+        'temperature', 'humidity', 'pressure',
+        'online', 'last_update', 'messages'
+    )
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._index = {}
+        self.ids = []
+        nan = [math.nan] * capacity
+        self.temperature = array('d', nan)
+        self.humidity = array('d', nan)
+        self.pressure = array('d', nan)
+        self.online = array('b', [0] * capacity)
+        self.last_update = array('d', [0.0] * capacity)
+        self.messages = array('L', [0] * capacity)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def index_of(self, device_id):
+        """Devuelve el índice del dispositivo, registrándolo si es nuevo (None si la tabla está llena)"""
+        index = self._index.get(device_id)
+        if index is not None:
+            return index
+        if len(self.ids) >= self.capacity:
+            logger.warning(f"Tabla de dispositivos llena, ignorando {device_id}")
+            return None
+        index = len(self.ids)
+        self._index[device_id] = index
+        self.ids.append(device_id)
+        logger.info(f"🛰️ Nuevo módulo exterior registrado: {device_id}")
+        return index
+
+    def touch(self, index, timestamp):
+        """Cuenta un mensaje del dispositivo"""
+        self.last_update[index] = timestamp
+        self.messages[index] += 1
+
+    def get(self, device_id):
+        """Devuelve el estado de un dispositivo como diccionario"""
+        index = self._index.get(device_id)
+        if index is None:
+            return None
+        state = {field: getattr(self, field)[index] for field in FIELDS}
+        state.update({
+            'id': device_id,
+            'online': bool(self.online[index]),
+            'last_update': self.last_update[index],
+            'messages': self.messages[index]
+        })
+        return state
+
+    def devices(self):
+        """Devuelve el estado de todos los dispositivos registrados"""
+        return [self.get(device_id) for device_id in self.ids]
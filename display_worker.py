@@ -0,0 +1,80 @@
+"""
+Hilo de renderizado de la pantalla TFT
+
+El bucle principal solo deposita la petición más reciente; el hilo compone y
+envía el fotograma por SPI. Si llegan varias peticiones mientras se dibuja,
+las intermedias se descartan y solo se renderiza la última.
+"""
+import threading
+
+from logger_config import logger
+
+class DisplayWorker:
+    def __init__(self, renderer, on_frame=None):
+        self.renderer = renderer
+        self.on_frame = on_frame
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending = None
+        self._running = False
+        self._thread = None
+
+        self.submitted = 0
+        self.rendered = 0
+        self.dropped = 0
+
+    def start(self):
+        """Arranca el hilo de renderizado"""
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='display-worker', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Detiene el hilo tras terminar el fotograma en curso"""
+        self._running = False
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, page, *args):
+        """Encola un fotograma sin bloquear; sustituye a cualquier petición aún no dibujada"""
+        with self._lock:
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = (page, args)
+            self.submitted += 1
+        self._wakeup.set()
+
+    def _run(self):
+        while self._running:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            with self._lock:
+                job = self._pending
+                self._pending = None
+            if job is None:
+                continue
+
+            page, args = job
+            try:
+                if page == 'main':
+                    frame = self.renderer.render_main(*args)
+                else:
+                    frame = self.renderer.render_stats(*args)
+                self.rendered += 1
+                if self.on_frame:
+                    self.on_frame(frame)
+            except Exception as e:
+                logger.error(f"Error renderizando página {page}: {e}")
+
+    def get_stats(self):
+        """Devuelve contadores de fotogramas pedidos, dibujados y descartados"""
+        return {
+            'submitted': self.submitted,
+            'rendered': self.rendered,
+            'dropped': self.dropped,
+            'last_frame': self.renderer.last_frame_stats
+        }
@@ -0,0 +1,99 @@
+"""
+Atlas de glifos y etiquetas pre-renderizados en RGB565
+
+Los dígitos, signos, unidades y palabras de estado se rasterizan con PIL una
+sola vez por tamaño y color, ya convertidos a RGB565, y después el
+renderizador compone los textos copiando porciones de array.
+"""
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from config import TFT_CONFIG
+
+# Caracteres que se pre-renderizan al calentar el atlas
+NUMERIC_CHARS = "0123456789.,-+:°%hPa dhm"
+
+def rgb_to_rgb565(pixels):
+    """Convierte un array (alto, ancho, 3) uint8 a RGB565 uint16"""
+    pixels = pixels.astype(np.uint16)
+    return ((pixels[..., 0] & 0xF8) << 8) | ((pixels[..., 1] & 0xFC) << 3) | (pixels[..., 2] >> 3)
+
+class GlyphAtlas:
+    def __init__(self, fonts, max_entries=None):
+        self.fonts = fonts
+        self.max_entries = max_entries or TFT_CONFIG['glyph_cache_size']
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _rasterize(self, text, size, fg, bg):
+        font = self.fonts[size]
+        ascent, descent = font.getmetrics()
+        width = max(int(round(font.getlength(text))), 1)
+        image = Image.new('RGB', (width, ascent + descent), bg)
+        ImageDraw.Draw(image).text((0, 0), text, font=font, fill=fg)
+        return np.ascontiguousarray(rgb_to_rgb565(np.asarray(image)))
+
+    def get(self, text, size, fg, bg):
+        """Devuelve el bloque RGB565 de un glifo o etiqueta, rasterizándolo si no está en caché"""
+        key = (text, size, fg, bg)
+        block = self._cache.get(key)
+        if block is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return block
+
+        self.misses += 1
+        block = self._rasterize(text, size, fg, bg)
+        self._cache[key] = block
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return block
+
+    def warm(self, size, fg, bg, labels=()):
+        """Pre-renderiza los caracteres numéricos y las etiquetas indicadas"""
+        for char in NUMERIC_CHARS:
+            self.get(char, size, fg, bg)
+        for label in labels:
+            self.get(label, size, fg, bg)
+
+    @staticmethod
+    def _blit(frame, x, y, block):
+        rows, cols = block.shape
+        height, width = frame.shape
+        if x >= width or y >= height or x + cols <= 0 or y + rows <= 0:
+            return
+        sx, sy = max(0, -x), max(0, -y)
+        ex, ey = min(cols, width - x), min(rows, height - y)
+        frame[y + sy:y + ey, x + sx:x + ex] = block[sy:ey, sx:ex]
+
+    def draw_text(self, frame, x, y, text, size, fg, bg, align='left'):
+        """Compone un texto carácter a carácter copiando glifos; devuelve su ancho"""
+        blocks = [self.get(char, size, fg, bg) for char in text]
+        width = sum(block.shape[1] for block in blocks)
+        if align == 'right':
+            x -= width
+        for block in blocks:
+            self._blit(frame, x, y, block)
+            x += block.shape[1]
+        return width
+
+    def draw_label(self, frame, x, y, text, size, fg, bg, align='left'):
+        """Copia una etiqueta completa (p. ej. una palabra de estado); devuelve su ancho"""
+        block = self.get(text, size, fg, bg)
+        width = block.shape[1]
+        if align == 'right':
+            x -= width
+        self._blit(frame, x, y, block)
+        return width
+
+    def get_stats(self):
+        """Devuelve ocupación y aciertos de la caché"""
+        return {
+            'entries': len(self._cache),
+            'bytes': sum(block.nbytes for block in self._cache.values()),
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -0,0 +1,210 @@
+"""
+Backends de hardware de la estación
+
+Un backend solo abre los periféricos y los expone con la interfaz de las
+librerías de Adafruit; toda la lógica (LEDs, botón, pantalla) vive en
+HardwareManager y es la misma para la Raspberry Pi y para el simulador.
+"""
+import threading
+
+from clock import SYSTEM_CLOCK
+from config import GPIO_PINS, TFT_CONFIG, NEOPIXEL_CONFIG, HARDWARE_CONFIG, TEST_MODE
+from logger_config import logger
+from startup_timer import startup
+
+class HardwareBackend:
+    """
+    Interfaz común de los backends.
+
+    - tft: pantalla con fill(color565) y _block(x0, y0, x1, y1, datos_be16) como el ILI9341
+    - bmp280: sensor con configure(perfil) y read_burst() -> (temperatura, presión)
+    - neopixels: tira indexable con fill() y show()
+    - button: entrada con .value (pull-up: False mientras está pulsado) y, si
+      admite interrupciones, set_edge_callback(f(pulsado, instante_monotónico))
+
+    Cualquiera de ellos puede ser None si el periférico no está disponible o
+    aún se está inicializando; wait() espera a que uno concreto esté listo.
+    """
+    name = 'base'
+
+    def __init__(self):
+        self.tft = None
+        self.bmp280 = None
+        self.neopixels = None
+        self.button = None
+
+    def wait(self, device, timeout=None):
+        """Espera a que termine la inicialización de un periférico y lo devuelve"""
+        return getattr(self, device)
+
+    def frame_presented(self, frame):
+        """Se llama desde el hilo de pantalla tras enviar cada fotograma"""
+        pass
+
+    def close(self):
+        pass
+
+class GpioEdgeButton:
+    """Botón con pull-up que notifica cada flanco desde el hilo de interrupciones de RPi.GPIO"""
+
+    def __init__(self, pin, clock=None):
+        import RPi.GPIO as GPIO
+        self._gpio = GPIO
+        self.pin = pin
+        self.clock = clock or SYSTEM_CLOCK
+        self._callback = None
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        GPIO.add_event_detect(pin, GPIO.BOTH, callback=self._on_edge)
+
+    @property
+    def value(self):
+        return bool(self._gpio.input(self.pin))
+
+    def set_edge_callback(self, callback):
+        self._callback = callback
+
+    def _on_edge(self, channel):
+        # El instante se toma antes de leer el nivel para no sumar la latencia de la lectura
+        timestamp = self.clock.monotonic()
+        if self._callback:
+            self._callback(not self._gpio.input(self.pin), timestamp)
+
+    def close(self):
+        self._gpio.remove_event_detect(self.pin)
+
+class PiBackend(HardwareBackend):
+    """
+    Periféricos reales de la Raspberry Pi.
+
+    Cada periférico se abre en su propio hilo (SPI, I2C y GPIO son
+    independientes) e importa sus librerías de Adafruit al abrirse, así que
+    el constructor vuelve enseguida y la pantalla no espera al sensor.
+    """
+    name = 'pi'
+
+    def __init__(self):
+        super().__init__()
+        self._init_threads = {}
+        for device, init in (
+            ('tft', self._init_tft),
+            ('bmp280', self._init_bmp280),
+            ('neopixels', self._init_neopixels),
+            ('button', self._init_button)
+        ):
+            thread = threading.Thread(target=self._run_init, args=(device, init), name=f'init-{device}', daemon=True)
+            self._init_threads[device] = thread
+            thread.start()
+
+    def _run_init(self, device, init):
+        with startup.phase(f'init_{device}'):
+            init()
+
+    def wait(self, device, timeout=None):
+        thread = self._init_threads.get(device)
+        if thread:
+            thread.join(timeout)
+        return getattr(self, device)
+
+    def _init_tft(self):
+        """Inicializa la pantalla TFT ILI9341"""
+        try:
+            import board
+            import busio
+            import digitalio
+            import adafruit_ili9341
+
+            spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
+            cs = digitalio.DigitalInOut(getattr(board, f'D{GPIO_PINS["TFT_CS"]}'))
+            dc = digitalio.DigitalInOut(getattr(board, f'D{GPIO_PINS["TFT_DC"]}'))
+            rst = digitalio.DigitalInOut(getattr(board, f'D{GPIO_PINS["TFT_RST"]}'))
+
+            self.tft = adafruit_ili9341.ILI9341(
+                spi, cs=cs, dc=dc, rst=rst,
+                width=TFT_CONFIG['width'],
+                height=TFT_CONFIG['height'],
+                rotation=TFT_CONFIG['rotation']
+            )
+            logger.info("Pantalla TFT inicializada")
+
+        except Exception as e:
+            logger.error(f"Error inicializando TFT: {e}")
+            self.tft = None
+
+    def _init_bmp280(self):
+        """Inicializa el sensor BME280 interior"""
+        try:
+            import board
+            import busio
+            import adafruit_bmp280
+
+            from bmp280_sampler import AdafruitBurstDriver
+
+            i2c = busio.I2C(board.SCL, board.SDA)
+            # El perfil de muestreo lo aplica BMP280Sampler desde su propio hilo
+            self.bmp280 = AdafruitBurstDriver(adafruit_bmp280.Adafruit_BMP280_I2C(i2c))
+            logger.info("Sensor BME280 inicializado")
+
+        except Exception as e:
+            logger.error(f"Error inicializando BME280: {e}")
+            self.bmp280 = None
+
+    def _init_neopixels(self):
+        """Inicializa los LEDs NeoPixel"""
+        try:
+            import board
+            import neopixel
+
+            neopixels = neopixel.NeoPixel(
+                getattr(board, f'D{GPIO_PINS["NEOPIXEL"]}'),
+                NEOPIXEL_CONFIG['count'],
+                brightness=NEOPIXEL_CONFIG['brightness'],
+                auto_write=NEOPIXEL_CONFIG['auto_write']
+            )
+
+            # Test inicial: verde hasta que la primera actualización de LEDs lo sustituya
+            neopixels.fill((0, 255, 0))
+            neopixels.show()
+            self.neopixels = neopixels
+
+            logger.info("NeoPixels inicializados")
+
+        except Exception as e:
+            logger.error(f"Error inicializando NeoPixels: {e}")
+            self.neopixels = None
+
+    def _init_button(self):
+        """Inicializa el botón táctil, por interrupciones si RPi.GPIO está disponible"""
+        try:
+            self.button = GpioEdgeButton(GPIO_PINS['BUTTON'])
+            logger.info("Botón inicializado (interrupciones por flanco)")
+            return
+        except Exception as e:
+            logger.warning(f"Botón sin interrupciones GPIO ({e}), se usará por nivel")
+        try:
+            import board
+            import digitalio
+
+            button = digitalio.DigitalInOut(getattr(board, f'D{GPIO_PINS["BUTTON"]}'))
+            button.direction = digitalio.Direction.INPUT
+            button.pull = digitalio.Pull.UP
+            self.button = button
+            logger.info("Botón inicializado")
+
+        except Exception as e:
+            logger.error(f"Error inicializando botón: {e}")
+            self.button = None
+
+    def close(self):
+        if isinstance(self.button, GpioEdgeButton):
+            self.button.close()
+
+def create_backend(name=None, clock=None):
+    """Crea el backend configurado ('pi' o 'sim'); TEST_MODE siempre usa el simulador"""
+    name = name or ('sim' if TEST_MODE else HARDWARE_CONFIG['backend'])
+    if name == 'sim':
+        from hardware_simulator import SimBackend
+        return SimBackend(clock=clock, snapshot_dir=HARDWARE_CONFIG['snapshot_dir'])
+    if name == 'pi':
+        return PiBackend()
+    raise ValueError(f"Backend de hardware desconocido: {name}")
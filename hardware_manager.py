@@ -1,29 +1,46 @@
 """
 Gestor de hardware - Abstrae toda la interacción con componentes físicos
+
+Los periféricos los abre un backend (Raspberry Pi real o simulador); aquí solo
+está la lógica común de LEDs, botón, sensor y pantalla.
 """
-import time
-import board
-import busio
-import digitalio
-import adafruit_bmp280
-import adafruit_ili9341
-import neopixel
-from PIL import Image, ImageDraw, ImageFont
+import threading
+
 import numpy as np
-from config import GPIO_PINS, TFT_CONFIG, UI_COLORS, NEOPIXEL_CONFIG, TEST_MODE
+import metrics
+from config import TFT_CONFIG, NEOPIXEL_CONFIG
 from logger_config import logger
+from clock import SYSTEM_CLOCK
+from climate_bands import classifier
+from hardware_backends import create_backend
+from display_worker import DisplayWorker
+from bmp280_sampler import BMP280Sampler
+from button_input import ButtonInput
+from led_animator import LedAnimator
+from startup_timer import startup
+
+BMP280_READ_SECONDS = metrics.histogram('station_bmp280_read_seconds', 'Duración de la recogida del BMP280 en el bucle principal')
+LED_UPDATE_SECONDS = metrics.histogram('station_led_update_seconds', 'Duración de la actualización de los NeoPixels')
+DRAW_SECONDS = metrics.histogram('station_draw_seconds', 'Tiempo de encolar un dibujo en el bucle principal', ('page',))
+FRAME_RENDER_SECONDS = metrics.histogram('station_frame_render_seconds', 'Composición de un fotograma en el hilo de pantalla')
+FRAME_TRANSFER_SECONDS = metrics.histogram('station_frame_transfer_seconds', 'Envío por SPI de las regiones cambiadas')
+FRAME_BYTES = metrics.histogram(
+    'station_frame_bytes', 'Bytes enviados por fotograma',
+    buckets=(512, 2048, 8192, 32768, 65536, 153600)
+)
 
 class HardwareManager:
-    def __init__(self):
+    def __init__(self, backend=None, clock=None):
+        self.clock = clock or SYSTEM_CLOCK
+        self.backend = backend or create_backend(clock=self.clock)
         self.tft = None
-        self.bmp280 = None
-        self.neopixels = None
-        self.button = None
-        self.last_button_state = False
-        self.button_pressed = False
+        self.renderer = None
+        self.display_worker = None
+        self.button_input = ButtonInput()
+        self.alert_color = None
         
-        # Variables para modo de prueba
-        self.test_cycle_start = time.time()
+        # Ciclo de temperaturas del modo de prueba
+        self.test_cycle_start = self.clock.time()
         self.test_states = [
             {'temp': -8, 'desc': 'Helada Extrema'},
             {'temp': -2, 'desc': 'Helada'},
@@ -36,279 +53,198 @@ class HardwareManager:
             {'temp': 37, 'desc': 'Extremo'}
         ]
         
-        # Inicializar componentes (solo si no está en modo prueba)
-        if not TEST_MODE:
-            self._init_tft()
-            self._init_bmp280()
-            self._init_neopixels()
-            self._init_button()
-        else:
-            logger.info("Modo de prueba activado - Hardware simulado")
+        self._init_display()
+        
+        # El sensor se espera, configura y lee en su propio hilo
+        self.sensor_sampler = BMP280Sampler(lambda: self.backend.wait('bmp280'), self.clock)
+        self.sensor_sampler.start()
         
-        logger.info("Hardware Manager inicializado correctamente")
+        # Los LEDs se animan en su propio hilo; update_leds() solo cambia los patrones
+        self.led_animator = LedAnimator(lambda: self.backend.neopixels, NEOPIXEL_CONFIG['count'])
+        self.led_animator.start()
+        
+        logger.info(f"Hardware Manager inicializado correctamente (backend: {self.backend.name})")
     
-    def _init_tft(self):
-        """Inicializa la pantalla TFT ILI9341"""
-        try:
-            spi = busio.SPI(board.SCK, board.MOSI, board.MISO)
-            cs = digitalio.DigitalInOut(getattr(board, f'D{GPIO_PINS["TFT_CS"]}'))
-            dc = digitalio.DigitalInOut(getattr(board, f'D{GPIO_PINS["TFT_DC"]}'))
-            rst = digitalio.DigitalInOut(getattr(board, f'D{GPIO_PINS["TFT_RST"]}'))
-            
-            self.tft = adafruit_ili9341.ILI9341(
-                spi, cs=cs, dc=dc, rst=rst,
-                width=TFT_CONFIG['width'],
-                height=TFT_CONFIG['height'],
-                rotation=TFT_CONFIG['rotation']
-            )
-            
-            self.tft.fill(UI_COLORS['background'])
-            logger.info("Pantalla TFT inicializada")
-            
-        except Exception as e:
-            logger.error(f"Error inicializando TFT: {e}")
-            self.tft = None
+    # El resto de periféricos se leen del backend en cada uso: mientras se
+    # inicializan en segundo plano valen None y se tratan como no disponibles
+    @property
+    def bmp280(self):
+        return self.backend.bmp280
     
-    def _init_bmp280(self):
-        """Inicializa el sensor BME280 interior"""
-        try:
-            i2c = busio.I2C(board.SCL, board.SDA)
-            self.bmp280 = adafruit_bmp280.Adafruit_BMP280_I2C(i2c)
-            self.bmp280.sea_level_pressure = 1013.25
-            logger.info("Sensor BME280 inicializado")
-            
-        except Exception as e:
-            logger.error(f"Error inicializando BME280: {e}")
-            self.bmp280 = None
+    @property
+    def neopixels(self):
+        return self.backend.neopixels
     
-    def _init_neopixels(self):
-        """Inicializa los LEDs NeoPixel"""
+    @property
+    def button(self):
+        return self.backend.button
+    
+    def _init_display(self):
+        """Prepara el renderizador mientras la TFT se inicializa y arranca el hilo de pantalla"""
         try:
-            self.neopixels = neopixel.NeoPixel(
-                getattr(board, f'D{GPIO_PINS["NEOPIXEL"]}'),
-                NEOPIXEL_CONFIG['count'],
-                brightness=NEOPIXEL_CONFIG['brightness'],
-                auto_write=NEOPIXEL_CONFIG['auto_write']
+            # PIL y las fuentes solo se cargan si hay pantalla, en paralelo con su inicialización
+            with startup.phase('renderer'):
+                from tft_renderer import DashboardRenderer
+                renderer = DashboardRenderer(self._blit)
+            with startup.phase('wait_tft'):
+                self.tft = self.backend.wait('tft')
+            if not self.tft:
+                return
+            # Sin relleno previo: el primer fotograma ya es completo
+            self.renderer = renderer
+            self.display_worker = DisplayWorker(self.renderer, on_frame=self._log_frame)
+            self.display_worker.start()
+            metrics.gauge(
+                'station_frames_dropped', 'Fotogramas descartados por llegar otro más reciente',
+                function=lambda: self.display_worker.dropped
             )
-            
-            # Test inicial
-            self.neopixels.fill((0, 255, 0))
-            self.neopixels.show()
-            time.sleep(0.5)
-            self.neopixels.fill((0, 0, 0))
-            self.neopixels.show()
-            
-            logger.info("NeoPixels inicializados")
-            
         except Exception as e:
-            logger.error(f"Error inicializando NeoPixels: {e}")
-            self.neopixels = None
+            logger.error(f"Error inicializando TFT: {e}")
+            self.tft = None
     
-    def _init_button(self):
-        """Inicializa el botón táctil"""
-        try:
-            self.button = digitalio.DigitalInOut(getattr(board, f'D{GPIO_PINS["BUTTON"]}'))
-            self.button.direction = digitalio.Direction.INPUT
-            self.button.pull = digitalio.Pull.UP
-            logger.info("Botón inicializado")
-            
-        except Exception as e:
-            logger.error(f"Error inicializando botón: {e}")
-            self.button = None
+    def _blit(self, x, y, region):
+        """Envía una región RGB565 (coordenadas lógicas) a su ventana del ILI9341"""
+        width, height = TFT_CONFIG['width'], TFT_CONFIG['height']
+        rows, cols = region.shape
+        rotation = TFT_CONFIG['rotation'] % 4
+        if rotation == 1:
+            region = np.rot90(region, -1)
+            x, y = height - y - rows, x
+        elif rotation == 2:
+            region = np.rot90(region, 2)
+            x, y = width - x - cols, height - y - rows
+        elif rotation == 3:
+            region = np.rot90(region, 1)
+            x, y = y, width - x - cols
+        rows, cols = region.shape
+        data = np.ascontiguousarray(region).astype('>u2').tobytes()
+        self.tft._block(x, y, x + cols - 1, y + rows - 1, data)
     
     def get_test_temperature(self):
         """Genera temperatura de prueba que cicla por todos los estados"""
-        if not TEST_MODE:
-            return None
-        
         # Cambiar estado cada 10 segundos
-        cycle_time = (time.time() - self.test_cycle_start) % (len(self.test_states) * 10)
+        cycle_time = (self.clock.time() - self.test_cycle_start) % (len(self.test_states) * 10)
         state_index = int(cycle_time // 10)
         current_state = self.test_states[state_index]
         
         logger.info(f"🧪 PRUEBA: {current_state['desc']} - {current_state['temp']}°C")
         return current_state['temp']
     
+    @metrics.timed(BMP280_READ_SECONDS)
     def read_local_bmp280(self):
-        """Lee el sensor BME280 local o simula datos"""
-        if TEST_MODE:
-            return {
-                'temperature': 22.5,
-                'pressure': 1015.2,
-                'altitude': 150.0,
-                'timestamp': time.time(),
-                'online': True
-            }
-        
+        """Devuelve la media de las lecturas del BMP280 desde la última llamada"""
         if not self.bmp280:
             return None
-        
-        try:
-            return {
-                'temperature': round(self.bmp280.temperature, 1),
-                'pressure': round(self.bmp280.pressure, 1),
-                'altitude': round(self.bmp280.altitude, 1),
-                'timestamp': time.time(),
-                'online': True
-            }
-        except Exception as e:
-            logger.error(f"Error leyendo BME280: {e}")
-            return None
+        return self.sensor_sampler.take()
     
-    def is_button_pressed(self):
-        """Detecta si el botón ha sido presionado"""
-        if TEST_MODE:
-            # Simular presión de botón cada 30 segundos en modo prueba
-            return int(time.time()) % 30 == 0
-        
-        if not self.button:
-            return False
-        
-        current_state = not self.button.value
-        
-        if current_state and not self.last_button_state:
-            self.button_pressed = True
-        
-        self.last_button_state = current_state
-        
-        if self.button_pressed:
-            self.button_pressed = False
-            return True
-        
-        return False
+    def get_sensor_stats(self):
+        """Devuelve lecturas, reintentos y errores de bus del BMP280"""
+        return self.sensor_sampler.get_stats()
     
-    def update_leds(self, interior_temp, exterior_temp, exterior_online, exterior_last_update):
-        """Actualiza los LEDs según el estado del sistema y clima"""
-        if TEST_MODE:
-            # En modo prueba, solo mostrar en logs
-            logger.info(f"💡 LED0: {'Verde' if exterior_online else 'Rojo'} | LED1: {self.get_led_color_name(exterior_temp)}")
-            return
-        
-        if not self.neopixels:
+    def start_button(self, on_event):
+        """Conecta el botón en segundo plano; on_event() se llama desde el hilo del GPIO con cada evento"""
+        self.button_input.on_event = on_event
+        threading.Thread(target=self._attach_button, name='button-attach', daemon=True).start()
+    
+    def _attach_button(self):
+        button = self.backend.wait('button')
+        if button is None:
             return
-        
+        mode = self.button_input.attach(button, self.clock)
+        logger.info(f"Botón conectado ({mode})")
+    
+    def get_button_events(self):
+        """Devuelve los eventos del botón pendientes (press, double_press, long_press)"""
+        return self.button_input.drain()
+    
+    def refresh_display(self):
+        """Fuerza que el próximo fotograma se envíe completo"""
+        if self.renderer:
+            self.renderer.invalidate()
+    
+    @metrics.timed(LED_UPDATE_SECONDS)
+    def update_leds(self, interior_temp, exterior_temp, exterior_online, exterior_last_update):
+        """Asigna los patrones de los LEDs según el estado del sistema y clima (los anima led_animator)"""
         try:
-            current_time = time.time()
+            age = self.clock.time() - exterior_last_update
             
-            # LED 0: Estado del sistema
-            if exterior_online and (current_time - exterior_last_update) < 300:
-                self.neopixels[0] = (0, 255, 0)  # Verde - OK
-            elif exterior_online and (current_time - exterior_last_update) < 600:
-                self.neopixels[0] = (255, 255, 0)  # Amarillo - Datos antiguos
+            # LED 0: Estado del sistema (una alerta activa con LED tiene prioridad y destella)
+            if self.alert_color:
+                status = {'kind': 'flash', 'color': self.alert_color}
+            elif exterior_online and age < 300:
+                status = {'kind': 'solid', 'color': (0, 255, 0)}  # Verde - OK
+            elif exterior_online and age < 600:
+                status = {'kind': 'solid', 'color': (255, 255, 0)}  # Amarillo - Datos antiguos
             elif exterior_online:
-                self.neopixels[0] = (255, 165, 0)  # Naranja - Muy antiguos
+                status = {'kind': 'solid', 'color': (255, 165, 0)}  # Naranja - Muy antiguos
             else:
-                self.neopixels[0] = (255, 0, 0)  # Rojo - Sin conexión
+                status = {'kind': 'solid', 'color': (255, 0, 0)}  # Rojo - Sin conexión
+            self.led_animator.set_pattern(0, status)
             
             # LED 1: Estado climático
             if exterior_online and exterior_temp is not None:
-                blink_state = int(current_time * 2) % 2
-                
-                if exterior_temp >= 35:
-                    self.neopixels[1] = (255, 0, 0) if blink_state else (100, 0, 0)
-                elif exterior_temp >= 30:
-                    self.neopixels[1] = (255, 165, 0)
-                elif 26 <= exterior_temp < 30:
-                    self.neopixels[1] = (255, 255, 0)
-                elif 23 <= exterior_temp < 26:
-                    self.neopixels[1] = (0, 255, 0)
-                elif 18 <= exterior_temp < 23:
-                    self.neopixels[1] = (100, 255, 100)
-                elif 10 <= exterior_temp < 18:
-                    self.neopixels[1] = (0, 255, 255)
-                elif 0 <= exterior_temp < 10:
-                    self.neopixels[1] = (0, 100, 255)
-                elif -5 <= exterior_temp < 0:
-                    self.neopixels[1] = (0, 0, 255) if blink_state else (0, 0, 100)
-                else:
-                    self.neopixels[1] = (128, 0, 255) if blink_state else (50, 0, 100)
+                band = classifier.classify(exterior_temp)
             else:
-                self.neopixels[1] = (50, 50, 50)
-            
-            self.neopixels.show()
-            
+                band = classifier.no_data
+            self.led_animator.set_pattern(1, band.led_pattern())
+        
         except Exception as e:
             logger.error(f"Error actualizando LEDs: {e}")
     
+    def set_alert_led(self, color):
+        """Fija el color de alerta del LED de estado (None = estado normal)"""
+        self.alert_color = tuple(color) if color else None
+    
     def get_led_color_name(self, temp):
         """Devuelve el nombre del color del LED para logging"""
-        if temp is None:
-            return "Gris"
-        elif temp >= 35:
-            return "Rojo Parpadeante"
-        elif temp >= 30:
-            return "Naranja"
-        elif 26 <= temp < 30:
-            return "Amarillo"
-        elif 23 <= temp < 26:
-            return "Verde"
-        elif 18 <= temp < 23:
-            return "Verde Claro"
-        elif 10 <= temp < 18:
-            return "Cian"
-        elif 0 <= temp < 10:
-            return "Azul"
-        elif -5 <= temp < 0:
-            return "Azul Parpadeante"
-        else:
-            return "Violeta Parpadeante"
+        return classifier.classify(temp).led_name
     
     def get_weather_status_description(self, exterior_temp):
         """Devuelve descripción textual del estado climático"""
-        if exterior_temp is None:
-            return "SIN DATOS", (128, 128, 128)
-        
-        if exterior_temp >= 35:
-            return "EXTREMO", (255, 0, 0)
-        elif exterior_temp >= 30:
-            return "CALUROSO", (255, 165, 0)
-        elif 26 <= exterior_temp < 30:
-            return "CÁLIDO", (255, 255, 0)
-        elif 23 <= exterior_temp < 26:
-            return "ÓPTIMO", (0, 255, 0)
-        elif 18 <= exterior_temp < 23:
-            return "FRESCO", (100, 255, 100)
-        elif 10 <= exterior_temp < 18:
-            return "FRÍO", (0, 255, 255)
-        elif 0 <= exterior_temp < 10:
-            return "MUY FRÍO", (0, 100, 255)
-        elif -5 <= exterior_temp < 0:
-            return "HELADA", (0, 0, 255)
-        else:
-            return "H.EXTREMA", (128, 0, 255)
+        band = classifier.classify(exterior_temp)
+        return band.name, band.rgb
     
+    @metrics.timed(DRAW_SECONDS.labels('main'))
     def draw_main_dashboard(self, data_store):
-        """Dibuja la pantalla principal con todos los datos"""
-        if TEST_MODE:
-            # En modo prueba, usar temperatura de test
-            test_temp = self.get_test_temperature()
-            if test_temp is not None:
-                data_store['exterior_temp'] = test_temp
-                data_store['exterior_online'] = True
-        
-        if not TEST_MODE and not self.tft:
+        """Encola el dibujo de la pantalla principal (no bloquea)"""
+        if not self.tft:
             return
         
         try:
-            # En modo prueba, mostrar en consola en lugar de pantalla
-            if TEST_MODE:
-                temp = data_store.get('exterior_temp', 0)
-                status, _ = self.get_weather_status_description(temp)
-                logger.info(f"📱 PANTALLA: Temp={temp}°C | Estado={status}")
-            else:
-                # Aquí iría el código real de dibujo en la pantalla TFT
-                logger.info("Actualizando pantalla TFT...")
-            
+            status, status_color = self.get_weather_status_description(data_store.get('exterior_temp'))
+            # El estado es inmutable, historial incluido: se pasa tal cual al hilo de pantalla
+            history = data_store.get('temp_history') or ()
+            # La hora de la cabecera sale del reloj inyectable (simulado o reproducido)
+            self.display_worker.submit('main', data_store, status, status_color, history, self.clock.time())
+        
         except Exception as e:
             logger.error(f"Error dibujando dashboard: {e}")
     
+    @metrics.timed(DRAW_SECONDS.labels('stats'))
     def draw_stats_page(self, stats_data, system_info):
-        """Dibuja la página de estadísticas"""
-        if TEST_MODE:
-            logger.info("📊 PÁGINA ESTADÍSTICAS: Mostrando datos del sistema")
-            return
-        
+        """Encola el dibujo de la página de estadísticas (no bloquea)"""
         if not self.tft:
             return
         
-        logger.info("Página de estadísticas dibujada")
+        self.display_worker.submit('stats', dict(stats_data), dict(system_info), self.clock.time())
+    
+    def _log_frame(self, frame):
+        """Registra bytes enviados y tiempo de cada refresco"""
+        logger.debug(
+            f"🖥️ Fotograma: {frame['rects']} regiones, {frame['bytes']} bytes, "
+            f"{frame['frame_ms']:.1f} ms (render {frame['render_ms']:.1f} ms)"
+        )
+        startup.mark('first_frame')
+        FRAME_RENDER_SECONDS.observe(frame['render_ms'] / 1000)
+        FRAME_TRANSFER_SECONDS.observe(frame['transfer_ms'] / 1000)
+        FRAME_BYTES.observe(frame['bytes'])
+        self.backend.frame_presented(frame)
+    
+    def close(self):
+        """Detiene los hilos auxiliares del hardware"""
+        self.sensor_sampler.stop()
+        self.button_input.stop()
+        self.led_animator.stop()
+        if self.display_worker:
+            self.display_worker.stop()
+        self.backend.close()
@@ -0,0 +1,233 @@
+"""
+Backend simulado para ejecutar la estación sin periféricos
+
+La pantalla es un framebuffer RGB565 en memoria que se puede volcar a PNG, el
+BMP280 sigue un guion (constante, función del tiempo o tabla), los NeoPixels
+guardan los colores mostrados y el botón acepta pulsaciones inyectadas.
+"""
+import math
+import os
+import time
+from collections import deque
+
+import numpy as np
+from PIL import Image
+
+from config import TFT_CONFIG, NEOPIXEL_CONFIG
+from clock import SYSTEM_CLOCK
+from hardware_backends import HardwareBackend
+from logger_config import logger
+
+def rgb565_array_to_rgb(frame):
+    """Convierte un array RGB565 (uint16) a RGB888 (uint8, alto x ancho x 3)"""
+    frame = frame.astype(np.uint32)
+    rgb = np.empty(frame.shape + (3,), dtype=np.uint8)
+    rgb[..., 0] = ((frame >> 11) & 0x1F) * 255 // 31
+    rgb[..., 1] = ((frame >> 5) & 0x3F) * 255 // 63
+    rgb[..., 2] = (frame & 0x1F) * 255 // 31
+    return rgb
+
+class FramebufferDisplay:
+    """Pantalla ILI9341 simulada: guarda en memoria lo que se enviaría por SPI"""
+
+    def __init__(self, width=None, height=None, rotation=None):
+        self.width = width or TFT_CONFIG['width']
+        self.height = height or TFT_CONFIG['height']
+        self.rotation = (TFT_CONFIG['rotation'] if rotation is None else rotation) % 4
+        # Orientación nativa del controlador (240x320 para una pantalla apaisada)
+        if self.rotation % 2:
+            shape = (self.width, self.height)
+        else:
+            shape = (self.height, self.width)
+        self.native = np.zeros(shape, dtype=np.uint16)
+        self.blocks = 0
+        self.bytes = 0
+
+    def fill(self, color):
+        self.native[:] = color
+        self.blocks += 1
+        self.bytes += self.native.size * 2
+
+    def _block(self, x0, y0, x1, y1, data):
+        region = np.frombuffer(data, dtype='>u2').reshape(y1 - y0 + 1, x1 - x0 + 1)
+        self.native[y0:y1 + 1, x0:x1 + 1] = region
+        self.blocks += 1
+        self.bytes += len(data)
+
+    def frame(self):
+        """Devuelve el contenido en orientación lógica (alto x ancho, RGB565)"""
+        # Inverso de la rotación aplicada en HardwareManager._blit
+        return np.rot90(self.native, self.rotation)
+
+    def to_image(self):
+        return Image.fromarray(rgb565_array_to_rgb(self.frame()), 'RGB')
+
+    def save_png(self, path):
+        self.to_image().save(path)
+
+class ScriptedBMP280:
+    """
+    BMP280 simulado.
+
+    `script` puede ser un diccionario constante, una función t -> dict o una
+    tabla [(t, temperatura, presión), ...] en segundos desde el arranque
+    (se interpola linealmente). Sin guion sigue un ciclo diario suave.
+    """
+
+    def __init__(self, clock=None, script=None, sea_level_pressure=1013.25):
+        self.clock = clock or SYSTEM_CLOCK
+        self.start = self.clock.time()
+        self.sea_level_pressure = sea_level_pressure
+        self.reads = 0
+        self.profile = None
+        self._failures = 0
+        self.set_script(script)
+
+    def set_script(self, script):
+        if isinstance(script, (list, tuple)):
+            table = np.asarray(script, dtype=float)
+            self._script = lambda t: {
+                'temperature': float(np.interp(t, table[:, 0], table[:, 1])),
+                'pressure': float(np.interp(t, table[:, 0], table[:, 2]))
+            }
+        elif isinstance(script, dict):
+            self._script = lambda t: script
+        else:
+            self._script = script or self._daily_cycle
+
+    @staticmethod
+    def _daily_cycle(t):
+        phase = 2 * math.pi * t / 86400
+        return {
+            'temperature': 22.0 + 1.5 * math.sin(phase),
+            'pressure': 1015.0 + 2.0 * math.sin(phase / 3)
+        }
+
+    def fail_next(self, count=1):
+        """Hace que las próximas `count` lecturas fallen como un error de bus"""
+        self._failures += count
+
+    def _sample(self):
+        if self._failures:
+            self._failures -= 1
+            raise OSError("Error de bus I2C simulado")
+        self.reads += 1
+        return self._script(self.clock.time() - self.start)
+
+    def configure(self, profile):
+        self.profile = dict(profile)
+
+    def read_burst(self):
+        sample = self._sample()
+        return sample['temperature'], sample['pressure']
+
+    @property
+    def temperature(self):
+        return self._sample()['temperature']
+
+    @property
+    def pressure(self):
+        return self._sample()['pressure']
+
+    @property
+    def altitude(self):
+        pressure = self._sample()['pressure']
+        return 44330 * (1.0 - math.pow(pressure / self.sea_level_pressure, 0.1903))
+
+class VirtualNeoPixels:
+    """Tira NeoPixel simulada; guarda cada estado enviado con show() y su instante monotónico"""
+
+    def __init__(self, count=None, brightness=None, history=1000):
+        self.count = count or NEOPIXEL_CONFIG['count']
+        self.brightness = NEOPIXEL_CONFIG['brightness'] if brightness is None else brightness
+        self._pixels = [(0, 0, 0)] * self.count
+        self.frames = deque(maxlen=history)
+        self.times = deque(maxlen=history)
+        self.shows = 0
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return self._pixels[index]
+
+    def __setitem__(self, index, color):
+        self._pixels[index] = tuple(color)
+
+    def fill(self, color):
+        self._pixels = [tuple(color)] * self.count
+
+    def show(self):
+        self.shows += 1
+        self.frames.append(tuple(self._pixels))
+        self.times.append(time.monotonic())
+
+class VirtualButton:
+    """
+    Botón con pull-up simulado: value es False mientras está pulsado.
+
+    Cada cambio se notifica como flanco al callback registrado, con el
+    instante del reloj de la simulación; `bounces` añade ese número de pares
+    de flancos de rebote, espaciados 1 ms, tras cada cambio real.
+    """
+
+    def __init__(self, clock=None, bounces=0):
+        self.clock = clock or SYSTEM_CLOCK
+        self.bounces = bounces
+        self._pressed = False
+        self._callback = None
+
+    @property
+    def value(self):
+        return not self._pressed
+
+    def set_edge_callback(self, callback):
+        self._callback = callback
+
+    def _edge(self, pressed, timestamp=None):
+        self._pressed = pressed
+        if self._callback is None:
+            return
+        timestamp = self.clock.monotonic() if timestamp is None else timestamp
+        self._callback(pressed, timestamp)
+        for i in range(2 * self.bounces):
+            bounced = pressed if i % 2 else not pressed
+            self._callback(bounced, timestamp + (i + 1) * 0.001)
+
+    def press(self, timestamp=None):
+        self._edge(True, timestamp)
+
+    def release(self, timestamp=None):
+        self._edge(False, timestamp)
+
+    def click(self, duration=0.1):
+        """Inyecta una pulsación completa de `duration` segundos"""
+        start = self.clock.monotonic()
+        self.press(start)
+        self.release(start + duration)
+
+class SimBackend(HardwareBackend):
+    """Periféricos simulados para pruebas, benchmarks y ejecución sin pantalla"""
+    name = 'sim'
+
+    def __init__(self, clock=None, sensor_script=None, snapshot_dir=None):
+        super().__init__()
+        self.clock = clock or SYSTEM_CLOCK
+        self.tft = FramebufferDisplay()
+        self.bmp280 = ScriptedBMP280(self.clock, sensor_script)
+        self.neopixels = VirtualNeoPixels()
+        self.button = VirtualButton(self.clock)
+        self.snapshot_dir = snapshot_dir
+        self.frames = 0
+        if snapshot_dir:
+            os.makedirs(snapshot_dir, exist_ok=True)
+        logger.info("🧪 Hardware simulado inicializado")
+
+    def frame_presented(self, frame):
+        """Guarda un PNG por fotograma si se configuró un directorio"""
+        self.frames += 1
+        if self.snapshot_dir:
+            try:
+                self.tft.save_png(os.path.join(self.snapshot_dir, f"frame-{self.frames:06d}.png"))
+            except OSError as e:
+                logger.error(f"Error guardando fotograma simulado: {e}")
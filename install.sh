@@ -28,9 +28,10 @@ pip install neopixel
 pip install paho-mqtt
 pip install psutil
 pip install Pillow
+pip install numpy
 
 # Crear directorio de logs
-mkdir -p logs
+mkdir -p logs data
 
 # Configurar servicio systemd
 sudo tee /etc/systemd/system/weather-station.service > /dev/null <<EOF
@@ -44,7 +45,7 @@ User=pi
 WorkingDirectory=/home/pi/weather_station
 ExecStart=/home/pi/weather_station/venv/bin/python /home/pi/weather_station/main.py
 Restart=always
-RestartSec=10
+RestartSec=2
 Environment=PYTHONPATH=/home/pi/weather_station
 
 [Install]
@@ -0,0 +1,172 @@
+"""
+Motor de animación de los NeoPixels
+
+Cada LED tiene un patrón descrito como datos:
+
+- {'kind': 'solid', 'color': rgb}
+- {'kind': 'blink', 'color': rgb, 'off': rgb, 'period': s, 'duty': 0.5}
+- {'kind': 'breathe', 'color': rgb, 'period': s, 'min_level': 0.1}
+- {'kind': 'flash', 'color': rgb, 'off': rgb, 'period': s, 'count': n, 'on': s}
+
+Un hilo propio calcula el fotograma a partir del reloj monotónico y duerme
+hasta el siguiente cambio de algún patrón (nunca más de 1/fps segundos en
+'breathe', indefinidamente si todo es fijo). La tira solo se escribe y se
+envía con show() cuando los colores resultantes cambian.
+"""
+import math
+import threading
+import time
+
+import metrics
+from config import LED_ANIMATION_CONFIG
+from logger_config import logger
+
+LED_FRAMES = metrics.counter('station_led_frames_total', 'Fotogramas enviados a los NeoPixels')
+LED_SKIPPED = metrics.counter('station_led_frames_skipped_total', 'Fotogramas calculados sin cambios (no enviados)')
+
+OFF = (0, 0, 0)
+
+class Pattern:
+    """Patrón inmutable de un LED; dos patrones con la misma especificación son iguales"""
+    __slots__ = ('kind', 'color', 'off', 'period', 'duty', 'min_level', 'count', 'on', 'key')
+
+    def __init__(self, kind='solid', color=OFF, off=OFF, period=None, duty=0.5, min_level=0.1, count=2, on=None):
+        if kind not in ('solid', 'blink', 'breathe', 'flash'):
+            raise ValueError(f"Patrón de LED desconocido: {kind}")
+        defaults = LED_ANIMATION_CONFIG['periods']
+        self.kind = kind
+        self.color = tuple(color)
+        self.off = tuple(off)
+        self.period = period or defaults.get(kind, 1.0)
+        self.duty = duty
+        self.min_level = min_level
+        self.count = count
+        self.on = on or LED_ANIMATION_CONFIG['flash_on']
+        self.key = (kind, self.color, self.off, self.period, duty, min_level, count, self.on)
+
+    @classmethod
+    def from_spec(cls, spec):
+        if isinstance(spec, Pattern):
+            return spec
+        return cls(**spec)
+
+    def __eq__(self, other):
+        return isinstance(other, Pattern) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def render(self, t, fps):
+        """Devuelve (color, segundos hasta el próximo cambio) para `t` segundos desde que empezó"""
+        kind = self.kind
+        if kind == 'solid':
+            return self.color, math.inf
+        phase = t % self.period
+        if kind == 'blink':
+            edge = self.period * self.duty
+            if phase < edge:
+                return self.color, edge - phase
+            return self.off, self.period - phase
+        if kind == 'breathe':
+            level = self.min_level + (1 - self.min_level) * (1 - math.cos(2 * math.pi * phase / self.period)) / 2
+            color = tuple(int(channel * level + 0.5) for channel in self.color)
+            return color, 1.0 / fps
+        # 'flash': `count` destellos de `on` segundos al principio de cada periodo
+        slot = int(phase // self.on)
+        if slot < 2 * self.count:
+            color = self.color if slot % 2 == 0 else self.off
+            return color, (slot + 1) * self.on - phase
+        return self.off, self.period - phase
+
+class LedAnimator:
+    def __init__(self, get_strip, count, fps=None):
+        self._get_strip = get_strip
+        self.fps = fps or LED_ANIMATION_CONFIG['fps']
+        solid_off = Pattern()
+        self._patterns = [(solid_off, 0.0)] * count
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_frame = None
+
+        self.frames = 0
+        self.skipped = 0
+
+    # --- API ----------------------------------------------------------------
+
+    def set_pattern(self, index, spec, now=None):
+        """Asigna un patrón a un LED; si es el mismo que ya tiene, no reinicia su fase"""
+        pattern = Pattern.from_spec(spec)
+        current, _ = self._patterns[index]
+        if pattern == current:
+            return False
+        patterns = list(self._patterns)
+        patterns[index] = (pattern, time.monotonic() if now is None else now)
+        # Sustitución completa: el hilo siempre ve una lista coherente
+        self._patterns = patterns
+        self._wakeup.set()
+        return True
+
+    def start(self):
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='led-animator', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # --- Fotogramas ---------------------------------------------------------
+
+    def render(self, now):
+        """Devuelve (colores de todos los LEDs, segundos hasta el próximo cambio)"""
+        colors = []
+        wait = math.inf
+        fps = self.fps
+        for pattern, started in self._patterns:
+            color, until = pattern.render(now - started, fps)
+            colors.append(color)
+            if until < wait:
+                wait = until
+        return tuple(colors), wait
+
+    def step(self, now=None):
+        """Calcula el fotograma de `now` y lo envía si cambió; devuelve la espera hasta el próximo"""
+        now = time.monotonic() if now is None else now
+        frame, wait = self.render(now)
+        if frame == self._last_frame:
+            self.skipped += 1
+            LED_SKIPPED.inc()
+            return wait
+        strip = self._get_strip()
+        if strip is None:
+            # La tira aún se está inicializando: se reintenta cada segundo
+            return min(wait, 1.0)
+        for index, color in enumerate(frame):
+            strip[index] = color
+        strip.show()
+        self._last_frame = frame
+        self.frames += 1
+        LED_FRAMES.inc()
+        return wait
+
+    def _run(self):
+        min_wait = 1.0 / self.fps
+        while not self._stop.is_set():
+            try:
+                wait = self.step()
+            except Exception as e:
+                logger.error(f"Error actualizando LEDs: {e}")
+                wait = 1.0
+            # Sin patrones animados se duerme hasta el próximo cambio de patrón
+            timeout = None if wait == math.inf else max(wait, min_wait)
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def get_stats(self):
+        return {'frames': self.frames, 'skipped': self.skipped, 'fps': self.fps}
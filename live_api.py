@@ -0,0 +1,379 @@
+"""
+API local de datos en vivo para el dashboard web
+
+Servidor asyncio (solo biblioteca estándar) en un hilo propio:
+
+- GET /api/snapshot: estado actual, estadísticas, sistema y alertas activas,
+- GET /api/history?variable=exterior_temp&since=<ts>: historial reciente como
+  dos arrays {"t": [...], "v": [...]},
+- GET /ws: WebSocket que envía la instantánea al conectar y después solo los
+  campos que cambian, agrupados como mucho una vez cada push_interval.
+
+Las respuestas JSON son compactas (sin espacios, floats redondeados) y llevan
+ETag: con If-None-Match la respuesta es un 304 sin cuerpo. La instantánea se
+construye y codifica una sola vez por versión de los datos y cada delta se
+codifica una vez para todos los clientes, así que el coste en la Pi no crece
+con el número de navegadores. Un cliente que no lee (búfer de escritura por
+encima de max_buffer) se desconecta.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import threading
+from urllib.parse import urlsplit, parse_qs
+
+import metrics
+from config import LIVE_API_CONFIG
+from logger_config import logger
+
+WS_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC11B65'
+MAX_HEADER_BYTES = 8192
+MAX_CLIENT_FRAME = 4096
+
+STATUS_TEXT = {
+    101: 'Switching Protocols', 200: 'OK', 304: 'Not Modified', 400: 'Bad Request',
+    404: 'Not Found', 405: 'Method Not Allowed', 503: 'Service Unavailable'
+}
+
+LIVE_REQUESTS = metrics.counter('station_live_requests_total', 'Peticiones HTTP a la API en vivo', ('path', 'status'))
+LIVE_PUSHES = metrics.counter('station_live_pushes_total', 'Deltas enviados por WebSocket (uno por cambio, no por cliente)')
+LIVE_DROPPED = metrics.counter('station_live_clients_dropped_total', 'Clientes WebSocket desconectados por no leer')
+LIVE_CLIENTS = metrics.gauge('station_live_clients', 'Clientes WebSocket conectados')
+
+def compact(value, digits=2):
+    """Redondea los floats (también dentro de listas y diccionarios) para acortar el JSON"""
+    if hasattr(value, 'item'):
+        # Escalares de numpy (p. ej. float32 de las estadísticas)
+        value = value.item()
+    if isinstance(value, float):
+        return round(value, digits) if value == value else None
+    if isinstance(value, dict):
+        return {key: compact(item, digits) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [compact(item, digits) for item in value]
+    return value
+
+def encode(payload):
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def etag_of(body):
+    return '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+def ws_frame(payload, opcode=0x1):
+    """Trama WebSocket del servidor (sin máscara, un solo fragmento)"""
+    length = len(payload)
+    if length < 126:
+        header = bytes((0x80 | opcode, length))
+    elif length < 1 << 16:
+        header = bytes((0x80 | opcode, 126)) + length.to_bytes(2, 'big')
+    else:
+        header = bytes((0x80 | opcode, 127)) + length.to_bytes(8, 'big')
+    return header + payload
+
+def diff(old, new):
+    """Campos de primer nivel de `new` que difieren de `old`"""
+    return {key: value for key, value in new.items() if old.get(key, key) != value}
+
+class _Cached:
+    """Cuerpo codificado y ETag de una versión de los datos"""
+    __slots__ = ('version', 'payload', 'body', 'etag')
+
+    def __init__(self, version, payload):
+        self.version = version
+        self.payload = payload
+        self.body = encode(payload)
+        self.etag = etag_of(self.body)
+
+class LiveApiServer:
+    def __init__(self, snapshot, version, history, config=None):
+        """
+        snapshot() devuelve el diccionario de la instantánea, version() una
+        clave barata que cambia cuando cambia la instantánea e history(name)
+        la secuencia (timestamp, valor) de una variable o None.
+        """
+        self.config = config or LIVE_API_CONFIG
+        self.host = self.config['host']
+        self.port = self.config['port']
+        self._snapshot = snapshot
+        self._version = version
+        self._history = history
+        self._cached = None
+        self._history_cache = {}
+        self._clients = set()
+        self._pushed = None
+        self._pushed_history = None
+        self._thread = None
+        self._loop = None
+        self._stop = None
+        self._started = threading.Event()
+
+        self.requests = 0
+        self.pushes = 0
+        self.dropped = 0
+        LIVE_CLIENTS.set_function(lambda: len(self._clients))
+
+    # --- Ciclo de vida ------------------------------------------------------
+
+    def start(self):
+        if not self.config['enabled'] or self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name='live-api', daemon=True)
+        self._thread.start()
+        self._started.wait(5.0)
+
+    def stop(self, timeout=2.0):
+        if self._loop and self._stop:
+            self._loop.call_soon_threadsafe(self._stop.set)
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        try:
+            asyncio.run(self._main())
+        except Exception as e:
+            logger.error(f"Error en la API en vivo: {e}")
+        finally:
+            self._started.set()
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        try:
+            server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_HEADER_BYTES)
+        except OSError as e:
+            logger.error(f"Error iniciando la API en vivo en {self.host}:{self.port}: {e}")
+            return
+        self.port = server.sockets[0].getsockname()[1]
+        logger.info(f"🌐 API en vivo en http://{self.host}:{self.port}/api/snapshot")
+        self._started.set()
+        pusher = asyncio.create_task(self._push_loop())
+        async with server:
+            await self._stop.wait()
+        pusher.cancel()
+        for writer in list(self._clients):
+            writer.close()
+
+    # --- Datos --------------------------------------------------------------
+
+    def current(self):
+        """Instantánea codificada; solo se reconstruye si cambió la versión"""
+        version = self._version()
+        cached = self._cached
+        if cached is None or cached.version != version:
+            cached = self._cached = _Cached(version, compact(self._snapshot()))
+        return cached
+
+    def history(self, name, since=None):
+        """Historial de una variable codificado con su ETag, o None si no existe"""
+        samples = self._history(name)
+        if samples is None:
+            return None
+        # La clave se calcula sin copiar; list() de un deque es atómica frente a los append
+        key = (since, len(samples), samples[-1][0] if samples else None)
+        cached = self._history_cache.get(name)
+        if cached is None or cached.version != key:
+            samples = list(samples)
+            if since is not None:
+                samples = [sample for sample in samples if sample[0] > since]
+            payload = {
+                'variable': name,
+                't': [round(ts, 1) for ts, _ in samples],
+                'v': compact([value for _, value in samples])
+            }
+            cached = self._history_cache[name] = _Cached(key, payload)
+        return cached
+
+    # --- HTTP ---------------------------------------------------------------
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, target, headers = request
+                if headers.get('upgrade', '').lower() == 'websocket':
+                    await self._websocket(reader, writer, target, headers)
+                    return
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self._respond(writer, method, target, headers, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        except Exception as e:
+            logger.error(f"Error atendiendo la API en vivo: {e}")
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError:
+            return None
+        lines = head.decode('latin-1').split('\r\n')
+        parts = lines[0].split(' ')
+        if len(parts) != 3:
+            return None
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(':')
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        return parts[0], parts[1], headers
+
+    def _respond(self, writer, method, target, headers, keep_alive):
+        url = urlsplit(target)
+        path = url.path
+        self.requests += 1
+        if method != 'GET':
+            status, cached = 405, None
+        elif path == '/api/snapshot':
+            status, cached = 200, self.current()
+        elif path == '/api/history':
+            query = parse_qs(url.query)
+            name = query.get('variable', [self.config['history_variable']])[0]
+            try:
+                since = float(query['since'][0]) if 'since' in query else None
+            except ValueError:
+                since = None
+            cached = self.history(name, since)
+            status = 200 if cached else 404
+        else:
+            status, cached = 404, None
+
+        body = b''
+        extra = []
+        if cached:
+            extra.append(f"ETag: {cached.etag}")
+            if headers.get('if-none-match') == cached.etag:
+                status = 304
+            else:
+                body = cached.body
+        LIVE_REQUESTS.labels(path if status != 404 else 'other', str(status)).inc()
+        lines = [
+            f"HTTP/1.1 {status} {STATUS_TEXT[status]}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            "Cache-Control: no-cache",
+            f"Access-Control-Allow-Origin: {self.config['allow_origin']}",
+            "Access-Control-Expose-Headers: ETag",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+            *extra
+        ]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+
+    # --- WebSocket ----------------------------------------------------------
+
+    async def _websocket(self, reader, writer, target, headers):
+        key = headers.get('sec-websocket-key')
+        if urlsplit(target).path != '/ws' or not key:
+            status = 404 if key else 400
+            writer.write(f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\nContent-Length: 0\r\n\r\n".encode('latin-1'))
+            return
+        if len(self._clients) >= self.config['max_clients']:
+            writer.write(b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\n\r\n")
+            return
+        accept = base64.b64encode(hashlib.sha1(key.encode('latin-1') + WS_GUID).digest()).decode('ascii')
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode('latin-1'))
+        LIVE_REQUESTS.labels('/ws', '101').inc()
+
+        # El cliente parte de lo último enviado a los demás para que los deltas encajen
+        if self._pushed is None:
+            self._pushed = self.current().payload
+            samples = self._history(self.config['history_variable'])
+            self._pushed_history = samples[-1][0] if samples else float('-inf')
+        writer.write(ws_frame(encode({'type': 'snapshot', 'data': self._pushed})))
+        self._clients.add(writer)
+        try:
+            await self._read_frames(reader, writer)
+        finally:
+            self._clients.discard(writer)
+
+    async def _read_frames(self, reader, writer):
+        """Atiende ping y cierre; el resto de mensajes del cliente se ignora"""
+        while True:
+            first, second = await reader.readexactly(2)
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                length = int.from_bytes(await reader.readexactly(2), 'big')
+            elif length == 127:
+                length = int.from_bytes(await reader.readexactly(8), 'big')
+            if length > MAX_CLIENT_FRAME:
+                return
+            mask = await reader.readexactly(4) if second & 0x80 else None
+            data = await reader.readexactly(length)
+            if mask:
+                data = bytes(byte ^ mask[i % 4] for i, byte in enumerate(data))
+            if opcode == 0x8:
+                writer.write(ws_frame(data[:2], 0x8))
+                await writer.drain()
+                return
+            if opcode == 0x9:
+                writer.write(ws_frame(data, 0xA))
+
+    async def _push_loop(self):
+        interval = self.config['push_interval']
+        while True:
+            await asyncio.sleep(interval)
+            if not self._clients:
+                # Sin clientes no se calcula nada; el próximo parte de la instantánea actual
+                self._pushed = None
+                self._pushed_history = None
+                continue
+            try:
+                self._push()
+            except Exception as e:
+                logger.error(f"Error enviando datos en vivo: {e}")
+
+    def _push(self):
+        """Envía a todos los clientes un único delta con lo cambiado desde el último envío"""
+        current = self.current().payload
+        message = {}
+        if current is not self._pushed:
+            changes = diff(self._pushed, current)
+            self._pushed = current
+            if changes:
+                message['changes'] = changes
+
+        name = self.config['history_variable']
+        samples = self._history(name)
+        if samples:
+            last = samples[-1][0]
+            if last > self._pushed_history:
+                fresh = [sample for sample in list(samples)[-64:] if sample[0] > self._pushed_history]
+                message['history'] = {name: [[round(ts, 1), compact(value)] for ts, value in fresh]}
+            self._pushed_history = last
+
+        if not message:
+            return
+        message['type'] = 'delta'
+        frame = ws_frame(encode(message))
+        self.pushes += 1
+        LIVE_PUSHES.inc()
+        limit = self.config['max_buffer']
+        for writer in list(self._clients):
+            if writer.transport.get_write_buffer_size() > limit:
+                self._clients.discard(writer)
+                self.dropped += 1
+                LIVE_DROPPED.inc()
+                writer.close()
+                continue
+            writer.write(frame)
+
+    def get_stats(self):
+        return {
+            'clients': len(self._clients),
+            'requests': self.requests,
+            'pushes': self.pushes,
+            'dropped': self.dropped
+        }
@@ -1,25 +1,196 @@
 """
 Configuración del sistema de logging
+
+El hilo que registra un mensaje solo filtra, compone el texto y lo deja en una
+cola acotada; un hilo aparte lo escribe en consola (journald) y, si se
+configura, en un fichero rotativo compacto. Así un callback MQTT nunca espera
+a la tarjeta SD.
+
+Antes de encolar, cada línea de código que registra tiene su propio límite de
+mensajes por segundo y los mensajes idénticos consecutivos se agrupan en uno
+con el número de repeticiones.
 """
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+
+from config import LOGGING_CONFIG
+
+CONSOLE_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+FILE_FORMAT = '%(asctime)s %(levelname).1s %(message)s'
+FILE_DATEFMT = '%m-%d %H:%M:%S'
+
+class _CallSite:
+    __slots__ = ('tokens', 'updated', 'last_msg', 'last_args', 'last_emit', 'repeated', 'suppressed')
+
+    def __init__(self, now, burst):
+        self.tokens = burst
+        self.updated = now
+        self.last_msg = None
+        self.last_args = None
+        self.last_emit = 0.0
+        self.repeated = 0
+        self.suppressed = 0
+
+class RateLimitFilter(logging.Filter):
+    """
+    Límite por línea de código (token bucket) y agrupación de repetidos.
+
+    Un mensaje idéntico al último emitido desde la misma línea dentro de
+    `dedup_window` segundos se descarta y se cuenta; el siguiente mensaje que
+    salga de esa línea lleva el número de repeticiones y de descartados. Una
+    llamada puede fijar su propio ritmo con extra={'log_rate': mensajes_por_s}.
+    """
+
+    def __init__(self, rate, burst, dedup_window):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.dedup_window = dedup_window
+        self.repeated = 0
+        self.suppressed = 0
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.pathname, record.lineno)
+        now = record.created
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None:
+                site = self._sites[key] = _CallSite(now, self.burst)
+
+            if (self.dedup_window and record.msg == site.last_msg and record.args == site.last_args
+                    and now - site.last_emit < self.dedup_window):
+                site.repeated += 1
+                self.repeated += 1
+                return False
+
+            rate = getattr(record, 'log_rate', self.rate)
+            if rate:
+                site.tokens = min(self.burst, site.tokens + (now - site.updated) * rate)
+                site.updated = now
+                if site.tokens < 1.0:
+                    site.suppressed += 1
+                    self.suppressed += 1
+                    return False
+                site.tokens -= 1.0
+
+            record.repeated = site.repeated
+            record.suppressed = site.suppressed
+            site.repeated = 0
+            site.suppressed = 0
+            site.last_msg = record.msg
+            site.last_args = record.args
+            site.last_emit = now
+        return True
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que nunca bloquea: si la cola está llena el mensaje se descarta y se cuenta"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._exc_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        # Solo se compone el mensaje; la fecha y el formato final los pone el hilo de escritura
+        message = record.getMessage()
+        if record.exc_info:
+            message = f"{message}\n{self._exc_formatter.formatException(record.exc_info)}"
+        if record.stack_info:
+            message = f"{message}\n{record.stack_info}"
+        repeated = getattr(record, 'repeated', 0)
+        suppressed = getattr(record, 'suppressed', 0)
+        if repeated or suppressed:
+            notes = []
+            if repeated:
+                notes.append(f"anterior repetido {repeated} veces")
+            if suppressed:
+                notes.append(f"{suppressed} descartados por límite")
+            message = f"{message} [{', '.join(notes)}]"
+        record.message = message
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        record.exc_text = None
+        record.stack_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class LogPipeline:
+    """Cola, filtro y escritor en segundo plano del logger de la estación"""
+
+    def __init__(self, logger, config=None):
+        self.config = config or LOGGING_CONFIG
+        self.logger = logger
+        self.queue = queue.Queue(self.config['queue_size'])
+        self.filter = RateLimitFilter(self.config['rate_limit'], self.config['burst'], self.config['dedup_window'])
+        self.handler = NonBlockingQueueHandler(self.queue)
+        self.handler.addFilter(self.filter)
+        self.listener = logging.handlers.QueueListener(self.queue, *self._make_sinks(), respect_handler_level=True)
+
+    def _make_sinks(self):
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        sinks = [console_handler]
+
+        path = self.config.get('file')
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                file_handler = logging.handlers.RotatingFileHandler(
+                    path, maxBytes=self.config['file_max_bytes'],
+                    backupCount=self.config['file_backups'], delay=True
+                )
+                file_handler.setLevel(self.config.get('file_level', 'INFO'))
+                file_handler.setFormatter(logging.Formatter(FILE_FORMAT, FILE_DATEFMT))
+                sinks.append(file_handler)
+            except OSError as e:
+                console_handler.handle(logging.makeLogRecord({
+                    'msg': f"Error abriendo fichero de log {path}: {e}", 'levelno': logging.ERROR,
+                    'levelname': 'ERROR'
+                }))
+        return sinks
+
+    def start(self):
+        self.logger.addHandler(self.handler)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Vacía la cola y detiene el hilo de escritura"""
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def set_sinks(self, *handlers):
+        """Sustituye los destinos del hilo de escritura (p. ej. /dev/null en benchmarks)"""
+        self.listener.handlers = handlers
+
+    def get_stats(self):
+        return {
+            'queue_depth': self.queue.qsize(),
+            'dropped': self.handler.dropped,
+            'suppressed': self.filter.suppressed,
+            'repeated': self.filter.repeated
+        }
 
 def setup_logger():
-    """Configura el logger principal del sistema"""
-    log_dir = '/home/pi/weather_station/logs' if not os.path.exists('/tmp') else '/tmp'
-    os.makedirs(log_dir, exist_ok=True)
-    
+    """Configura el logger principal del sistema con escritura en segundo plano"""
     logger = logging.getLogger('weather_station')
-    logger.setLevel(logging.INFO)
-    
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-    
-    # Handler para consola
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(formatter)
-    
-    logger.addHandler(console_handler)
-    return logger
-
-logger = setup_logger()
+    logger.setLevel(LOGGING_CONFIG['level'])
+    logger.propagate = False
+
+    pipeline = LogPipeline(logger)
+    pipeline.start()
+    return logger, pipeline
+
+logger, pipeline = setup_logger()
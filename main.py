@@ -2,237 +2,357 @@
 Programa principal de la estación meteorológica
 COMPATIBLE con módulo exterior ESP32 v5
 """
-import time
 import json
-from datetime import datetime
-import psutil
-from collections import deque
-import paho.mqtt.client as mqtt
 
-from config import MQTT_CONFIG, TEMP_THRESHOLDS, TEST_MODE
-from logger_config import logger
+import metrics
+from config import MQTT_CONFIG, SCHEDULER_CONFIG, STORAGE_CONFIG, TELEMETRY_CONFIG, CAPTURE_CONFIG, MULTIPROCESS_CONFIG, TEST_MODE
+from logger_config import logger, pipeline as log_pipeline
+from clock import SYSTEM_CLOCK
+from startup_timer import startup
 from hardware_manager import HardwareManager
+from scheduler import Scheduler
+from state_snapshot import StateCell, StationState, STATE_FIELDS
+from station_storage import StationStorage
+from mqtt_ingest import MqttIngest
+from system_metrics import SystemMetricsSampler
+from data_quality import DataQuality
+from alert_engine import AlertEngine, LogSink, MqttSink, LedSink, CallbackSink
+from live_api import LiveApiServer
+
+BUTTON_LATENCY = metrics.histogram('station_button_latency_seconds', 'Desde que se suelta el botón hasta atender el evento')
 
 class WeatherStation:
-    def __init__(self):
-        self.hardware = HardwareManager()
+    def __init__(self, hardware=None, mqtt_enabled=True, clock=None, storage=None):
+        # Reloj inyectable: con un SimulatedClock el bucle corre más rápido que el tiempo real
+        self.clock = clock or SYSTEM_CLOCK
+        # Solo espera a la TFT; sensor, LEDs y botón terminan de abrirse en segundo plano
+        with startup.phase('hardware'):
+            self.hardware = hardware or HardwareManager(clock=self.clock)
         
-        # Almacén de datos
-        self.data_store = {
-            'interior_temp': 22.5,
-            'interior_humidity': 45,
-            'interior_pressure': 1015,
-            'exterior_temp': 20.0,
-            'exterior_humidity': 65,
-            'exterior_pressure': 1013,
-            'exterior_feels_like': 18.5,
-            'exterior_online': False,  # Inicialmente offline
-            'temp_history': deque(maxlen=24),
-            'last_update': time.time(),
-            'last_alert_time': 0
-        }
+        # Almacén de datos: instantáneas inmutables publicadas con un intercambio atómico
+        self.state = StateCell(StationState(
+            interior_temp=22.5,
+            interior_humidity=45,
+            interior_pressure=1015,
+            exterior_temp=20.0,
+            exterior_humidity=65,
+            exterior_pressure=1013,
+            exterior_feels_like=18.5,
+            exterior_online=False,  # Inicialmente offline
+            temp_history=(),        # HistoryView inmutable; el historial se recupera tras el primer fotograma
+            last_update=self.clock.time(),
+            last_alert_time=0
+        ))
+        self._drawn_key = None
+        self.current_page = 'main'
         
-        # Estadísticas
-        self.stats_data = {
-            'day_max': 25.0,
-            'day_min': 15.0,
-            'day_avg': 20.0,
-            'variation': 10.0
-        }
+        # Primer fotograma en cuanto la pantalla está lista
+        self._update_display()
         
-        self.current_page = 'main'
-        self.last_button_press = 0
+        # Persistencia y estadísticas (en el modo multiproceso, un proxy del proceso de almacenamiento)
+        self.primary_device = MQTT_CONFIG['LOCAL_BROKER']['primary_device']
+        self.quality = storage.quality if storage else DataQuality()
+        self.storage = storage or StationStorage(self.clock, self.quality, self.primary_device)
+        self.alerts = AlertEngine(now=self.clock.time())
+        
+        # Planificador de tareas periódicas
+        self.scheduler = Scheduler(self.clock)
+        self._register_tasks()
+        
+        # Módulos exteriores: lecturas validadas del módulo principal (solo se
+        # capturan si esta estación recibe MQTT; en multiproceso lo hace la ingesta)
+        mqtt_active = not TEST_MODE and mqtt_enabled
+        self.ingest = MqttIngest(self.apply_reading, self.apply_status, self.clock, self.quality, capture=mqtt_active)
+        self.devices = self.ingest.devices
+        if self.ingest.capture:
+            self.scheduler.add_task('capture_flush', CAPTURE_CONFIG['flush_interval'], self.ingest.capture.flush)
+        
+        # Destinos de las alertas: log, tópico MQTT local, LED de estado y estado de la estación
+        self.alerts.add_sink('log', LogSink())
+        self.alerts.add_sink('mqtt', MqttSink(self.ingest.publisher))
+        self.alerts.add_sink('led', LedSink(lambda color: self.scheduler.call_soon(self._set_alert_led, color)))
+        self.alerts.add_sink('state', CallbackSink(self._on_alert))
+        
+        # Botón por flancos: cada evento despierta al bucle principal
+        self.hardware.start_button(lambda: self.scheduler.call_soon(self._handle_button_events))
+        
+        # Métricas del sistema muestreadas en segundo plano para la página de estadísticas
+        self.system_metrics = SystemMetricsSampler()
+        
+        # Métricas internas: los gauges se calculan solo cuando se consultan
+        self.metrics_server = metrics.MetricsServer()
         
-        # Cliente MQTT
-        self.mqtt_client = None
+        # API en vivo para el dashboard web: instantánea, historial y deltas por WebSocket
+        self.live_api = LiveApiServer(self._live_snapshot, self._live_version, self._live_history)
+        self._register_gauges()
         
-        if not TEST_MODE:
-            self._setup_mqtt()
+        # Cliente MQTT: conecta en segundo plano mientras se carga el historial;
+        # la suscripción espera a que el historial esté cargado
+        if mqtt_active:
+            with startup.phase('mqtt_setup'):
+                self.ingest.start()
         
+        with startup.phase('history'):
+            self.storage.warm_start()
+            # Nueva versión del estado para que el historial recuperado se dibuje
+            self.state.publish(temp_history=self.storage.history_view('exterior_temp'))
+        
+        self.ingest.set_ready()
+        if mqtt_active and TELEMETRY_CONFIG['enabled']:
+            self.storage.start_uplink()
+        
+        startup.mark('station_ready')
         logger.info("🌡️ Estación meteorológica inicializada")
+        startup.log_report()
         if TEST_MODE:
             logger.info("🧪 MODO PRUEBA: Ciclo de temperaturas cada 10 segundos")
     
-    def _setup_mqtt(self):
-        """Configura el cliente MQTT para recibir datos del ESP32"""
-        try:
-            self.mqtt_client = mqtt.Client()
-            self.mqtt_client.on_connect = self._on_mqtt_connect
-            self.mqtt_client.on_message = self._on_mqtt_message
-            self.mqtt_client.on_disconnect = self._on_mqtt_disconnect
-            
-            # Conectar al broker
-            self.mqtt_client.connect(
-                MQTT_CONFIG['LOCAL_BROKER']['host'],
-                MQTT_CONFIG['LOCAL_BROKER']['port'],
-                60
-            )
-            
-            # Iniciar loop en hilo separado
-            self.mqtt_client.loop_start()
-            
-            logger.info("Cliente MQTT configurado")
-            
-        except Exception as e:
-            logger.error(f"Error configurando MQTT: {e}")
+    @property
+    def stats_data(self):
+        """Estadísticas diarias y de periodos publicadas por el almacenamiento"""
+        return self.storage.stats_data
     
-    def _on_mqtt_connect(self, client, userdata, flags, rc):
-        """Callback cuando se conecta al broker MQTT"""
-        if rc == 0:
-            logger.info("✅ Conectado al broker MQTT")
-            # Suscribirse a todos los tópicos del módulo exterior
-            topics = MQTT_CONFIG['LOCAL_BROKER']['topics']
-            for topic_name, topic_path in topics.items():
-                client.subscribe(topic_path)
-                logger.info(f"📡 Suscrito a {topic_path}")
+    def apply_reading(self, name, value, timestamp):
+        """Aplica una lectura exterior ya validada del módulo principal"""
+        # Añadir a historial, estadísticas y reglas de alerta antes de publicar
+        self._record(name, value, timestamp)
+        
+        if name == 'exterior_temp':
+            # Temperatura, sensación térmica aproximada y una vista inmutable O(1) del
+            # historial que ya la incluye se publican juntas en la misma versión; la
+            # copia solo se hace al redibujar la gráfica en el hilo de pantalla
+            self.state.publish(
+                exterior_temp=value, exterior_feels_like=value - 2.0, last_update=timestamp,
+                temp_history=self.storage.history_view('exterior_temp')
+            )
+            self.scheduler.call_soon(self._set_exterior_online, True)
         else:
-            logger.error(f"❌ Error conectando al broker MQTT: {rc}")
+            self.state.publish(**{name: value, 'last_update': timestamp})
     
-    def _on_mqtt_disconnect(self, client, userdata, rc):
-        """Callback cuando se desconecta del broker"""
-        logger.warning("📡 Desconectado del broker MQTT")
-        self.data_store['exterior_online'] = False
+    def apply_status(self, is_online, timestamp=None):
+        """Aplica el estado del módulo principal (timestamp None = se perdió el broker)"""
+        if timestamp is not None:
+            self.state.publish(last_update=timestamp)
+        self.scheduler.call_soon(self._set_exterior_online, is_online)
     
-    def _on_mqtt_message(self, client, userdata, msg):
-        """Callback cuando llega un mensaje MQTT del ESP32"""
-        try:
-            topic = msg.topic
-            payload = msg.payload.decode('utf-8')
-            
-            logger.info(f"📨 MQTT: {topic} = {payload}")
-            
-            # Procesar según el tópico
-            if topic == MQTT_CONFIG['LOCAL_BROKER']['topics']['exterior_temp']:
-                temp_value = float(payload)
-                self.data_store['exterior_temp'] = temp_value
-                self.data_store['exterior_online'] = True
-                
-                # Añadir a historial
-                self.data_store['temp_history'].append(temp_value)
-                
-                # Calcular sensación térmica aproximada
-                self.data_store['exterior_feels_like'] = temp_value - 2.0
-                
-                # Procesar alertas de temperatura
-                self._process_temperature_alerts(temp_value)
-                
-            elif topic == MQTT_CONFIG['LOCAL_BROKER']['topics']['exterior_hum']:
-                self.data_store['exterior_humidity'] = float(payload)
-                
-            elif topic == MQTT_CONFIG['LOCAL_BROKER']['topics']['exterior_pres']:
-                self.data_store['exterior_pressure'] = float(payload)
-                
-            elif topic == MQTT_CONFIG['LOCAL_BROKER']['topics']['exterior_status']:
-                is_online = payload.lower() == 'online'
-                self.data_store['exterior_online'] = is_online
-                
-                if is_online:
-                    logger.info("🟢 Módulo exterior ONLINE")
-                else:
-                    logger.warning("🔴 Módulo exterior OFFLINE")
-            
-            # Actualizar timestamp
-            self.data_store['last_update'] = time.time()
-            
-        except Exception as e:
-            logger.error(f"Error procesando mensaje MQTT: {e}")
+    def _record(self, name, value, timestamp=None):
+        """Guarda una lectura en el almacenamiento y la evalúa en las reglas de alerta"""
+        if timestamp is None:
+            timestamp = self.clock.time()
+        self.storage.record(name, value, timestamp)
+        self.alerts.observe(name, value, timestamp)
     
-    def _process_temperature_alerts(self, temp_value):
-        """Procesa alertas de temperatura del módulo exterior"""
-        current_time = time.time()
-        
-        # Evitar spam de alertas (mínimo 5 minutos entre alertas)
-        if current_time - self.data_store['last_alert_time'] < 300:
+    def _on_alert(self, alert):
+        """Guarda en el estado el instante de la última alerta notificada"""
+        if alert.event == 'raise':
+            self.state.publish(last_alert_time=alert.timestamp)
+    
+    def _set_alert_led(self, color):
+        """Aplica el color de alerta al LED de estado desde el bucle principal"""
+        self.hardware.set_alert_led(color)
+        self.scheduler.trigger('leds')
+    
+    def _register_tasks(self):
+        """Registra las tareas periódicas del bucle principal"""
+        intervals = SCHEDULER_CONFIG
+        self.scheduler.add_task('sensor_read', intervals['sensor_read'], self._read_local_sensor)
+        self.scheduler.add_task('leds', intervals['led_update'], self._update_leds)
+        self.scheduler.add_task('display', intervals['display_update'], self._update_display)
+        self.scheduler.add_task('liveness', intervals['liveness_check'], self._check_exterior_liveness)
+        self.scheduler.add_task(
+            'storage_flush', STORAGE_CONFIG['flush_interval'], self._flush_storage,
+            delay=STORAGE_CONFIG['flush_interval']
+        )
+    
+    def _register_gauges(self):
+        """Expone estado, tareas y envío a ThingsBoard como gauges calculados al exportar"""
+        metrics.gauge('station_devices', 'Módulos exteriores registrados', function=lambda: len(self.devices))
+        metrics.gauge('station_state_seq', 'Versión de la instantánea de estado', function=lambda: self.state.seq)
+        metrics.gauge(
+            'station_exterior_online', 'Módulo exterior principal en línea (1/0)',
+            function=lambda: int(self.state.snapshot().exterior_online)
+        )
+        metrics.gauge(
+            'station_exterior_age_seconds', 'Segundos desde la última lectura exterior',
+            function=lambda: self.clock.time() - self.state.snapshot().last_update
+        )
+        metrics.gauge('station_system_sample_ms', 'Duración del último muestreo de métricas del sistema',
+                      function=lambda: self.system_metrics.last_sample_ms)
+        metrics.gauge('station_log_queue_depth', 'Mensajes de log pendientes de escribir',
+                      function=lambda: log_pipeline.queue.qsize())
+        metrics.gauge('station_log_dropped', 'Mensajes de log descartados por cola llena',
+                      function=lambda: log_pipeline.handler.dropped)
+        metrics.gauge('station_log_suppressed', 'Mensajes de log descartados por límite de ritmo',
+                      function=lambda: log_pipeline.filter.suppressed)
+        metrics.gauge('station_log_repeated', 'Mensajes de log repetidos agrupados',
+                      function=lambda: log_pipeline.filter.repeated)
+    
+    def _handle_button_events(self):
+        """
+        Atiende los eventos del botón: pulsación = cambiar de página, doble
+        pulsación = silenciar el LED de alerta, pulsación larga = refresco
+        completo de la pantalla
+        """
+        for event in self.hardware.get_button_events():
+            BUTTON_LATENCY.observe(max(self.clock.monotonic() - (event.timestamp + event.duration), 0.0))
+            if event.kind == 'press':
+                self.current_page = 'stats' if self.current_page == 'main' else 'main'
+                logger.info(f"📱 Cambiando a página: {self.current_page}")
+            elif event.kind == 'double_press':
+                logger.info("🔕 LED de alerta silenciado")
+                self.hardware.set_alert_led(None)
+                self.scheduler.trigger('leds')
+            elif event.kind == 'long_press':
+                logger.info("🖥️ Refresco completo de la pantalla")
+                self.hardware.refresh_display()
+                self._drawn_key = None
+            self.scheduler.trigger('display')
+    
+    def _read_local_sensor(self):
+        """Lee el sensor local"""
+        sensor_data = self.hardware.read_local_bmp280()
+        if not sensor_data:
             return
-        
-        if temp_value >= TEMP_THRESHOLDS['heat_warning']:
-            logger.warning(f"🔥 ALERTA CALOR EXTREMO: {temp_value:.1f}°C")
-            self.data_store['last_alert_time'] = current_time
+        timestamp = sensor_data['timestamp']
+        values = {}
+        for name, field in (('interior_temp', 'temperature'), ('interior_pressure', 'pressure')):
+            if not self.quality.check(name, sensor_data[field], timestamp):
+                values[name] = sensor_data[field]
+                self._record(name, sensor_data[field], timestamp)
+        if values:
+            self.state.publish(**values)
+            logger.debug(f"🏠 Interior: {sensor_data['temperature']:.1f}°C")
+    
+    def _update_leds(self):
+        """Actualiza los LEDs con el estado actual"""
+        state = self.state.snapshot()
+        self.hardware.update_leds(
+            state.interior_temp,
+            state.exterior_temp,
+            state.exterior_online,
+            state.last_update
+        )
+    
+    def _update_display(self):
+        """Redibuja la página activa"""
+        if self.current_page == 'main':
+            if TEST_MODE:
+                # En modo prueba, usar temperatura de test
+                test_temp = self.hardware.get_test_temperature()
+                if test_temp is not None:
+                    self.state.publish(exterior_temp=test_temp, exterior_online=True)
             
-        elif temp_value <= TEMP_THRESHOLDS['freeze_warning']:
-            logger.warning(f"❄️ ALERTA HELADA: {temp_value:.1f}°C")
-            self.data_store['last_alert_time'] = current_time
+            state = self.state.snapshot()
+            # Sin cambios de estado ni de minuto no hace falta redibujar
+            key = ('main', state.seq, int(self.clock.time() // 60))
+            if key == self._drawn_key:
+                return
+            self._drawn_key = key
+            self.hardware.draw_main_dashboard(state)
+        else:
+            self._drawn_key = None
+            system_info = self._get_system_info()
+            self.hardware.draw_stats_page(self.stats_data, system_info)
+    
+    def _flush_storage(self):
+        """Vuelca a disco las lecturas pendientes y los agregados"""
+        self.storage.flush()
+    
+    def _check_exterior_liveness(self):
+        """Verifica la conexión del módulo exterior"""
+        # Las ventanas caducan aunque no lleguen lecturas nuevas
+        now = self.clock.time()
+        self.storage.refresh(now)
+        # El aviso de módulo sin lecturas lo da la regla de inactividad
+        self.alerts.tick(now)
+        
+        state = self.state.snapshot()
+        if now - state.last_update > SCHEDULER_CONFIG['exterior_timeout']:
+            if state.exterior_online:
+                self._set_exterior_online(False)
+    
+    def _set_exterior_online(self, is_online):
+        """Actualiza el estado del módulo exterior y refresca los LEDs si cambia"""
+        if self.state.snapshot().exterior_online != is_online:
+            self.state.publish(exterior_online=is_online)
+            self.scheduler.trigger('leds')
+    
+    @property
+    def data_store(self):
+        """Instantánea actual del estado (solo lectura)"""
+        return self.state.snapshot()
+    
+    def get_scheduler_stats(self):
+        """Devuelve los contadores de jitter y desbordes de cada tarea"""
+        return self.scheduler.get_stats()
+    
+    def get_quality_stats(self):
+        """Devuelve lecturas aceptadas y descartadas por el control de calidad"""
+        return self.quality.get_stats()
+    
+    def get_alert_stats(self):
+        """Devuelve reglas, lecturas evaluadas y alertas activas"""
+        return self.alerts.get_stats()
+    
+    def get_capture_stats(self):
+        """Devuelve mensajes capturados, descartados y tamaño de la captura MQTT"""
+        return self.ingest.capture.get_stats() if self.ingest.capture else None
+    
+    def get_live_api_stats(self):
+        """Devuelve clientes, peticiones y deltas enviados por la API en vivo"""
+        return self.live_api.get_stats()
+    
+    def get_uplink_stats(self):
+        """Devuelve la cola, el tamaño de lote y el retraso del envío a ThingsBoard"""
+        return self.storage.get_uplink_stats()
     
     def run(self):
         """Bucle principal del programa"""
         logger.info("🚀 Iniciando estación meteorológica...")
         logger.info(f"📡 Esperando datos del módulo exterior en {MQTT_CONFIG['LOCAL_BROKER']['host']}")
         
-        last_sensor_read = 0
-        last_led_update = 0
-        last_display_update = 0
-        last_stats_calc = 0
-        
         try:
-            while True:
-                current_time = time.time()
-                
-                # Comprobar botón
-                if self.hardware.is_button_pressed():
-                    if current_time - self.last_button_press > 0.5:
-                        self.current_page = 'stats' if self.current_page == 'main' else 'main'
-                        self.last_button_press = current_time
-                        logger.info(f"📱 Cambiando a página: {self.current_page}")
-                
-                # Leer sensor local cada 30 segundos
-                if current_time - last_sensor_read > 30:
-                    sensor_data = self.hardware.read_local_bmp280()
-                    if sensor_data:
-                        self.data_store['interior_temp'] = sensor_data['temperature']
-                        self.data_store['interior_pressure'] = sensor_data['pressure']
-                        logger.debug(f"🏠 Interior: {sensor_data['temperature']:.1f}°C")
-                    last_sensor_read = current_time
-                
-                # Actualizar LEDs cada 5 segundos
-                if current_time - last_led_update > 5:
-                    self.hardware.update_leds(
-                        self.data_store['interior_temp'],
-                        self.data_store['exterior_temp'],
-                        self.data_store['exterior_online'],
-                        self.data_store['last_update']
-                    )
-                    last_led_update = current_time
-                
-                # Calcular estadísticas cada 5 minutos
-                if current_time - last_stats_calc > 300:
-                    self._calculate_stats()
-                    last_stats_calc = current_time
-                
-                # Actualizar pantalla cada 2 segundos
-                if current_time - last_display_update > 2:
-                    if self.current_page == 'main':
-                        self.hardware.draw_main_dashboard(self.data_store)
-                    else:
-                        system_info = self._get_system_info()
-                        self.hardware.draw_stats_page(self.stats_data, system_info)
-                    last_display_update = current_time
-                
-                # Verificar conexión del módulo exterior
-                if current_time - self.data_store['last_update'] > 300:  # 5 minutos sin datos
-                    if self.data_store['exterior_online']:
-                        logger.warning("⚠️ Módulo exterior sin respuesta por 5 minutos")
-                        self.data_store['exterior_online'] = False
-                
-                time.sleep(0.1)
+            self.metrics_server.start()
+            self.live_api.start()
+            self.system_metrics.start()
+            self.scheduler.run_forever()
                 
         except KeyboardInterrupt:
             logger.info("⏹️ Deteniendo estación meteorológica...")
         finally:
-            if self.mqtt_client:
-                self.mqtt_client.loop_stop()
-                self.mqtt_client.disconnect()
+            self.ingest.stop()
+            self.system_metrics.stop()
+            self.storage.close()
+            self.hardware.close()
+            self.metrics_server.stop()
+            self.live_api.stop()
+    
+    def _live_version(self):
+        """
+        Clave de la versión de los datos en vivo: se compara por identidad
+        (estado, diccionarios sustituidos completos), así que es barata
+        """
+        return (self.state.snapshot(), self.stats_data, self._get_system_info(), tuple(self.alerts.active()))
     
-    def _calculate_stats(self):
-        """Calcula estadísticas diarias"""
-        if len(self.data_store['temp_history']) > 0:
-            temps = list(self.data_store['temp_history'])
-            self.stats_data['day_max'] = max(temps)
-            self.stats_data['day_min'] = min(temps)
-            self.stats_data['day_avg'] = sum(temps) / len(temps)
-            self.stats_data['variation'] = self.stats_data['day_max'] - self.stats_data['day_min']
+    def _live_snapshot(self):
+        """Instantánea para el dashboard web (el historial va aparte en /api/history)"""
+        state = self.state.snapshot()
+        snapshot = {name: state[name] for name in STATE_FIELDS if name != 'temp_history'}
+        snapshot['seq'] = state.seq
+        snapshot['page'] = self.current_page
+        snapshot['stats'] = self.stats_data
+        snapshot['system'] = {key: value for key, value in self._get_system_info().items() if key != 'history'}
+        snapshot['alerts'] = self.alerts.active()
+        return snapshot
+    
+    def _live_history(self, name):
+        """Historial reciente (timestamp, valor) de una variable almacenada, o None"""
+        if name not in STORAGE_CONFIG['variables']:
+            return None
+        return self.storage.recent(name)
     
     def _get_system_info(self):
-        """Obtiene información del sistema"""
+        """Devuelve el último muestreo de métricas del sistema (sin leer /proc en el bucle)"""
         if TEST_MODE:
             return {
                 'cpu_usage': 45,
@@ -241,37 +361,12 @@ class WeatherStation:
                 'wifi_signal': 85,
                 'uptime': '2d 14h 32m'
             }
-        else:
-            return {
-                'cpu_usage': psutil.cpu_percent(),
-                'ram_usage': psutil.virtual_memory().percent,
-                'cpu_temp': self._get_cpu_temp(),
-                'wifi_signal': 85,  # Placeholder
-                'uptime': self._get_uptime()
-            }
-    
-    def _get_cpu_temp(self):
-        """Obtiene temperatura de la CPU"""
-        try:
-            temps = psutil.sensors_temperatures()
-            if 'cpu_thermal' in temps:
-                return temps['cpu_thermal'][0].current
-        except:
-            pass
-        return 55.0
-    
-    def _get_uptime(self):
-        """Obtiene uptime del sistema"""
-        try:
-            boot_time = psutil.boot_time()
-            uptime_seconds = time.time() - boot_time
-            days = int(uptime_seconds // 86400)
-            hours = int((uptime_seconds % 86400) // 3600)
-            minutes = int((uptime_seconds % 3600) // 60)
-            return f"{days}d {hours}h {minutes}m"
-        except:
-            return "0d 0h 0m"
+        return self.system_metrics.latest()
 
 if __name__ == "__main__":
-    station = WeatherStation()
-    station.run()
+    if MULTIPROCESS_CONFIG['enabled']:
+        from multiprocess_station import StationSupervisor
+        StationSupervisor().run()
+    else:
+        station = WeatherStation()
+        station.run()
@@ -0,0 +1,308 @@
+"""
+Métricas internas de la estación en formato de texto de Prometheus
+
+Contadores, histogramas de buckets fijos y gauges calculados al vuelo, más
+decoradores y context managers de tiempo para los caminos críticos. Se
+exponen en http://127.0.0.1:9108/metrics.
+
+Con METRICS_CONFIG['enabled'] = False todas las métricas son objetos nulos y
+los decoradores devuelven la función original, así que la instrumentación no
+cuesta nada en el camino crítico.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from config import METRICS_CONFIG
+from logger_config import logger
+
+# Buckets de latencia en segundos (50 µs .. 2.5 s)
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+)
+
+enabled = METRICS_CONFIG['enabled']
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Devuelve (creándola si hace falta) la serie con esos valores de etiqueta"""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _series(self):
+        if self.labelnames:
+            return list(self._children.items())
+        return [((), self)]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self._series():
+            lines.extend(child._render_samples(self.name, self.labelnames, values))
+        return lines
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.value = 0
+        self._value_lock = threading.Lock()
+
+    def _new_child(self):
+        return Counter(self.name, self.help)
+
+    def inc(self, amount=1):
+        with self._value_lock:
+            self.value += amount
+
+    def _render_samples(self, name, labelnames, values):
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(self.value)}"]
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, labelnames=(), function=None):
+        super().__init__(name, help_text, labelnames)
+        self.value = 0.0
+        self.function = function
+
+    def _new_child(self):
+        return Gauge(self.name, self.help)
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        """Calcula el valor al exportar en lugar de actualizarlo en el camino crítico"""
+        self.function = function
+
+    def _render_samples(self, name, labelnames, values):
+        value = self.value
+        if self.function is not None:
+            try:
+                value = self.function()
+            except Exception as e:
+                logger.error(f"Error calculando métrica {name}: {e}")
+                return []
+        if value is None:
+            return []
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(value)}"]
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self._value_lock = threading.Lock()
+
+    def _new_child(self):
+        return Histogram(self.name, self.help, buckets=self.buckets)
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._value_lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        """Context manager que observa la duración del bloque"""
+        return _Timer(self)
+
+    def _render_samples(self, name, labelnames, values):
+        with self._value_lock:
+            counts = list(self.counts)
+            total = self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{name}_bucket{_format_labels(labelnames, values, le)} {cumulative}")
+        labels = _format_labels(labelnames, values)
+        lines.append(f"{name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{name}_count{labels} {cumulative}")
+        return lines
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+class _NullMetric:
+    """Sustituto sin coste cuando las métricas están desactivadas"""
+    __slots__ = ()
+
+    def labels(self, *values):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def set_function(self, function):
+        pass
+
+    def observe(self, value):
+        pass
+
+    def time(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_METRIC = _NullMetric()
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, cls, name, help_text, **kwargs):
+        """Devuelve la métrica con ese nombre, creándola la primera vez"""
+        if not enabled:
+            return NULL_METRIC
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help_text, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Métrica {name} ya registrada como {metric.kind}")
+            return metric
+
+    def render(self):
+        """Exporta todas las métricas en formato de texto de Prometheus"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+def counter(name, help_text, labelnames=()):
+    return REGISTRY.register(Counter, name, help_text, labelnames=labelnames)
+
+def gauge(name, help_text, labelnames=(), function=None):
+    metric = REGISTRY.register(Gauge, name, help_text, labelnames=labelnames)
+    if function is not None:
+        metric.set_function(function)
+    return metric
+
+def histogram(name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+    return REGISTRY.register(Histogram, name, help_text, labelnames=labelnames, buckets=buckets)
+
+def timed(metric):
+    """Decorador que observa la duración de cada llamada; sin métricas devuelve la función intacta"""
+    def decorate(func):
+        if metric is NULL_METRIC:
+            return func
+        observe = metric.observe
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(clock() - start)
+        wrapper.__name__ = func.__name__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
+        return wrapper
+    return decorate
+
+def _make_handler():
+    # http.server se importa al arrancar el servidor, no al importar el módulo
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+    return MetricsHandler
+
+class MetricsServer:
+    """Servidor HTTP local que sirve /metrics en un hilo propio"""
+
+    def __init__(self, host=None, port=None):
+        self.host = host or METRICS_CONFIG['host']
+        self.port = METRICS_CONFIG['port'] if port is None else port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        if not enabled or self._server:
+            return
+        from http.server import ThreadingHTTPServer
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), _make_handler())
+            self._server.daemon_threads = True
+        except OSError as e:
+            logger.error(f"Error iniciando servidor de métricas en {self.host}:{self.port}: {e}")
+            self._server = None
+            return
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True)
+        self._thread.start()
+        logger.info(f"📈 Métricas en http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
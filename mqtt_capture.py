@@ -0,0 +1,215 @@
+"""
+Captura y reproducción del flujo MQTT de los módulos exteriores
+
+Con CAPTURE_CONFIG['enabled'] cada mensaje recibido se anexa a un fichero
+binario compacto: una cabecera mágica seguida de registros
+(timestamp f64, id de tópico u16, longitud u16, payload). Los tópicos se
+escriben una sola vez como registros de definición (id 0xFFFF) y reciben
+ids consecutivos, así que un mensaje típico ocupa 12 bytes más su payload.
+
+Las escrituras se agrupan en memoria y se vuelcan al sistema (sin fsync) por
+tamaño o por tiempo; un registro final incompleto tras un corte de luz se
+descarta al reabrir. CaptureReader proyecta el fichero con mmap para
+reproducirlo sin cargarlo entero (ver benchmarks/replay_capture.py).
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+
+import metrics
+from config import CAPTURE_CONFIG
+from logger_config import logger
+
+CAPTURE_MAGIC = b'EMCAP\x00\x00\x01'
+# timestamp (f64), id de tópico (u16), longitud del payload (u16)
+CAPTURE_RECORD = struct.Struct('<dHH')
+TOPIC_DEFINITION = 0xFFFF
+MAX_TOPICS = TOPIC_DEFINITION
+MAX_PAYLOAD = 0xFFFF
+
+CAPTURE_MESSAGES = metrics.counter('station_capture_messages_total', 'Mensajes MQTT guardados en la captura')
+CAPTURE_DROPPED = metrics.counter('station_capture_dropped_total', 'Mensajes MQTT no capturados (límite de tamaño o tópicos)')
+
+def _scan(buffer, start=len(CAPTURE_MAGIC)):
+    """
+    Recorre los registros completos de una captura.
+
+    Devuelve (tópicos por id, desplazamientos de los mensajes, final del
+    último registro completo). Los mensajes con un id de tópico sin definir
+    se saltan.
+    """
+    topics = []
+    offsets = []
+    size = len(buffer)
+    header = CAPTURE_RECORD.size
+    unpack = CAPTURE_RECORD.unpack_from
+    pos = start
+    while pos + header <= size:
+        _, topic_id, length = unpack(buffer, pos)
+        end = pos + header + length
+        if end > size:
+            break
+        if topic_id == TOPIC_DEFINITION:
+            topics.append(bytes(buffer[pos + header:end]).decode('utf-8'))
+        elif topic_id < len(topics):
+            offsets.append(pos)
+        pos = end
+    return topics, offsets, pos
+
+class MqttCapture:
+    def __init__(self, path=None, config=None):
+        self.config = config or CAPTURE_CONFIG
+        self.path = path or self.config['path']
+        self.max_bytes = self.config['max_bytes']
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self._topics = {}
+        self.messages = 0
+        self.dropped = 0
+        self.enabled = True
+        try:
+            self._file, self.size = self._open()
+        except (OSError, ValueError) as e:
+            logger.error(f"Error abriendo la captura MQTT {self.path}: {e}")
+            self._file, self.size = None, 0
+            self.enabled = False
+
+    def _open(self):
+        """Abre la captura para anexar, recuperando sus tópicos y descartando un registro incompleto"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        capture = open(self.path, 'a+b')
+        capture.seek(0)
+        data = capture.read()
+        if not data:
+            capture.write(CAPTURE_MAGIC)
+            return capture, len(CAPTURE_MAGIC)
+        if not data.startswith(CAPTURE_MAGIC):
+            capture.close()
+            raise ValueError("no es un fichero de captura")
+        topics, _, end = _scan(data)
+        self._topics = {topic: topic_id for topic_id, topic in enumerate(topics)}
+        if end < len(data):
+            capture.truncate(end)
+            logger.warning(f"Registro incompleto descartado en {self.path}")
+        capture.seek(0, os.SEEK_END)
+        return capture, end
+
+    def record(self, topic, payload, timestamp):
+        """Anexa un mensaje (topic str, payload bytes) a la captura; seguro desde el hilo MQTT"""
+        if not self.enabled:
+            return
+        with self._lock:
+            if len(payload) > MAX_PAYLOAD:
+                self._drop()
+                return
+            topic_id = self._topics.get(topic)
+            pieces = []
+            if topic_id is None:
+                encoded = topic.encode('utf-8')
+                if len(self._topics) >= MAX_TOPICS or len(encoded) > MAX_PAYLOAD:
+                    self._drop()
+                    return
+                # El id solo se reserva si su definición llega al búfer (más abajo)
+                topic_id = len(self._topics)
+                pieces.append(CAPTURE_RECORD.pack(timestamp, TOPIC_DEFINITION, len(encoded)) + encoded)
+            pieces.append(CAPTURE_RECORD.pack(timestamp, topic_id, len(payload)) + payload)
+            length = sum(len(piece) for piece in pieces)
+            if self.size + self._buffered + length > self.max_bytes:
+                self._drop()
+                return
+            if len(pieces) > 1:
+                self._topics[topic] = topic_id
+            self._buffer.extend(pieces)
+            self._buffered += length
+            self.messages += 1
+            due = (self._buffered >= self.config['flush_bytes']
+                   or time.monotonic() - self._last_flush >= self.config['flush_interval'])
+        CAPTURE_MESSAGES.inc()
+        if due:
+            self.flush()
+
+    def _drop(self):
+        if not self.dropped:
+            logger.warning("Captura MQTT llena o con demasiados tópicos: se dejan de guardar mensajes")
+        self.dropped += 1
+        CAPTURE_DROPPED.inc()
+
+    def flush(self):
+        """Vuelca los mensajes pendientes al fichero (sin fsync: es un registro de depuración)"""
+        with self._lock:
+            if not self._buffer or self._file is None:
+                return
+            data = b''.join(self._buffer)
+            self._buffer = []
+            self._buffered = 0
+            self._last_flush = time.monotonic()
+            try:
+                self._file.write(data)
+                self._file.flush()
+                self.size += len(data)
+            except OSError as e:
+                logger.error(f"Error escribiendo la captura MQTT: {e}")
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+        self.enabled = False
+
+    def get_stats(self):
+        return {'messages': self.messages, 'dropped': self.dropped, 'bytes': self.size + self._buffered}
+
+class CaptureReader:
+    """Captura proyectada en memoria; se itera como (timestamp, tópico, payload)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < len(CAPTURE_MAGIC):
+            self._file.close()
+            raise ValueError(f"{path}: no es un fichero de captura")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(CAPTURE_MAGIC)] != CAPTURE_MAGIC:
+            self.close()
+            raise ValueError(f"{path}: no es un fichero de captura")
+        self.topics, self._offsets, _ = _scan(self._map)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __iter__(self):
+        buffer = self._map
+        topics = self.topics
+        header = CAPTURE_RECORD.size
+        unpack = CAPTURE_RECORD.unpack_from
+        for pos in self._offsets:
+            timestamp, topic_id, length = unpack(buffer, pos)
+            start = pos + header
+            yield timestamp, topics[topic_id], buffer[start:start + length]
+
+    def time_span(self):
+        """Devuelve (primer, último) timestamp de la captura, o None si está vacía"""
+        if not self._offsets:
+            return None
+        first = CAPTURE_RECORD.unpack_from(self._map, self._offsets[0])[0]
+        last = CAPTURE_RECORD.unpack_from(self._map, self._offsets[-1])[0]
+        return first, last
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,207 @@
+"""
+Ingesta MQTT de los módulos exteriores
+
+MqttIngest mantiene el cliente del broker local, enruta cada tópico
+estacion/<dispositivo>/<medida>, pasa las lecturas por el control de calidad
+y actualiza la tabla de dispositivos. Solo las lecturas válidas y el estado
+del módulo principal salen hacia fuera, por dos callbacks:
+
+- on_reading(variable, valor, timestamp),
+- on_status(en_linea, timestamp) (timestamp None si se perdió el broker).
+
+WeatherStation los conecta a su estado en el modo de un proceso; en el modo
+multiproceso el proceso de ingesta los escribe en el anillo compartido.
+"""
+import threading
+
+import metrics
+from config import MQTT_CONFIG, CAPTURE_CONFIG
+from logger_config import logger
+from clock import SYSTEM_CLOCK
+from device_registry import DeviceTable
+from data_quality import DataQuality
+from mqtt_capture import MqttCapture
+
+MQTT_CALLBACK_SECONDS = metrics.histogram('station_mqtt_callback_seconds', 'Duración del callback de mensajes MQTT')
+MQTT_MESSAGES = metrics.counter('station_mqtt_messages_total', 'Mensajes MQTT procesados por medida', ('measurement',))
+MQTT_IGNORED = metrics.counter('station_mqtt_ignored_total', 'Mensajes MQTT con tópico desconocido o tabla llena')
+MQTT_ERRORS = metrics.counter('station_mqtt_errors_total', 'Mensajes MQTT que produjeron un error')
+
+class MqttIngest:
+    def __init__(self, on_reading, on_status, clock=None, quality=None, capture=True):
+        self.on_reading = on_reading
+        self.on_status = on_status
+        self.clock = clock or SYSTEM_CLOCK
+        self.quality = quality or DataQuality()
+        broker = MQTT_CONFIG['LOCAL_BROKER']
+        self.primary_device = broker['primary_device']
+        self.devices = DeviceTable(broker['max_devices'])
+        # Enrutado de tópicos por medida
+        self._topic_handlers = {
+            'temperatura': self._handle_temperature,
+            'humedad': self._handle_humidity,
+            'presion': self._handle_pressure,
+            'estado': self._handle_status
+        }
+        self._topic_counters = {measurement: MQTT_MESSAGES.labels(measurement) for measurement in self._topic_handlers}
+        # Captura opcional de todo lo recibido para reproducirlo sin broker
+        self.capture = MqttCapture() if capture and CAPTURE_CONFIG['enabled'] else None
+
+        self.client = None
+        self._lock = threading.Lock()
+        self._connected = False
+        self._subscribed = False
+        self._ready = False
+
+    # --- Conexión -----------------------------------------------------------
+
+    def start(self):
+        """Configura el cliente MQTT (conexión no bloqueante desde el hilo de red de paho)"""
+        try:
+            import paho.mqtt.client as mqtt
+
+            self.client = mqtt.Client()
+            self.client.on_connect = self._on_connect
+            self.client.on_message = self.on_message
+            self.client.on_disconnect = self._on_disconnect
+
+            self.client.connect_async(MQTT_CONFIG['LOCAL_BROKER']['host'], MQTT_CONFIG['LOCAL_BROKER']['port'], 60)
+            self.client.loop_start()
+
+            logger.info("Cliente MQTT configurado")
+
+        except Exception as e:
+            logger.error(f"Error configurando MQTT: {e}")
+
+    def set_ready(self):
+        """Permite suscribirse: hasta ahora el consumidor no podía procesar mensajes"""
+        self._ready = True
+        self._subscribe()
+
+    def publisher(self):
+        """Cliente conectado para publicar (p. ej. alertas) o None"""
+        return self.client if self._connected else None
+
+    def _subscribe(self):
+        """Se suscribe cuando hay conexión y el consumidor ya puede procesar mensajes"""
+        with self._lock:
+            if not (self._connected and self._ready) or self._subscribed:
+                return
+            self._subscribed = True
+        # Suscribirse a los tópicos comodín de todos los módulos exteriores
+        subscriptions = MQTT_CONFIG['LOCAL_BROKER']['subscriptions']
+        self.client.subscribe([(topic_path, 0) for topic_path in subscriptions])
+        for topic_path in subscriptions:
+            logger.info(f"📡 Suscrito a {topic_path}")
+
+    def _on_connect(self, client, userdata, flags, rc):
+        """Callback cuando se conecta al broker MQTT"""
+        if rc == 0:
+            logger.info("✅ Conectado al broker MQTT")
+            # Cada conexión nueva empieza sin suscripciones
+            with self._lock:
+                self._connected = True
+                self._subscribed = False
+            self._subscribe()
+        else:
+            logger.error(f"❌ Error conectando al broker MQTT: {rc}")
+
+    def _on_disconnect(self, client, userdata, rc):
+        """Callback cuando se desconecta del broker"""
+        logger.warning("📡 Desconectado del broker MQTT")
+        with self._lock:
+            self._connected = False
+        self.on_status(False, None)
+
+    def stop(self):
+        if self.client:
+            self.client.loop_stop()
+            self.client.disconnect()
+        if self.capture:
+            self.capture.close()
+
+    # --- Mensajes -----------------------------------------------------------
+
+    @metrics.timed(MQTT_CALLBACK_SECONDS)
+    def on_message(self, client, userdata, msg):
+        """Callback cuando llega un mensaje MQTT de un módulo exterior"""
+        try:
+            topic = msg.topic
+            if self.capture:
+                self.capture.record(topic, msg.payload, self.clock.time())
+            payload = msg.payload.decode('utf-8')
+
+            # Por mensaje solo en DEBUG y con argumentos diferidos: con INFO no cuesta nada
+            logger.debug("📨 MQTT: %s = %s", topic, payload)
+
+            # estacion/<dispositivo>/<medida>
+            parts = topic.split('/')
+            if len(parts) != 3:
+                MQTT_IGNORED.inc()
+                return
+            handler = self._topic_handlers.get(parts[2])
+            if handler is None:
+                MQTT_IGNORED.inc()
+                return
+            index = self.devices.index_of(parts[1])
+            if index is None:
+                MQTT_IGNORED.inc()
+                return
+
+            self._topic_counters[parts[2]].inc()
+            now = self.clock.time()
+            self.devices.touch(index, now)
+            handler(index, parts[1], payload, now)
+
+        except Exception as e:
+            logger.error(f"Error procesando mensaje MQTT: {e}")
+            MQTT_ERRORS.inc()
+
+    def _handle_temperature(self, index, device_id, payload, now):
+        """Procesa una temperatura exterior"""
+        value = float(payload)
+        # Lecturas imposibles o picos aislados no llegan al estado, historial ni alertas
+        if self.quality.check('exterior_temp', value, now, device_id):
+            return
+        self.devices.temperature[index] = value
+        self.devices.online[index] = 1
+        if device_id == self.primary_device:
+            self.on_reading('exterior_temp', value, now)
+
+    def _handle_humidity(self, index, device_id, payload, now):
+        """Procesa una humedad exterior"""
+        value = float(payload)
+        if self.quality.check('exterior_humidity', value, now, device_id):
+            return
+        self.devices.humidity[index] = value
+        if device_id == self.primary_device:
+            self.on_reading('exterior_humidity', value, now)
+
+    def _handle_pressure(self, index, device_id, payload, now):
+        """Procesa una presión exterior"""
+        value = float(payload)
+        if self.quality.check('exterior_pressure', value, now, device_id):
+            return
+        self.devices.pressure[index] = value
+        if device_id == self.primary_device:
+            self.on_reading('exterior_pressure', value, now)
+
+    def _handle_status(self, index, device_id, payload, now):
+        """Procesa el estado online/offline de un módulo"""
+        is_online = payload.lower() == 'online'
+        self.devices.online[index] = 1 if is_online else 0
+        if device_id != self.primary_device:
+            return
+
+        if is_online:
+            logger.info("🟢 Módulo exterior ONLINE")
+        else:
+            logger.warning("🔴 Módulo exterior OFFLINE")
+        self.on_status(is_online, now)
+
+    def get_stats(self):
+        return {
+            'devices': len(self.devices),
+            'connected': self._connected,
+            'capture': self.capture.get_stats() if self.capture else None
+        }
@@ -0,0 +1,383 @@
+"""
+Modo multiproceso de la estación (MULTIPROCESS_CONFIG['enabled'])
+
+StationSupervisor reparte la estación en tres procesos:
+
+- ingest: cliente MQTT y control de calidad (MqttIngest); escribe las
+  lecturas válidas y el estado del módulo principal en el anillo 'samples'.
+- storage: series temporales, estadísticas, agregados y envío a ThingsBoard
+  (StationStorage); lee 'samples' e 'interior' y publica stats_data en un
+  bloque compartido.
+- display: WeatherStation con pantalla, LEDs, botón, alertas y API en vivo;
+  aplica lo que llega por 'samples' y escribe el sensor local en 'interior'.
+
+Los anillos (shm_ring) y el bloque de estadísticas los crea y elimina el
+supervisor, así que sobreviven al reinicio de cualquier proceso y el lector
+reiniciado sigue desde su cursor. Cada proceso marca un latido; el
+supervisor reinicia con espera exponencial al que termina o deja de latir,
+sin que systemd tenga que reiniciar el servicio.
+"""
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+import metrics
+from config import MULTIPROCESS_CONFIG, MQTT_CONFIG, STORAGE_CONFIG, SCHEDULER_CONFIG, TELEMETRY_CONFIG, CAPTURE_CONFIG, TEST_MODE
+from logger_config import logger
+from clock import SYSTEM_CLOCK
+from scheduler import Scheduler
+from shm_ring import SampleRing, SharedStats, shm_name
+from station_storage import StationStorage, STATS_FIELDS, DEFAULT_STATS, load_clean_history
+from timeseries_store import TimeSeriesStore
+from data_quality import DataQuality
+from mqtt_ingest import MqttIngest
+
+WORKER_RESTARTS = metrics.counter('station_worker_restarts_total', 'Reinicios de procesos de la estación', ('worker',))
+
+WORKERS = ('ingest', 'storage', 'display')
+# Id de variable del estado del módulo principal (los de STORAGE_CONFIG empiezan en 1)
+STATUS_VAR = 0
+# Marca de estado sin timestamp: se perdió el broker, no lo notificó el módulo
+BROKER_LOST = 1
+# Ranuras de lector de cada anillo
+SAMPLES_STORAGE, SAMPLES_DISPLAY, INTERIOR_STORAGE = 0, 1, 0
+
+VARIABLE_NAMES = {var_id: name for name, var_id in STORAGE_CONFIG['variables'].items()}
+
+# --- Procesos ----------------------------------------------------------------
+
+def _stop_on_signal(stop):
+    """SIGTERM (systemd) y SIGINT (Ctrl+C) detienen el proceso de forma ordenada"""
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop())
+
+def _run_ingest(names, beat):
+    ring = SampleRing.attach(names['samples'])
+    var_ids = STORAGE_CONFIG['variables']
+    primary = MQTT_CONFIG['LOCAL_BROKER']['primary_device']
+
+    # El control de calidad arranca con el historial limpio, como en el modo de un proceso
+    quality = DataQuality()
+    store = TimeSeriesStore(read_only=True, clock=SYSTEM_CLOCK)
+    load_clean_history(store, quality, SYSTEM_CLOCK.time(), primary)
+
+    def on_reading(name, value, timestamp):
+        ring.write(var_ids[name], value, timestamp)
+
+    def on_status(is_online, timestamp):
+        if timestamp is None:
+            ring.write(STATUS_VAR, float(is_online), SYSTEM_CLOCK.time(), flags=BROKER_LOST)
+        else:
+            ring.write(STATUS_VAR, float(is_online), timestamp)
+
+    ingest = MqttIngest(on_reading, on_status, quality=quality)
+    scheduler = Scheduler()
+    scheduler.add_task('heartbeat', MULTIPROCESS_CONFIG['heartbeat_interval'], beat)
+    if ingest.capture:
+        scheduler.add_task('capture_flush', CAPTURE_CONFIG['flush_interval'], ingest.capture.flush)
+    _stop_on_signal(scheduler.stop)
+    try:
+        if not TEST_MODE:
+            ingest.start()
+        ingest.set_ready()
+        scheduler.run_forever()
+    finally:
+        ingest.stop()
+        ring.close()
+
+class _StorageWorker:
+    """Consume los anillos hacia StationStorage y publica las estadísticas"""
+
+    def __init__(self, names):
+        primary = MQTT_CONFIG['LOCAL_BROKER']['primary_device']
+        self.storage = StationStorage(SYSTEM_CLOCK, DataQuality(), primary)
+        self.samples = SampleRing.attach(names['samples'])
+        self.interior = SampleRing.attach(names['interior'])
+        self.readers = (self.samples.reader(SAMPLES_STORAGE), self.interior.reader(INTERIOR_STORAGE))
+        self.shared_stats = SharedStats.attach(names['stats'], STATS_FIELDS)
+        self._published = None
+
+    def poll(self):
+        for reader in self.readers:
+            batch = reader.read()
+            if not len(batch):
+                continue
+            for var, value, timestamp in zip(batch['var'].tolist(), batch['value'].tolist(), batch['ts'].tolist()):
+                name = VARIABLE_NAMES.get(var)
+                if name is not None:
+                    self.storage.record(name, value, timestamp)
+        self.publish()
+
+    def refresh(self):
+        self.storage.refresh(SYSTEM_CLOCK.time())
+        self.publish()
+
+    def publish(self):
+        # stats_data se sustituye completo al cambiar: basta compararlo por identidad
+        if self.storage.stats_data is not self._published:
+            self._published = self.storage.stats_data
+            self.shared_stats.publish(self._published)
+
+    def close(self):
+        self.storage.close()
+        self.readers = ()
+        self.samples.close()
+        self.interior.close()
+        self.shared_stats.close()
+
+def _run_storage(names, beat):
+    worker = _StorageWorker(names)
+    worker.storage.warm_start()
+    worker.publish()
+    if not TEST_MODE and TELEMETRY_CONFIG['enabled']:
+        worker.storage.start_uplink()
+
+    scheduler = Scheduler()
+    scheduler.add_task('heartbeat', MULTIPROCESS_CONFIG['heartbeat_interval'], beat)
+    scheduler.add_task('ring_poll', MULTIPROCESS_CONFIG['poll_interval'], worker.poll)
+    scheduler.add_task('stats_refresh', SCHEDULER_CONFIG['liveness_check'], worker.refresh)
+    scheduler.add_task(
+        'storage_flush', STORAGE_CONFIG['flush_interval'], worker.storage.flush,
+        delay=STORAGE_CONFIG['flush_interval']
+    )
+    _stop_on_signal(scheduler.stop)
+    try:
+        scheduler.run_forever()
+    finally:
+        worker.poll()
+        worker.close()
+
+class RemoteStorage:
+    """
+    Almacenamiento visto desde el proceso de pantalla: historial reciente en
+    memoria (almacén de solo lectura), lecturas interiores hacia el proceso de
+    almacenamiento y estadísticas leídas del bloque compartido.
+    """
+
+    def __init__(self, names, clock=None, quality=None, primary_device=None):
+        self.clock = clock or SYSTEM_CLOCK
+        self.quality = quality or DataQuality()
+        self.primary_device = primary_device or MQTT_CONFIG['LOCAL_BROKER']['primary_device']
+        self.store = TimeSeriesStore(read_only=True, clock=self.clock)
+        self.interior = SampleRing.attach(names['interior'])
+        self.shared_stats = SharedStats.attach(names['stats'], STATS_FIELDS)
+        self._source = None
+        self._stats_data = DEFAULT_STATS
+
+    @property
+    def stats_data(self):
+        """Mismo diccionario mientras el proceso de almacenamiento no publique otro"""
+        source = self.shared_stats.read()
+        if source is not self._source:
+            self._source = source
+            data = {**DEFAULT_STATS, **source}
+            if 'day_count' in data:
+                data['day_count'] = int(data['day_count'])
+            self._stats_data = data
+        return self._stats_data
+
+    def recent(self, name):
+        return self.store.recent(name)
+
+    def history_view(self, name):
+        return self.store.view(name)
+
+    def warm_start(self):
+        self.store.warm_start()
+        # Siembra el control de calidad de las lecturas interiores
+        load_clean_history(self.store, self.quality, self.clock.time(), self.primary_device)
+
+    def record(self, name, value, timestamp):
+        self.store.append(name, value, timestamp)
+        if name.startswith('interior_'):
+            self.interior.write(STORAGE_CONFIG['variables'][name], value, timestamp)
+
+    def refresh(self, now):
+        pass
+
+    def flush(self):
+        pass
+
+    def start_uplink(self):
+        pass
+
+    def get_uplink_stats(self):
+        # El envío a ThingsBoard corre en el proceso de almacenamiento
+        return None
+
+    def close(self):
+        self.store.close()
+        self.interior.close()
+        self.shared_stats.close()
+
+def _run_display(names, beat):
+    from main import WeatherStation
+
+    station = WeatherStation(mqtt_enabled=False, storage=RemoteStorage(names))
+    samples = SampleRing.attach(names['samples'])
+    reader = samples.reader(SAMPLES_DISPLAY)
+
+    def poll():
+        batch = reader.read()
+        for var, value, timestamp, flags in zip(batch['var'].tolist(), batch['value'].tolist(),
+                                                batch['ts'].tolist(), batch['flags'].tolist()):
+            if var == STATUS_VAR:
+                station.apply_status(bool(value), None if flags & BROKER_LOST else timestamp)
+            else:
+                name = VARIABLE_NAMES.get(var)
+                if name is not None:
+                    station.apply_reading(name, value, timestamp)
+
+    station.scheduler.add_task('heartbeat', MULTIPROCESS_CONFIG['heartbeat_interval'], beat)
+    station.scheduler.add_task('ring_poll', MULTIPROCESS_CONFIG['poll_interval'], poll)
+    _stop_on_signal(station.scheduler.stop)
+    try:
+        station.run()
+    finally:
+        samples.close()
+
+_RUNNERS = {'ingest': _run_ingest, 'storage': _run_storage, 'display': _run_display}
+
+def run_worker(role, names, heartbeats, index):
+    """Punto de entrada de cada proceso hijo"""
+    def beat():
+        heartbeats[index] = time.monotonic()
+
+    logger.info(f"⚙️ Proceso {role} iniciado (pid {os.getpid()})")
+    _RUNNERS[role](names, beat)
+
+# --- Supervisor --------------------------------------------------------------
+
+class _Worker:
+    def __init__(self, role, index):
+        self.role = role
+        self.index = index
+        self.process = None
+        self.started = 0.0
+        self.restarts = 0
+        self.failures = 0
+        self.restart_at = None
+        self.last_exit = None
+
+class StationSupervisor:
+    def __init__(self, config=None, workers=WORKERS):
+        self.config = config or MULTIPROCESS_CONFIG
+        self.context = multiprocessing.get_context('spawn')
+        prefix = f"{self.config['shm_prefix']}-{os.getpid()}"
+        self.names = {name: shm_name(prefix, name) for name in ('samples', 'interior', 'stats')}
+        self.workers = [_Worker(role, index) for index, role in enumerate(workers)]
+        self.heartbeats = self.context.Array('d', len(self.workers), lock=False)
+        self._restart_counters = {worker.role: WORKER_RESTARTS.labels(worker.role) for worker in self.workers}
+        self._segments = []
+        self._stop = threading.Event()
+
+    def start(self):
+        capacity = self.config['ring_capacity']
+        self._segments = [
+            SampleRing.create(self.names['samples'], capacity),
+            SampleRing.create(self.names['interior'], capacity),
+            SharedStats.create(self.names['stats'], STATS_FIELDS)
+        ]
+        for worker in self.workers:
+            self._spawn(worker)
+
+    def _spawn(self, worker):
+        # El latido inicial da margen al arranque (historial, pantalla)
+        self.heartbeats[worker.index] = time.monotonic()
+        worker.process = self.context.Process(
+            target=run_worker, args=(worker.role, self.names, self.heartbeats, worker.index),
+            name=f"estacion-{worker.role}"
+        )
+        worker.process.start()
+        worker.started = time.monotonic()
+        worker.restart_at = None
+        logger.info(f"▶️ Proceso {worker.role} lanzado (pid {worker.process.pid})")
+
+    def check(self, now=None):
+        """Reinicia los procesos terminados o colgados; devuelve cuántos se relanzaron"""
+        now = now if now is not None else time.monotonic()
+        relaunched = 0
+        for worker in self.workers:
+            if worker.restart_at is not None:
+                if now >= worker.restart_at:
+                    worker.restarts += 1
+                    self._restart_counters[worker.role].inc()
+                    self._spawn(worker)
+                    relaunched += 1
+                continue
+
+            process = worker.process
+            if process.is_alive():
+                silent = now - self.heartbeats[worker.index]
+                if silent <= self.config['heartbeat_timeout']:
+                    continue
+                logger.error(f"⏱️ Proceso {worker.role} sin latido desde hace {silent:.0f} s: se detiene")
+                self._terminate(process)
+            else:
+                logger.error(f"💥 Proceso {worker.role} terminó (código {process.exitcode})")
+            worker.last_exit = process.exitcode
+
+            # Espera exponencial en fallos seguidos; un proceso estable empieza de cero
+            if now - worker.started >= self.config['stable_after']:
+                worker.failures = 0
+            delay = min(self.config['restart_delay'] * 2 ** worker.failures, self.config['max_restart_delay'])
+            worker.failures += 1
+            worker.restart_at = now + delay
+            logger.info(f"🔁 Reinicio de {worker.role} en {delay:.1f} s")
+        return relaunched
+
+    def _terminate(self, process, timeout=5.0):
+        process.terminate()
+        process.join(timeout)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    def run(self):
+        """Supervisa los procesos hasta SIGTERM/SIGINT"""
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: self._stop.set())
+        logger.info(f"🧩 Estación multiproceso: {', '.join(worker.role for worker in self.workers)}")
+        try:
+            self.start()
+            while not self._stop.wait(self.config['heartbeat_interval']):
+                self.check()
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Detiene los procesos (SIGTERM, cada uno vuelca lo pendiente) y libera la memoria compartida"""
+        self._stop.set()
+        logger.info("⏹️ Deteniendo procesos de la estación...")
+        for worker in self.workers:
+            if worker.process and worker.process.is_alive():
+                worker.process.terminate()
+        for worker in self.workers:
+            if worker.process:
+                worker.process.join(10.0)
+                if worker.process.is_alive():
+                    worker.process.kill()
+                    worker.process.join()
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments = []
+
+    def get_stats(self):
+        now = time.monotonic()
+        stats = {
+            worker.role: {
+                'pid': worker.process.pid if worker.process else None,
+                'alive': bool(worker.process and worker.process.is_alive()),
+                'restarts': worker.restarts,
+                'last_exit': worker.last_exit,
+                'heartbeat_age': now - self.heartbeats[worker.index]
+            }
+            for worker in self.workers
+        }
+        if self._segments:
+            stats['samples_written'] = self._segments[0].head
+            stats['interior_written'] = self._segments[1].head
+        return stats
@@ -0,0 +1,169 @@
+"""
+Estadísticas móviles incrementales por ventana temporal
+
+Cada muestra actualiza mínimo, máximo, media y varianza en O(1) amortizado:
+los extremos se mantienen con colas monótonas y la media/varianza con una
+suma compensada (Kahan) y la recurrencia de Welford, que admite también la
+retirada de las muestras que salen de la ventana.
+"""
+import math
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from config import STATS_CONFIG
+
+class WindowedStats:
+    """Estadísticas de una variable sobre los últimos `window` segundos"""
+    __slots__ = ('window', 'samples', 'min_q', 'max_q', 'total', 'compensation', 'm2')
+
+    def __init__(self, window):
+        self.window = window
+        self.samples = deque()
+        self.min_q = deque()
+        self.max_q = deque()
+        self._reset_sums()
+
+    def _reset_sums(self):
+        self.total = 0.0
+        self.compensation = 0.0
+        self.m2 = 0.0
+
+    def _kahan_add(self, value):
+        y = value - self.compensation
+        t = self.total + y
+        self.compensation = (t - self.total) - y
+        self.total = t
+
+    def add(self, timestamp, value):
+        """Añade una muestra y descarta las que salen de la ventana"""
+        self.expire(timestamp)
+
+        n = len(self.samples)
+        old_mean = self.total / n if n else 0.0
+        self.samples.append((timestamp, value))
+        self._kahan_add(value)
+        new_mean = self.total / (n + 1)
+        self.m2 += (value - old_mean) * (value - new_mean)
+
+        min_q = self.min_q
+        while min_q and min_q[-1][1] >= value:
+            min_q.pop()
+        min_q.append((timestamp, value))
+
+        max_q = self.max_q
+        while max_q and max_q[-1][1] <= value:
+            max_q.pop()
+        max_q.append((timestamp, value))
+
+    def expire(self, now):
+        """Retira las muestras anteriores al inicio de la ventana"""
+        cutoff = now - self.window
+        samples = self.samples
+        while samples and samples[0][0] < cutoff:
+            _, value = samples.popleft()
+            n = len(samples)
+            if n == 0:
+                self._reset_sums()
+                break
+            old_mean = self.total / (n + 1)
+            self._kahan_add(-value)
+            new_mean = self.total / n
+            self.m2 = max(self.m2 - (value - old_mean) * (value - new_mean), 0.0)
+
+        while self.min_q and self.min_q[0][0] < cutoff:
+            self.min_q.popleft()
+        while self.max_q and self.max_q[0][0] < cutoff:
+            self.max_q.popleft()
+
+    def load(self, timestamps, values):
+        """Carga en bloque muestras ordenadas por tiempo (arranque desde disco)"""
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        if len(timestamps):
+            keep = timestamps >= timestamps[-1] - self.window
+            timestamps, values = timestamps[keep], values[keep]
+
+        self.samples = deque(zip(timestamps.tolist(), values.tolist()))
+        self._reset_sums()
+        self.min_q = deque()
+        self.max_q = deque()
+        if not len(values):
+            return
+
+        self.total = math.fsum(values.tolist())
+        self.m2 = float(np.var(values) * len(values))
+
+        # Una muestra sigue en la cola monótona si es estrictamente mejor que todas las posteriores
+        suffix_min = np.minimum.accumulate(values[::-1])[::-1]
+        suffix_max = np.maximum.accumulate(values[::-1])[::-1]
+        keep_min = np.append(values[:-1] < suffix_min[1:], True)
+        keep_max = np.append(values[:-1] > suffix_max[1:], True)
+        self.min_q = deque(zip(timestamps[keep_min].tolist(), values[keep_min].tolist()))
+        self.max_q = deque(zip(timestamps[keep_max].tolist(), values[keep_max].tolist()))
+
+    def get(self):
+        """Devuelve las estadísticas actuales de la ventana"""
+        n = len(self.samples)
+        if n == 0:
+            return None
+        variance = self.m2 / n
+        return {
+            'count': n,
+            'min': self.min_q[0][1],
+            'max': self.max_q[0][1],
+            'mean': self.total / n,
+            'variance': variance,
+            'std': math.sqrt(variance)
+        }
+
+class RollingStatsEngine:
+    """Mantiene varias ventanas temporales para cada variable medida"""
+
+    def __init__(self, variables, windows=None):
+        self.windows = windows or STATS_CONFIG['windows']
+        self._lock = threading.Lock()
+        self._stats = {
+            name: {label: WindowedStats(seconds) for label, seconds in self.windows.items()}
+            for name in variables
+        }
+
+    def add(self, name, value, timestamp=None):
+        """Incorpora una muestra a todas las ventanas de la variable"""
+        windows = self._stats.get(name)
+        if windows is None:
+            return
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            for stats in windows.values():
+                stats.add(timestamp, value)
+
+    def load(self, name, timestamps, values):
+        """Inicializa las ventanas de una variable con datos históricos"""
+        with self._lock:
+            for stats in self._stats[name].values():
+                stats.load(timestamps, values)
+
+    def expire(self, now=None):
+        """Retira muestras caducadas aunque no lleguen lecturas nuevas"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            for windows in self._stats.values():
+                for stats in windows.values():
+                    stats.expire(now)
+
+    def get(self, name, window):
+        """Devuelve min/max/media/varianza de una variable en una ventana"""
+        with self._lock:
+            return self._stats[name][window].get()
+
+    def snapshot(self):
+        """Devuelve todas las estadísticas como diccionario anidado"""
+        with self._lock:
+            return {
+                name: {label: stats.get() for label, stats in windows.items()}
+                for name, windows in self._stats.items()
+            }
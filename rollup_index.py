@@ -0,0 +1,190 @@
+"""
+Índice de agregados multirresolución para consultas históricas rápidas
+
+Por cada variable se mantienen agregados (n, mín, máx, suma) por minuto, hora
+y día en arrays numpy mapeados en memoria. Cada nivel es un anillo indexado
+por número de intervalo, de modo que una muestra actualiza un registro por
+nivel y una consulta combina los niveles más gruesos que encajan en el rango.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+
+from config import ROLLUP_CONFIG
+from logger_config import logger
+
+ROLLUP_DTYPE = np.dtype([
+    ('bucket', '<i8'),
+    ('count', '<u4'),
+    ('min', '<f4'),
+    ('max', '<f4'),
+    ('sum', '<f8')
+])
+
+class RollupLevel:
+    """Anillo de agregados de una variable a una resolución"""
+
+    def __init__(self, path, resolution, capacity):
+        self.resolution = resolution
+        self.capacity = capacity
+        self.records = self._open(path)
+        # Vistas por campo sobre el mismo mapa de memoria
+        self.bucket = self.records['bucket']
+        self.count = self.records['count']
+        self.min = self.records['min']
+        self.max = self.records['max']
+        self.sum = self.records['sum']
+
+    def _open(self, path):
+        if os.path.exists(path):
+            try:
+                records = np.lib.format.open_memmap(path, mode='r+')
+                if records.dtype == ROLLUP_DTYPE and records.shape == (self.capacity,):
+                    return records
+                logger.warning(f"Formato de {path} no coincide, se regenera")
+            except (OSError, ValueError) as e:
+                logger.error(f"Error abriendo {path}: {e}")
+        records = np.lib.format.open_memmap(path, mode='w+', dtype=ROLLUP_DTYPE, shape=(self.capacity,))
+        records['bucket'] = -1
+        return records
+
+    def add(self, timestamp, value):
+        bucket = int(timestamp // self.resolution)
+        slot = bucket % self.capacity
+        if self.bucket[slot] != bucket:
+            self.bucket[slot] = bucket
+            self.count[slot] = 1
+            self.min[slot] = value
+            self.max[slot] = value
+            self.sum[slot] = value
+        else:
+            self.count[slot] += 1
+            if value < self.min[slot]:
+                self.min[slot] = value
+            if value > self.max[slot]:
+                self.max[slot] = value
+            self.sum[slot] += value
+
+    def aggregate(self, first, last):
+        """Agrega los intervalos [first, last) presentes en el anillo"""
+        first = max(first, last - self.capacity)
+        if last <= first:
+            return None
+        buckets = np.arange(first, last, dtype=np.int64)
+        slots = buckets % self.capacity
+        valid = self.bucket[slots] == buckets
+        if not valid.any():
+            return None
+        slots = slots[valid]
+        return (
+            int(self.count[slots].sum()),
+            float(self.min[slots].min()),
+            float(self.max[slots].max()),
+            float(self.sum[slots].sum())
+        )
+
+    def flush(self):
+        self.records.flush()
+
+def _floor(value, step):
+    return (value // step) * step
+
+def _ceil(value, step):
+    return -((-value) // step) * step
+
+class RollupIndex:
+    def __init__(self, variables, data_dir=None, levels=None):
+        self.data_dir = data_dir or ROLLUP_CONFIG['data_dir']
+        self.level_specs = sorted(levels or ROLLUP_CONFIG['levels'])
+        self.resolutions = [resolution for resolution, _ in self.level_specs]
+        self._lock = threading.Lock()
+        self._levels = {}
+        self.enabled = True
+
+        try:
+            os.makedirs(self.data_dir, exist_ok=True)
+            for name in variables:
+                self._levels[name] = [
+                    RollupLevel(os.path.join(self.data_dir, f"rollup-{name}-{resolution}.npy"), resolution, capacity)
+                    for resolution, capacity in self.level_specs
+                ]
+        except OSError as e:
+            logger.error(f"Error abriendo índice de agregados en {self.data_dir}: {e}")
+            self.enabled = False
+
+    def add(self, name, value, timestamp=None):
+        """Actualiza los agregados de todos los niveles con una muestra (O(1))"""
+        levels = self._levels.get(name)
+        if not levels:
+            return
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            for level in levels:
+                level.add(timestamp, value)
+
+    def _plan(self, start, end):
+        """
+        Descompone [start, end) en tramos alineados (nivel, primer intervalo, último intervalo).
+
+        Se sube de nivel mientras el inicio no esté alineado con el siguiente y
+        después se baja hasta cubrir el final, usando siempre el nivel más grueso
+        que cabe en cada tramo.
+        """
+        resolutions = self.resolutions
+        cursor = _floor(int(start), resolutions[0])
+        stop = _ceil(int(end), resolutions[0])
+        plan = []
+
+        top = len(resolutions) - 1
+        for i, resolution in enumerate(resolutions):
+            if i < top:
+                limit = min(_ceil(cursor, resolutions[i + 1]), _floor(stop, resolution))
+            else:
+                limit = _floor(stop, resolution)
+            if limit > cursor:
+                plan.append((i, cursor // resolution, limit // resolution))
+                cursor = limit
+            if i < top and cursor % resolutions[i + 1]:
+                # El final cae antes del siguiente límite: no se puede subir más
+                break
+
+        for i in range(len(resolutions) - 1, -1, -1):
+            limit = _floor(stop, resolutions[i])
+            if limit > cursor:
+                plan.append((i, cursor // resolutions[i], limit // resolutions[i]))
+                cursor = limit
+        return plan
+
+    def query(self, name, start, end=None):
+        """Devuelve count/min/max/avg de una variable entre dos instantes (resolución de 1 minuto)"""
+        levels = self._levels.get(name)
+        if not levels:
+            return None
+        end = end if end is not None else time.time()
+
+        count, low, high, total = 0, float('inf'), float('-inf'), 0.0
+        with self._lock:
+            for level_index, first, last in self._plan(start, end):
+                result = levels[level_index].aggregate(first, last)
+                if result is None:
+                    continue
+                count += result[0]
+                low = min(low, result[1])
+                high = max(high, result[2])
+                total += result[3]
+        if count == 0:
+            return None
+        return {'count': count, 'min': low, 'max': high, 'avg': total / count}
+
+    def flush(self):
+        """Sincroniza los mapas de memoria con disco"""
+        with self._lock:
+            for levels in self._levels.values():
+                for level in levels:
+                    level.flush()
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,189 @@
+"""
+Planificador de tareas periódicas basado en un montículo de plazos
+"""
+import heapq
+import threading
+from collections import deque
+
+import metrics
+from clock import SYSTEM_CLOCK
+from logger_config import logger
+
+TASK_DURATION = metrics.histogram(
+    'station_task_duration_seconds', 'Duración de cada ejecución de una tarea periódica', ('task',)
+)
+TASK_JITTER = metrics.histogram(
+    'station_task_jitter_seconds', 'Retraso de cada ejecución respecto a su plazo', ('task',)
+)
+TASK_SKIPPED = metrics.counter(
+    'station_task_skipped_total', 'Ejecuciones saltadas por desbordes', ('task',)
+)
+
+class PeriodicTask:
+    """Tarea periódica registrada en el planificador"""
+    __slots__ = (
+        'name', 'interval', 'callback', 'deadline',
+        'runs', 'overruns', 'skipped',
+        'last_jitter', 'max_jitter', 'total_jitter',
+        'last_duration', 'max_duration',
+        'duration_metric', 'jitter_metric', 'skipped_metric'
+    )
+
+    def __init__(self, name, interval, callback, deadline):
+        self.name = name
+        self.interval = interval
+        self.callback = callback
+        self.deadline = deadline
+        self.runs = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.last_jitter = 0.0
+        self.max_jitter = 0.0
+        self.total_jitter = 0.0
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.duration_metric = TASK_DURATION.labels(name)
+        self.jitter_metric = TASK_JITTER.labels(name)
+        self.skipped_metric = TASK_SKIPPED.labels(name)
+
+    def get_stats(self):
+        """Devuelve los contadores de la tarea"""
+        return {
+            'interval': self.interval,
+            'runs': self.runs,
+            'overruns': self.overruns,
+            'skipped': self.skipped,
+            'last_jitter': self.last_jitter,
+            'max_jitter': self.max_jitter,
+            'avg_jitter': self.total_jitter / self.runs if self.runs else 0.0,
+            'last_duration': self.last_duration,
+            'max_duration': self.max_duration
+        }
+
+class Scheduler:
+    """
+    Ejecuta tareas periódicas en el hilo que llama a run_forever().
+
+    Duerme exactamente hasta el próximo plazo o hasta que otro hilo
+    notifique un evento externo con call_soon() o trigger(). Con un
+    SimulatedClock las esperas adelantan el reloj virtual en lugar de dormir.
+    """
+
+    def __init__(self, clock=None):
+        self.time_source = clock or SYSTEM_CLOCK
+        self.clock = self.time_source.monotonic
+        self._heap = []
+        self._tasks = {}
+        self._pending = deque()
+        self._wakeup = threading.Event()
+        self._running = False
+        self._counter = 0
+
+    def add_task(self, name, interval, callback, delay=0.0):
+        """Registra una tarea periódica; la primera ejecución ocurre tras `delay` segundos"""
+        if name in self._tasks:
+            raise ValueError(f"Tarea duplicada: {name}")
+        task = PeriodicTask(name, interval, callback, self.clock() + delay)
+        self._tasks[name] = task
+        self._push(task)
+        return task
+
+    def _push(self, task):
+        # El contador desempata plazos iguales sin comparar tareas
+        self._counter += 1
+        heapq.heappush(self._heap, (task.deadline, self._counter, task))
+
+    def call_soon(self, callback, *args):
+        """Encola una llamada desde cualquier hilo y despierta el bucle"""
+        self._pending.append((callback, args))
+        self._wakeup.set()
+
+    def trigger(self, name):
+        """Adelanta la siguiente ejecución de una tarea al instante actual"""
+        self.call_soon(self._run_now, name)
+
+    def _run_now(self, name):
+        task = self._tasks.get(name)
+        if task is None:
+            return
+        # Entrada obsoleta en el montículo: se descarta al extraerla
+        task.deadline = self.clock()
+        self._push(task)
+
+    def wake(self):
+        """Despierta el bucle sin trabajo adicional"""
+        self._wakeup.set()
+
+    def stop(self):
+        """Detiene run_forever() desde cualquier hilo"""
+        self._running = False
+        self._wakeup.set()
+
+    def _drain_pending(self):
+        while self._pending:
+            callback, args = self._pending.popleft()
+            try:
+                callback(*args)
+            except Exception as e:
+                logger.error(f"Error en evento del planificador: {e}")
+
+    def _run_task(self, task, now):
+        jitter = now - task.deadline
+        start = self.clock()
+        try:
+            task.callback()
+        except Exception as e:
+            logger.error(f"Error en tarea '{task.name}': {e}")
+        end = self.clock()
+
+        duration = end - start
+        task.runs += 1
+        task.last_jitter = jitter
+        task.total_jitter += jitter
+        if jitter > task.max_jitter:
+            task.max_jitter = jitter
+        task.last_duration = duration
+        if duration > task.max_duration:
+            task.max_duration = duration
+        task.duration_metric.observe(duration)
+        task.jitter_metric.observe(jitter)
+
+        # Reprogramar sobre el plazo (no sobre el instante real) para no acumular deriva
+        task.deadline += task.interval
+        if task.deadline <= end:
+            task.overruns += 1
+            missed = int((end - task.deadline) // task.interval) + 1
+            task.skipped += missed
+            task.skipped_metric.inc(missed)
+            task.deadline += missed * task.interval
+        self._push(task)
+
+    def run_pending(self):
+        """Ejecuta eventos y tareas vencidas; devuelve segundos hasta el próximo plazo"""
+        self._drain_pending()
+        while self._heap:
+            deadline, _, task = self._heap[0]
+            if deadline != task.deadline:
+                heapq.heappop(self._heap)
+                continue
+            now = self.clock()
+            if deadline > now:
+                return deadline - now
+            heapq.heappop(self._heap)
+            self._run_task(task, now)
+            self._drain_pending()
+        return None
+
+    def run_forever(self):
+        """Bucle principal: ejecuta tareas y duerme hasta el siguiente plazo o evento"""
+        self._running = True
+        while self._running:
+            timeout = self.run_pending()
+            if not self._running:
+                break
+            self.time_source.wait(self._wakeup, timeout)
+            self._wakeup.clear()
+
+    def get_stats(self):
+        """Devuelve contadores de retraso (jitter) y desbordes por tarea"""
+        return {name: task.get_stats() for name, task in self._tasks.items()}
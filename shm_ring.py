@@ -0,0 +1,226 @@
+"""
+Anillo de muestras en memoria compartida entre procesos
+
+SampleRing es un búfer circular de registros de tamaño fijo sobre
+multiprocessing.shared_memory, sin locks: un único proceso escribe y cada
+lector avanza su propio cursor, guardado también en la memoria compartida
+para que un lector que se reinicia continúe donde lo dejó.
+
+Cada registro lleva su número de secuencia (índice + 1). El escritor copia
+el registro con secuencia 0, escribe después la secuencia y solo entonces
+publica la nueva cabecera; el lector copia un bloque, vuelve a leer la
+cabecera y descarta los registros que el escritor pudo pisar mientras
+copiaba, incluido el hueco que puede estar escribiendo en ese momento. Si un
+lector se queda más de `capacity` registros atrás pierde los más antiguos
+(se cuentan en `lost`) en lugar de frenar al escritor.
+
+SharedStats publica un bloque pequeño de float64 (las estadísticas de la
+pantalla) con el mismo esquema de secuencia par/impar.
+"""
+import math
+import os
+import struct
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# secuencia (u64), timestamp (f64), valor (f64), id de variable (u16), origen (u16), marcas (u32)
+SAMPLE = struct.Struct('<QddHHI')
+SAMPLE_DTYPE = np.dtype([
+    ('seq', '<u8'), ('ts', '<f8'), ('value', '<f8'),
+    ('var', '<u2'), ('source', '<u2'), ('flags', '<u4')
+])
+SEQ = struct.Struct('<Q')
+
+RING_MAGIC = 0x31474E4952534D45   # b'EMSRING1'
+MAX_READERS = 8
+# Palabras u64 de la cabecera: magia y capacidad, cabeza y cursores en líneas de caché distintas
+MAGIC_WORD, CAPACITY_WORD, HEAD_WORD, CURSOR_WORD = 0, 1, 8, 16
+HEADER_SIZE = (CURSOR_WORD + MAX_READERS) * 8
+
+def shm_name(prefix, name):
+    """Nombre del segmento: el prefijo evita choques entre instancias"""
+    return f"{prefix}-{name}"
+
+class SampleRing:
+    def __init__(self, shm, owner):
+        self.shm = shm
+        self.owner = owner
+        self._header = np.ndarray((HEADER_SIZE // 8,), dtype='<u8', buffer=shm.buf)
+        if int(self._header[MAGIC_WORD]) != RING_MAGIC:
+            raise ValueError(f"Segmento {shm.name} no es un anillo de muestras")
+        self.capacity = int(self._header[CAPACITY_WORD])
+        self._records = np.ndarray((self.capacity,), dtype=SAMPLE_DTYPE, buffer=shm.buf, offset=HEADER_SIZE)
+        self._buf = shm.buf
+        self.written = 0
+
+    @classmethod
+    def create(cls, name, capacity):
+        """Crea el segmento (lo hace el supervisor, que es quien lo elimina)"""
+        shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER_SIZE + capacity * SAMPLE.size)
+        header = np.ndarray((HEADER_SIZE // 8,), dtype='<u8', buffer=shm.buf)
+        header[:] = 0
+        header[CAPACITY_WORD] = capacity
+        header[MAGIC_WORD] = RING_MAGIC
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def head(self):
+        """Registros escritos desde que se creó el anillo"""
+        return int(self._header[HEAD_WORD])
+
+    def write(self, var, value, timestamp, source=0, flags=0):
+        """Añade un registro (solo desde el proceso escritor)"""
+        index = int(self._header[HEAD_WORD])
+        offset = HEADER_SIZE + (index % self.capacity) * SAMPLE.size
+        # Secuencia 0 mientras se copian los datos: el lector lo ve como no válido
+        SAMPLE.pack_into(self._buf, offset, 0, timestamp, value, var, source, flags)
+        SEQ.pack_into(self._buf, offset, index + 1)
+        self._header[HEAD_WORD] = index + 1
+        self.written += 1
+
+    def reader(self, slot):
+        return RingReader(self, slot)
+
+    def close(self):
+        self._header = None
+        self._records = None
+        self._buf = None
+        self.shm.close()
+
+    def unlink(self):
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+class RingReader:
+    """Lector de un anillo con cursor propio en la ranura `slot` de la cabecera"""
+
+    def __init__(self, ring, slot):
+        if not 0 <= slot < MAX_READERS:
+            raise ValueError(f"Ranura de lector fuera de rango: {slot}")
+        self.ring = ring
+        self.slot = CURSOR_WORD + slot
+        self.lost = 0
+        self.read_count = 0
+
+    @property
+    def cursor(self):
+        return int(self.ring._header[self.slot])
+
+    def pending(self):
+        return self.ring.head - self.cursor
+
+    def read(self, limit=None):
+        """
+        Devuelve un array estructurado (copia) con los registros nuevos y
+        avanza el cursor compartido.
+        """
+        ring = self.ring
+        header = ring._header
+        capacity = ring.capacity
+        cursor = int(header[self.slot])
+        head = int(header[HEAD_WORD])
+        if head - cursor > capacity:
+            # El escritor dio la vuelta: los más antiguos ya no existen
+            self.lost += head - cursor - capacity
+            cursor = head - capacity
+        if limit is not None:
+            head = min(head, cursor + limit)
+        if head <= cursor:
+            return ring._records[:0].copy()
+
+        start, end = cursor % capacity, head % capacity
+        if start < end:
+            batch = ring._records[start:end].copy()
+        else:
+            batch = np.concatenate((ring._records[start:], ring._records[:end]))
+        expected = np.arange(cursor + 1, head + 1, dtype='<u8')
+
+        # Lo que el escritor pudo sobrescribir durante la copia no es fiable,
+        # incluido el hueco del registro que puede estar escribiendo ahora
+        # (índice head_after): datos y secuencia se copian en una sola operación
+        overwritten = int(header[HEAD_WORD]) - capacity - cursor + 1
+        valid = batch['seq'] == expected
+        if overwritten > 0:
+            valid[:overwritten] = False
+        if not valid.all():
+            self.lost += int((~valid).sum())
+            batch = batch[valid]
+
+        header[self.slot] = head
+        self.read_count += len(batch)
+        return batch
+
+    def get_stats(self):
+        return {'cursor': self.cursor, 'pending': self.pending(), 'read': self.read_count, 'lost': self.lost}
+
+class SharedStats:
+    """Bloque de float64 con nombre por campo; NaN = sin valor"""
+
+    def __init__(self, shm, fields, owner):
+        self.shm = shm
+        self.fields = tuple(fields)
+        self.owner = owner
+        self._seq = np.ndarray((1,), dtype='<u8', buffer=shm.buf)
+        self._values = np.ndarray((len(self.fields),), dtype='<f8', buffer=shm.buf, offset=8)
+        self._last_seq = None
+        self._last = {}
+
+    @classmethod
+    def create(cls, name, fields):
+        shm = shared_memory.SharedMemory(name=name, create=True, size=8 + 8 * len(fields))
+        stats = cls(shm, fields, owner=True)
+        stats._values[:] = math.nan
+        return stats
+
+    @classmethod
+    def attach(cls, name, fields):
+        return cls(shared_memory.SharedMemory(name=name), fields, owner=False)
+
+    @property
+    def version(self):
+        return int(self._seq[0])
+
+    def publish(self, data):
+        """Publica un diccionario (solo desde el proceso escritor)"""
+        values = np.array([data.get(field, math.nan) for field in self.fields], dtype='<f8')
+        self._seq[0] += 1   # impar: escritura en curso
+        self._values[:] = values
+        self._seq[0] += 1
+
+    def read(self):
+        """
+        Devuelve el último diccionario publicado (el mismo objeto mientras no
+        cambie, para que los lectores puedan compararlo por identidad).
+        """
+        for _ in range(100):
+            seq = int(self._seq[0])
+            if seq == self._last_seq:
+                return self._last
+            if seq & 1:
+                os.sched_yield()
+                continue
+            values = self._values.tolist()
+            if int(self._seq[0]) == seq:
+                self._last_seq = seq
+                self._last = {field: value for field, value in zip(self.fields, values) if not math.isnan(value)}
+                return self._last
+        return self._last
+
+    def close(self):
+        self._seq = None
+        self._values = None
+        self.shm.close()
+
+    def unlink(self):
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,78 @@
+"""
+Informe de tiempos de arranque
+
+Cada fase se registra con el instante en que empieza y termina respecto al
+arranque del proceso, de modo que se ve qué se ejecutó en paralelo y qué
+retrasó el primer fotograma.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from logger_config import logger
+
+def _process_age():
+    """Segundos desde que arrancó el proceso (desde /proc; 0 si no está disponible)"""
+    try:
+        with open('/proc/self/stat') as f:
+            # El nombre del proceso puede tener espacios: se parte tras el último ')'
+            fields = f.read().rsplit(')', 1)[1].split()
+        start_ticks = int(fields[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return max(uptime - start_ticks / os.sysconf('SC_CLK_TCK'), 0.0)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+class StartupTimer:
+    def __init__(self):
+        self._origin = time.perf_counter() - _process_age()
+        self._lock = threading.Lock()
+        self.phases = []
+        self.marks = {}
+
+    def now(self):
+        """Segundos desde el arranque del proceso"""
+        return time.perf_counter() - self._origin
+
+    @contextmanager
+    def phase(self, name):
+        """Mide una fase (puede usarse desde varios hilos a la vez)"""
+        start = self.now()
+        try:
+            yield
+        finally:
+            end = self.now()
+            with self._lock:
+                self.phases.append((name, start, end, threading.current_thread().name))
+
+    def mark(self, name):
+        """Registra un hito (p. ej. primer fotograma)"""
+        with self._lock:
+            self.marks.setdefault(name, self.now())
+
+    def report(self):
+        """Devuelve fases e hitos ordenados por inicio, en milisegundos"""
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1])
+            marks = dict(self.marks)
+        return {
+            'phases': [
+                {'name': name, 'start_ms': start * 1000, 'duration_ms': (end - start) * 1000, 'thread': thread}
+                for name, start, end, thread in phases
+            ],
+            'marks': {name: value * 1000 for name, value in sorted(marks.items(), key=lambda item: item[1])}
+        }
+
+    def log_report(self):
+        report = self.report()
+        logger.info("⏱️ Tiempos de arranque (ms desde el inicio del proceso):")
+        for phase in report['phases']:
+            logger.info(
+                f"   {phase['name']:<24} {phase['start_ms']:>8.1f} +{phase['duration_ms']:>7.1f}  [{phase['thread']}]"
+            )
+        for name, value in report['marks'].items():
+            logger.info(f"   ➤ {name:<22} {value:>8.1f}")
+
+startup = StartupTimer()
@@ -0,0 +1,88 @@
+"""
+Estado versionado de la estación con instantáneas inmutables
+
+Los escritores (hilo MQTT, bucle principal) publican un registro nuevo con un
+único intercambio de referencia; los lectores obtienen siempre un estado
+completo y coherente sin tomar ningún cerrojo. El número de secuencia permite
+saber si algo cambió desde la última lectura.
+"""
+import threading
+
+STATE_FIELDS = (
+    'interior_temp',
+    'interior_humidity',
+    'interior_pressure',
+    'exterior_temp',
+    'exterior_humidity',
+    'exterior_pressure',
+    'exterior_feels_like',
+    'exterior_online',
+    'temp_history',
+    'last_update',
+    'last_alert_time'
+)
+
+class StationState:
+    """Registro inmutable; se accede como atributo o como diccionario de solo lectura"""
+    __slots__ = STATE_FIELDS + ('seq',)
+
+    def __init__(self, seq=0, **values):
+        missing = set(STATE_FIELDS) - set(values)
+        if missing:
+            raise KeyError(f"Faltan campos de estado: {sorted(missing)}")
+        object.__setattr__(self, 'seq', seq)
+        for name in STATE_FIELDS:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("StationState es inmutable; usa StateCell.publish()")
+
+    def __getitem__(self, key):
+        if key not in STATE_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        if key not in STATE_FIELDS:
+            return default
+        return getattr(self, key)
+
+    def evolve(self, seq, changes):
+        """Devuelve una copia con los campos indicados cambiados"""
+        unknown = changes.keys() - set(STATE_FIELDS)
+        if unknown:
+            raise KeyError(f"Campos de estado desconocidos: {sorted(unknown)}")
+        new = object.__new__(StationState)
+        object.__setattr__(new, 'seq', seq)
+        for name in STATE_FIELDS:
+            object.__setattr__(new, name, changes[name] if name in changes else getattr(self, name))
+        return new
+
+    def as_dict(self):
+        """Copia en diccionario (incluye 'seq')"""
+        values = {name: getattr(self, name) for name in STATE_FIELDS}
+        values['seq'] = self.seq
+        return values
+
+class StateCell:
+    """Celda con la instantánea actual; solo los escritores se serializan entre sí"""
+
+    def __init__(self, initial):
+        self._state = initial
+        self._write_lock = threading.Lock()
+
+    def snapshot(self):
+        """Devuelve el estado actual (lectura atómica de una referencia)"""
+        return self._state
+
+    @property
+    def seq(self):
+        return self._state.seq
+
+    def publish(self, **changes):
+        """Publica un estado nuevo con los cambios indicados y devuelve la nueva instantánea"""
+        with self._write_lock:
+            current = self._state
+            new = current.evolve(current.seq + 1, changes)
+            self._state = new
+        return new
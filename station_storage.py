@@ -0,0 +1,153 @@
+"""
+Persistencia y estadísticas de las lecturas de la estación
+
+StationStorage reúne el almacén de series temporales, las estadísticas
+móviles, el índice de agregados y el envío a ThingsBoard detrás de una sola
+interfaz (record, refresh, flush). La usa WeatherStation en el modo de un
+proceso y el proceso de almacenamiento en el modo multiproceso
+(multiprocess_station), que publica stats_data en memoria compartida.
+"""
+from datetime import datetime
+
+import metrics
+from config import STORAGE_CONFIG, STATS_CONFIG
+from logger_config import logger
+from timeseries_store import TimeSeriesStore
+from rolling_stats import RollingStatsEngine
+from rollup_index import RollupIndex
+from telemetry_uplink import TelemetryUplink
+
+# Campos de stats_data: estadísticas de 24 h y agregados de hoy, 7 y 30 días
+STATS_FIELDS = (
+    'day_max', 'day_min', 'day_avg', 'variation', 'day_std', 'day_count',
+    'today_max', 'today_min', 'today_avg',
+    'week_max', 'week_min', 'week_avg',
+    'month_max', 'month_min', 'month_avg'
+)
+# Valores mostrados hasta que hay lecturas suficientes
+DEFAULT_STATS = {
+    'day_max': 25.0,
+    'day_min': 15.0,
+    'day_avg': 20.0,
+    'variation': 10.0
+}
+
+def load_clean_history(store, quality, now, primary_device):
+    """
+    Lee del disco las lecturas de la ventana estadística más larga, descarta
+    en bloque las que no pasan el control de calidad y siembra con ellas los
+    filtros de `quality`. Devuelve {variable: registros limpios}.
+    """
+    records = store.read_range(now - max(STATS_CONFIG['windows'].values()), now)
+    records = records[records['ts'].argsort(kind='stable')]
+    history = {}
+    for name, var_id in STORAGE_CONFIG['variables'].items():
+        selected = records[records['var'] == var_id]
+        # Lecturas guardadas antes del control de calidad se limpian en bloque
+        reasons = quality.clean_bulk(name, selected['ts'], selected['value'])
+        if reasons.any():
+            logger.info(f"🧹 {name}: {int((reasons != 0).sum())} lecturas históricas descartadas")
+            selected = selected[reasons == 0]
+        if len(selected):
+            source = 'local' if name.startswith('interior_') else primary_device
+            quality.seed(name, selected['value'].tolist(), float(selected['ts'][-1]), source)
+        history[name] = selected
+    return history
+
+class StationStorage:
+    def __init__(self, clock, quality, primary_device):
+        self.clock = clock
+        self.quality = quality
+        self.primary_device = primary_device
+        self.store = TimeSeriesStore(clock=clock)
+        self.stats = RollingStatsEngine(STORAGE_CONFIG['variables'])
+        self.rollups = RollupIndex(STORAGE_CONFIG['variables'])
+        self.uplink = TelemetryUplink()
+        self.period_stats = {}
+        self.stats_data = DEFAULT_STATS
+        self._register_gauges()
+
+    def _register_gauges(self):
+        metrics.gauge('station_uplink_queue_depth', 'Lecturas pendientes de enviar a ThingsBoard',
+                      function=lambda: self.uplink.get_stats()['queue_depth'])
+        metrics.gauge('station_uplink_spool_depth', 'Lotes guardados en disco sin enviar',
+                      function=lambda: self.uplink.get_stats()['spool_depth'])
+        metrics.gauge('station_uplink_lag_seconds', 'Retraso del último lote confirmado por ThingsBoard',
+                      function=lambda: self.uplink.last_lag)
+
+    def recent(self, name):
+        """Deque (timestamp, valor) de las últimas horas de una variable"""
+        return self.store.recent(name)
+
+    def history_view(self, name):
+        """Vista inmutable O(1) del historial para publicarla en el estado"""
+        return self.store.view(name)
+
+    def warm_start(self):
+        """Recupera el historial reciente y las estadísticas móviles desde disco"""
+        self.store.warm_start()
+        history = load_clean_history(self.store, self.quality, self.clock.time(), self.primary_device)
+        for name, records in history.items():
+            self.stats.load(name, records['ts'], records['value'])
+        self.update_period_stats()
+        self.calculate_stats()
+
+    def record(self, name, value, timestamp):
+        """Guarda una lectura en el historial persistente, las estadísticas y el envío"""
+        self.store.append(name, value, timestamp)
+        self.stats.add(name, value, timestamp)
+        self.rollups.add(name, value, timestamp)
+        self.uplink.record(name, value, timestamp)
+        if name == 'exterior_temp':
+            self.calculate_stats()
+
+    def calculate_stats(self):
+        """Publica las estadísticas diarias a partir de la ventana móvil de 24 h"""
+        day = self.stats.get('exterior_temp', STATS_CONFIG['day_window'])
+        if day is None:
+            return
+        # Se sustituye el diccionario completo para que los lectores nunca vean uno a medias
+        self.stats_data = {
+            'day_max': day['max'],
+            'day_min': day['min'],
+            'day_avg': day['mean'],
+            'variation': day['max'] - day['min'],
+            'day_std': day['std'],
+            'day_count': day['count'],
+            **self.period_stats
+        }
+
+    def update_period_stats(self):
+        """Consulta los agregados de hoy, últimos 7 días y últimos 30 días"""
+        now = self.clock.time()
+        today = datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+        periods = {}
+        for period, start in (('today', today), ('week', now - 7 * 86400), ('month', now - 30 * 86400)):
+            result = self.rollups.query('exterior_temp', start, now)
+            if result:
+                periods[f'{period}_max'] = result['max']
+                periods[f'{period}_min'] = result['min']
+                periods[f'{period}_avg'] = result['avg']
+        self.period_stats = periods
+
+    def refresh(self, now):
+        """Caduca las ventanas aunque no lleguen lecturas y recalcula las estadísticas"""
+        self.stats.expire(now)
+        self.update_period_stats()
+        self.calculate_stats()
+
+    def flush(self):
+        """Vuelca a disco las lecturas pendientes y los agregados"""
+        self.store.flush()
+        self.rollups.flush()
+
+    def start_uplink(self):
+        self.uplink.start()
+
+    def get_uplink_stats(self):
+        return self.uplink.get_stats()
+
+    def close(self):
+        self.uplink.stop()
+        self.store.close()
+        self.rollups.close()
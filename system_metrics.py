@@ -0,0 +1,193 @@
+"""
+Muestreo en segundo plano de las métricas del sistema para la página de estadísticas
+
+Un hilo propio lee CPU, memoria, temperatura, uptime y señal WiFi cada
+SYSTEM_METRICS_CONFIG['interval'] segundos directamente de /proc y /sys, con
+los ficheros abiertos una sola vez y releídos desde el principio. La página
+solo copia el último muestreo y el historial corto para las minigráficas.
+"""
+import threading
+import time
+from collections import deque
+
+from config import SYSTEM_METRICS_CONFIG
+from logger_config import logger
+
+# Medidas con historial para las minigráficas
+SPARKLINE_FIELDS = ('cpu_usage', 'ram_usage', 'cpu_temp', 'wifi_signal')
+
+def format_uptime(seconds):
+    """Formatea segundos como 'Xd Yh Zm'"""
+    seconds = max(int(seconds), 0)
+    return f"{seconds // 86400}d {(seconds % 86400) // 3600}h {(seconds % 3600) // 60}m"
+
+def rssi_to_percent(dbm):
+    """Convierte RSSI (dBm) a calidad 0-100 % (-100 dBm = 0 %, -50 dBm = 100 %)"""
+    return int(min(max(2 * (dbm + 100), 0), 100))
+
+class _ProcFile:
+    """Fichero de /proc o /sys abierto una vez y releído desde el inicio en cada muestreo"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._failed = False
+
+    def read(self):
+        if self._failed:
+            return None
+        if self._file is None:
+            try:
+                self._file = open(self.path, 'rb')
+            except OSError as e:
+                # El fichero no existe en esta placa (p. ej. sin zona térmica): no se reintenta
+                logger.warning(f"No se puede abrir {self.path}: {e}")
+                self._failed = True
+                return None
+        try:
+            self._file.seek(0)
+            return self._file.read()
+        except OSError as e:
+            # Error puntual (interfaz que desaparece, sysfs ocupado): se reabre en el siguiente muestreo
+            logger.warning(f"No se puede leer {self.path}: {e}")
+            self.close()
+            return None
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class SystemMetricsSampler:
+    def __init__(self, config=None):
+        self.config = config or SYSTEM_METRICS_CONFIG
+        self.interface = self.config['wifi_interface'].encode()
+
+        self._stat = _ProcFile('/proc/stat')
+        self._meminfo = _ProcFile('/proc/meminfo')
+        self._uptime = _ProcFile('/proc/uptime')
+        self._wireless = _ProcFile('/proc/net/wireless')
+        self._thermal = _ProcFile(self.config['thermal_path'])
+        self._last_cpu = None
+
+        self._history = {name: deque(maxlen=self.config['history']) for name in SPARKLINE_FIELDS}
+        self._latest = None
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.samples = 0
+        self.last_sample_ms = 0.0
+
+    # --- API para la estación ---------------------------------------------
+
+    def start(self):
+        """Arranca el hilo de muestreo"""
+        if self._thread:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='system-metrics', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Detiene el hilo y cierra los ficheros"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        for source in (self._stat, self._meminfo, self._uptime, self._wireless, self._thermal):
+            source.close()
+
+    def latest(self):
+        """Último muestreo con el historial de minigráficas (no lee /proc salvo la primera vez)"""
+        latest = self._latest
+        if latest is None:
+            latest = self.sample()
+        return latest
+
+    # --- Muestreo ---------------------------------------------------------
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Error muestreando métricas del sistema: {e}")
+            self._stop.wait(self.config['interval'])
+
+    def sample(self):
+        """Lee todas las fuentes, añade al historial y publica un diccionario nuevo"""
+        start = time.perf_counter()
+        uptime = self._read_uptime()
+        rssi = self._read_wifi_rssi()
+        values = {
+            'cpu_usage': self._read_cpu(),
+            'ram_usage': self._read_memory(),
+            'cpu_temp': self._read_cpu_temp(),
+            'wifi_signal': rssi_to_percent(rssi) if rssi is not None else None,
+            'wifi_rssi': rssi,
+            'uptime_s': uptime,
+            'uptime': format_uptime(uptime)
+        }
+        for name in SPARKLINE_FIELDS:
+            if values[name] is not None:
+                self._history[name].append(values[name])
+        # Diccionario nuevo en cada muestreo: el lector nunca ve uno a medias
+        values['history'] = {name: tuple(series) for name, series in self._history.items()}
+        self._latest = values
+        self.samples += 1
+        self.last_sample_ms = (time.perf_counter() - start) * 1000
+        return values
+
+    def _read_cpu(self):
+        """Porcentaje de CPU ocupada desde el muestreo anterior (línea agregada de /proc/stat)"""
+        data = self._stat.read()
+        if not data:
+            return 0.0
+        fields = [int(value) for value in data.split(b'\n', 1)[0].split()[1:]]
+        idle = fields[3] + (fields[4] if len(fields) > 4 else 0)
+        total = sum(fields[:8])
+        previous, self._last_cpu = self._last_cpu, (idle, total)
+        if previous is None or total <= previous[1]:
+            return 0.0
+        return 100.0 * (1.0 - (idle - previous[0]) / (total - previous[1]))
+
+    def _read_memory(self):
+        """Porcentaje de memoria en uso (MemTotal - MemAvailable)"""
+        data = self._meminfo.read()
+        if not data:
+            return 0.0
+        total = available = None
+        for line in data.split(b'\n'):
+            if line.startswith(b'MemTotal:'):
+                total = int(line.split()[1])
+            elif line.startswith(b'MemAvailable:'):
+                available = int(line.split()[1])
+                break
+        if not total or available is None:
+            return 0.0
+        return 100.0 * (total - available) / total
+
+    def _read_cpu_temp(self):
+        """Temperatura de la CPU en °C desde la zona térmica (miligrados); None si no hay zona"""
+        data = self._thermal.read()
+        if not data:
+            return None
+        return int(data) / 1000.0
+
+    def _read_uptime(self):
+        data = self._uptime.read()
+        return float(data.split()[0]) if data else 0.0
+
+    def _read_wifi_rssi(self):
+        """Nivel de señal (dBm) de la interfaz WiFi en /proc/net/wireless; None si no está asociada"""
+        data = self._wireless.read()
+        if not data:
+            return None
+        for line in data.split(b'\n')[2:]:
+            name, _, rest = line.partition(b':')
+            if name.strip() == self.interface:
+                # estado, calidad del enlace, nivel, ruido...
+                level = float(rest.split()[2].rstrip(b'.'))
+                # Controladores antiguos dan el nivel en escala 0-255 sin signo
+                return int(level - 256 if level > 0 else level)
+        return None
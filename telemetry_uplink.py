@@ -0,0 +1,277 @@
+"""
+Envío de telemetría a ThingsBoard por lotes con almacenamiento diferido
+
+Las lecturas se acumulan en memoria y se envían por lotes en el formato de
+ThingsBoard ([{"ts": ms, "values": {...}}, ...]) desde un hilo propio con una
+única conexión MQTT persistente. Si no hay conexión, cada lote se guarda
+comprimido en un directorio de cola en disco y se reenvía al reconectar a un
+ritmo acotado.
+
+Para probarlo sin ThingsBoard basta con apuntar MQTT_CONFIG['THINGSBOARD'] a
+un mosquitto local y escuchar con:
+
+    mosquitto_sub -h localhost -t v1/devices/me/telemetry -v
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+import zlib
+from collections import deque
+
+from config import MQTT_CONFIG, TELEMETRY_CONFIG
+from logger_config import logger
+
+SPOOL_PREFIX = 'batch-'
+SPOOL_SUFFIX = '.json.z'
+# Lotes ilegibles que no se pudieron borrar: fuera de la cola para no reintentarlos
+QUARANTINE_SUFFIX = '.bad'
+
+class TelemetryUplink:
+    def __init__(self, config=None, broker=None):
+        self.config = config or TELEMETRY_CONFIG
+        self.broker = broker or MQTT_CONFIG['THINGSBOARD']
+        self.spool_dir = self.config['spool_dir']
+
+        self._pending = deque(maxlen=self.config['max_pending'])
+        self._stop = threading.Event()
+        self._thread = None
+        self._client = None
+        self._connected = False
+        # Lotes enviados sin confirmar (mid -> ts más antiguo) y confirmaciones que
+        # llegaron antes de registrar su mid; los dos se tocan desde el hilo de paho
+        self._inflight_lock = threading.Lock()
+        self._inflight = {}
+        self._early_acks = set()
+        self._spool_seq = 0
+
+        self.batches_sent = 0
+        self.readings_sent = 0
+        self.readings_dropped = 0
+        self.last_batch_size = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+        try:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            self._spool_seq = self._next_spool_seq()
+        except OSError as e:
+            logger.error(f"Error creando cola de telemetría en {self.spool_dir}: {e}")
+
+    # --- API para la estación ---------------------------------------------
+
+    def record(self, name, value, timestamp=None):
+        """Encola una lectura para el próximo lote (no bloquea)"""
+        if timestamp is None:
+            timestamp = time.time()
+        if len(self._pending) == self._pending.maxlen:
+            self.readings_dropped += 1
+        self._pending.append((int(timestamp * 1000), name, value))
+
+    def start(self):
+        """Conecta con ThingsBoard y arranca el hilo de envío"""
+        if self._thread:
+            return
+        self._connect()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='telemetry-uplink', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Envía o guarda lo pendiente y cierra la conexión"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self._flush_batch()
+        if self._client:
+            self._client.loop_stop()
+            self._client.disconnect()
+            self._client = None
+
+    def get_stats(self):
+        """Devuelve métricas de cola, lotes y retraso extremo a extremo"""
+        return {
+            'connected': self._connected,
+            'queue_depth': len(self._pending),
+            'spool_depth': len(self._spool_files()),
+            'batches_sent': self.batches_sent,
+            'readings_sent': self.readings_sent,
+            'readings_dropped': self.readings_dropped,
+            'last_batch_size': self.last_batch_size,
+            'last_lag_s': self.last_lag,
+            'max_lag_s': self.max_lag
+        }
+
+    # --- Conexión ---------------------------------------------------------
+
+    def _connect(self):
+        try:
+            import paho.mqtt.client as mqtt
+            self._client = mqtt.Client()
+            self._client.username_pw_set(self.broker['token'])
+            self._client.on_connect = self._on_connect
+            self._client.on_disconnect = self._on_disconnect
+            self._client.on_publish = self._on_publish
+            self._client.reconnect_delay_set(1, self.config['max_reconnect_delay'])
+            self._client.connect_async(self.broker['host'], self.broker['port'], 60)
+            self._client.loop_start()
+        except Exception as e:
+            logger.error(f"Error configurando conexión con ThingsBoard: {e}")
+            self._client = None
+
+    def _on_connect(self, client, userdata, flags, rc):
+        self._connected = rc == 0
+        if self._connected:
+            logger.info("☁️ Conectado a ThingsBoard")
+        else:
+            logger.error(f"❌ Error conectando a ThingsBoard: {rc}")
+
+    def _on_disconnect(self, client, userdata, rc):
+        if self._connected:
+            logger.warning("☁️ Desconectado de ThingsBoard, guardando telemetría en disco")
+        self._connected = False
+
+    def _on_publish(self, client, userdata, mid):
+        with self._inflight_lock:
+            oldest = self._inflight.pop(mid, None)
+            if oldest is None:
+                # PUBACK más rápido que el retorno de publish(): lo resuelve _publish
+                self._early_acks.add(mid)
+                return
+        self._record_lag(oldest)
+
+    def _record_lag(self, oldest):
+        lag = time.time() - oldest / 1000
+        self.last_lag = lag
+        if lag > self.max_lag:
+            self.max_lag = lag
+
+    # --- Lotes ------------------------------------------------------------
+
+    def _run(self):
+        batch_interval = self.config['batch_interval']
+        next_batch = time.monotonic() + batch_interval
+        while not self._stop.wait(1.0):
+            # Un error de disco (tarjeta SD) no puede matar el hilo y dejar las lecturas sin enviar
+            try:
+                if time.monotonic() >= next_batch or len(self._pending) >= self.config['max_batch']:
+                    self._flush_batch()
+                    next_batch = time.monotonic() + batch_interval
+                if self._connected:
+                    self._drain_spool(self.config['drain_rate'])
+            except Exception as e:
+                logger.error(f"Error en el envío de telemetría: {e}")
+
+    def _take_batch(self):
+        """Agrupa las lecturas pendientes por marca de tiempo en el formato de ThingsBoard"""
+        readings = []
+        max_batch = self.config['max_batch']
+        while self._pending and len(readings) < max_batch:
+            readings.append(self._pending.popleft())
+        if not readings:
+            return None, 0
+        grouped = {}
+        for ts, name, value in readings:
+            grouped.setdefault(ts, {})[name] = value
+        return [{'ts': ts, 'values': values} for ts, values in sorted(grouped.items())], len(readings)
+
+    def _encode(self, batch):
+        payload = json.dumps(batch, separators=(',', ':')).encode('utf-8')
+        if self.config['compress']:
+            payload = zlib.compress(payload, self.config['compression_level'])
+        return payload
+
+    def _flush_batch(self):
+        while self._pending:
+            batch, count = self._take_batch()
+            if batch is None:
+                return
+            self.last_batch_size = count
+            if not (self._connected and self._publish(batch, count)):
+                self._spool(batch)
+
+    def _publish(self, batch, count):
+        try:
+            info = self._client.publish(self.config['topic'], self._encode(batch), qos=1)
+        except Exception as e:
+            logger.error(f"Error publicando telemetría: {e}")
+            return False
+        if info.rc != 0:
+            return False
+        with self._inflight_lock:
+            acked = info.mid in self._early_acks
+            if acked:
+                self._early_acks.discard(info.mid)
+            else:
+                self._inflight[info.mid] = batch[0]['ts']
+        if acked:
+            self._record_lag(batch[0]['ts'])
+        self.batches_sent += 1
+        self.readings_sent += count
+        return True
+
+    # --- Cola en disco ----------------------------------------------------
+
+    def _spool_files(self):
+        try:
+            return sorted(
+                name for name in os.listdir(self.spool_dir)
+                if name.startswith(SPOOL_PREFIX) and name.endswith(SPOOL_SUFFIX)
+            )
+        except OSError:
+            return []
+
+    def _next_spool_seq(self):
+        files = self._spool_files()
+        if not files:
+            return 0
+        return int(files[-1][len(SPOOL_PREFIX):-len(SPOOL_SUFFIX)]) + 1
+
+    def _spool(self, batch):
+        """Guarda un lote comprimido en disco (escritura atómica)"""
+        files = self._spool_files()
+        if len(files) >= self.config['max_spool_files']:
+            # Cola llena: se descarta el lote más antiguo
+            with contextlib.suppress(OSError):
+                os.remove(os.path.join(self.spool_dir, files[0]))
+
+        data = zlib.compress(json.dumps(batch, separators=(',', ':')).encode('utf-8'), self.config['compression_level'])
+        path = os.path.join(self.spool_dir, f"{SPOOL_PREFIX}{self._spool_seq:012d}{SPOOL_SUFFIX}")
+        self._spool_seq += 1
+        try:
+            with open(path + '.tmp', 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(path + '.tmp', path)
+        except OSError as e:
+            logger.error(f"Error guardando telemetría en disco: {e}")
+
+    def _drain_spool(self, limit):
+        """Reenvía como mucho `limit` lotes guardados en disco"""
+        for name in self._spool_files()[:limit]:
+            path = os.path.join(self.spool_dir, name)
+            try:
+                with open(path, 'rb') as f:
+                    batch = json.loads(zlib.decompress(f.read()))
+            except (OSError, ValueError, zlib.error) as e:
+                logger.error(f"Lote de telemetría ilegible {name}: {e}")
+                self._discard(path)
+                continue
+            count = sum(len(entry['values']) for entry in batch)
+            if not self._publish(batch, count):
+                return
+            self._discard(path)
+
+    def _discard(self, path):
+        """Saca un lote de la cola: lo borra o, si no se puede, lo aparta en cuarentena"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"No se pudo borrar el lote {path}: {e}")
+            with contextlib.suppress(OSError):
+                os.replace(path, path + QUARANTINE_SUFFIX)
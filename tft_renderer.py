@@ -0,0 +1,353 @@
+"""
+Renderizado de la pantalla TFT con actualización parcial por rectángulos sucios
+
+Cada página tiene un fondo estático cacheado ya en RGB565. En cada refresco se
+compone el fotograma sobre ese fondo copiando glifos del atlas, se compara por
+bloques con el anterior y solo las regiones que cambian se envían por SPI.
+"""
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from config import TFT_CONFIG, UI_COLORS
+from logger_config import logger
+from glyph_atlas import GlyphAtlas, rgb_to_rgb565
+from climate_bands import classifier
+
+# Filas de la página de estadísticas: 24 h móviles y agregados de 7/30 días (máx/mín)
+STATS_ROWS = ("Máx 24h", "Mín 24h", "Media", "Variación", "7 días", "30 días")
+
+# Zona de la gráfica de temperatura (x0, y0, x1, y1)
+HISTORY_BOX = (12, 200, 308, 231)
+
+# Minigráficas de la página de estadísticas: (medida, rango fijo o None = autoescala)
+SPARKLINES = (('cpu_usage', (0, 100)), ('ram_usage', (0, 100)), ('cpu_temp', None), ('wifi_signal', (0, 100)))
+SPARKLINE_X = (168, 307)
+SPARKLINE_HEIGHT = 14
+
+def rgb565_to_rgb(color):
+    """Convierte un color RGB565 de UI_COLORS a tupla RGB888 para PIL"""
+    r = (color >> 11) & 0x1F
+    g = (color >> 5) & 0x3F
+    b = color & 0x1F
+    return (r * 255 // 31, g * 255 // 63, b * 255 // 31)
+
+def find_dirty_rects(changed, tile):
+    """
+    Agrupa una máscara de bloques cambiados en rectángulos (x, y, ancho, alto).
+
+    Une primero los bloques contiguos de cada fila y después las franjas con
+    la misma extensión horizontal en filas consecutivas. Las franjas salen de
+    una sola pasada vectorizada; el bucle en Python solo recorre franjas.
+    """
+    edges = np.zeros((changed.shape[0], changed.shape[1] + 2), dtype=np.int8)
+    edges[:, 1:-1] = changed
+    edges = np.diff(edges, axis=1)
+    span_rows, starts = np.nonzero(edges == 1)
+    ends = np.nonzero(edges == -1)[1] - 1
+
+    rows = {}
+    for row, start, end in zip(span_rows.tolist(), starts.tolist(), ends.tolist()):
+        rows.setdefault(row, []).append((start, end))
+
+    rects = []
+    open_spans = {}
+    last_row = None
+    for row, spans in rows.items():
+        if last_row is not None and row != last_row + 1:
+            _close_spans(rects, open_spans, last_row + 1, tile)
+            open_spans = {}
+        next_open = {span: open_spans.pop(span, row) for span in spans}
+        _close_spans(rects, open_spans, row, tile)
+        open_spans = next_open
+        last_row = row
+    if open_spans:
+        _close_spans(rects, open_spans, last_row + 1, tile)
+    return rects
+
+def _close_spans(rects, spans, row, tile):
+    for (start, end), start_row in spans.items():
+        rects.append((start * tile, start_row * tile, (end - start + 1) * tile, (row - start_row) * tile))
+
+def _clock_label(now):
+    """Hora HH:MM de la cabecera a partir de un timestamp (None = hora real)"""
+    return time.strftime('%H:%M', time.localtime(now))
+
+class DashboardRenderer:
+    def __init__(self, blit, width=None, height=None):
+        self.blit = blit
+        self.width = width or TFT_CONFIG['width']
+        self.height = height or TFT_CONFIG['height']
+        self.tile = TFT_CONFIG['tile_size']
+        if self.tile <= 0:
+            raise ValueError(f"tile_size debe ser positivo: {self.tile}")
+        self.full_refresh_ratio = TFT_CONFIG['full_refresh_ratio']
+
+        self.colors = {name: rgb565_to_rgb(value) for name, value in UI_COLORS.items()}
+        self.fonts = {size: self._load_font(size) for size in TFT_CONFIG['font_sizes'].values()}
+        self.atlas = GlyphAtlas(self.fonts)
+        self._backgrounds = {}
+        self._history_cache = None
+
+        # Doble búfer: `_front` es lo que muestra el panel y `_back` el fotograma en composición
+        self._front = np.zeros((self.height, self.width), dtype=np.uint16)
+        self._back = np.zeros((self.height, self.width), dtype=np.uint16)
+        self._front_valid = False
+        # Máscara de píxeles cambiados redondeada a bloques completos: el margen
+        # (si el panel no es múltiplo de tile_size) se queda a cero para siempre
+        self._tiles_y = -(-self.height // self.tile)
+        self._tiles_x = -(-self.width // self.tile)
+        self._changed = np.zeros((self._tiles_y * self.tile, self._tiles_x * self.tile), dtype=np.uint8)
+
+        self.last_frame_stats = None
+        self.total_bytes = 0
+        self.frames = 0
+
+    def _load_font(self, size):
+        try:
+            return ImageFont.truetype(TFT_CONFIG['font_path'], size)
+        except OSError:
+            logger.warning(f"Fuente {TFT_CONFIG['font_path']} no disponible, usando la de PIL")
+            return ImageFont.load_default()
+
+    def _font(self, name):
+        return self.fonts[TFT_CONFIG['font_sizes'][name]]
+
+    # --- Fondos estáticos -------------------------------------------------
+
+    def _background(self, page):
+        """Devuelve el fondo estático RGB565 de una página, dibujándolo solo la primera vez"""
+        background = self._backgrounds.get(page)
+        if background is None:
+            background = Image.new('RGB', (self.width, self.height), self.colors['background'])
+            draw = ImageDraw.Draw(background)
+            if page == 'main':
+                self._draw_main_background(draw)
+            else:
+                self._draw_stats_background(draw)
+            background = rgb_to_rgb565(np.asarray(background))
+            self._backgrounds[page] = background
+        return background
+
+    def _panel(self, draw, box, title):
+        draw.rounded_rectangle(box, radius=6, outline=self.colors['primary'], width=1)
+        draw.text((box[0] + 6, box[1] + 4), title, font=self._font('small'), fill=self.colors['text_secondary'])
+
+    def _draw_main_background(self, draw):
+        draw.rectangle((0, 0, self.width - 1, 25), fill=self.colors['primary'])
+        draw.text((6, 5), "ESTACIÓN METEOROLÓGICA", font=self._font('small'), fill=self.colors['text'])
+        self._panel(draw, (4, 30, 210, 176), "EXTERIOR")
+        self._panel(draw, (214, 30, 315, 176), "INTERIOR")
+        self._panel(draw, (4, 180, 315, 235), "ÚLTIMAS 24 H")
+        draw.text((10, 128), "HUMEDAD", font=self._font('small'), fill=self.colors['text_secondary'])
+        draw.text((110, 128), "PRESIÓN", font=self._font('small'), fill=self.colors['text_secondary'])
+        draw.text((220, 128), "PRESIÓN", font=self._font('small'), fill=self.colors['text_secondary'])
+        draw.text((12, 102), "Sensación", font=self._font('small'), fill=self.colors['text_secondary'])
+
+    def _draw_stats_background(self, draw):
+        draw.rectangle((0, 0, self.width - 1, 25), fill=self.colors['accent'])
+        draw.text((6, 5), "ESTADÍSTICAS", font=self._font('small'), fill=self.colors['text'])
+        self._panel(draw, (4, 30, 156, 235), "TEMPERATURA")
+        self._panel(draw, (160, 30, 315, 235), "SISTEMA")
+        for i, label in enumerate(STATS_ROWS):
+            draw.text((12, 54 + i * 30), label, font=self._font('small'), fill=self.colors['text_secondary'])
+        for i, label in enumerate(("CPU", "RAM", "Temp. CPU", "WiFi", "Activo")):
+            draw.text((168, 52 + i * 36), label, font=self._font('small'), fill=self.colors['text_secondary'])
+
+    # --- Composición de páginas -------------------------------------------
+
+    def _begin_frame(self, page):
+        """Prepara el búfer trasero con el fondo de la página"""
+        np.copyto(self._back, self._background(page))
+        return self._back
+
+    def _text(self, frame, x, y, text, size, fg, bg=None, align='left'):
+        """Compone un número o valor con glifos del atlas"""
+        bg = bg or self.colors['background']
+        self.atlas.draw_text(frame, x, y, text, TFT_CONFIG['font_sizes'][size], fg, bg, align)
+
+    def _label(self, frame, x, y, text, size, fg, bg=None, align='left'):
+        """Copia una etiqueta completa del atlas"""
+        bg = bg or self.colors['background']
+        self.atlas.draw_label(frame, x, y, text, TFT_CONFIG['font_sizes'][size], fg, bg, align)
+
+    def render_main(self, data_store, status, status_color, history=None, now=None):
+        """
+        Compone y envía la página principal; devuelve las métricas del fotograma.
+        `now` es la hora del reloj de la estación (None = hora real).
+        """
+        start = time.perf_counter()
+        frame = self._begin_frame('main')
+        text = self.colors['text']
+        secondary = self.colors['text_secondary']
+
+        self._text(frame, self.width - 6, 5, _clock_label(now), 'small', text, self.colors['primary'], 'right')
+
+        ext_temp = data_store.get('exterior_temp')
+        online = data_store.get('exterior_online')
+        temp_label = f"{ext_temp:.1f}°" if ext_temp is not None else "--.-°"
+        self._text(frame, 12, 50, temp_label, 'large', text if online else secondary)
+        self._text(frame, 96, 102, f"{data_store.get('exterior_feels_like', 0):.1f}°", 'small', secondary)
+        self._label(frame, 202, 34, status, 'small', status_color, align='right')
+        if online:
+            self._label(frame, 202, 100, "ONLINE", 'small', self.colors['success'], align='right')
+        else:
+            self._label(frame, 202, 100, "OFFLINE", 'small', self.colors['danger'], align='right')
+        self._text(frame, 10, 146, f"{data_store.get('exterior_humidity', 0):.0f}%", 'medium', text)
+        self._text(frame, 110, 146, f"{data_store.get('exterior_pressure', 0):.0f}", 'medium', text)
+
+        self._text(frame, 220, 56, f"{data_store.get('interior_temp', 0):.1f}°", 'medium', text)
+        self._text(frame, 220, 90, f"{data_store.get('interior_humidity', 0):.0f}%", 'small', text)
+        self._text(frame, 220, 146, f"{data_store.get('interior_pressure', 0):.0f}", 'medium', text)
+
+        x0, y0, x1, y1 = HISTORY_BOX
+        if history is None:
+            history = data_store.get('temp_history')
+        frame[y0:y1, x0:x1] = self._history_block(history)
+        return self._present(frame, start)
+
+    def _history_block(self, history):
+        """Devuelve la gráfica de temperatura exterior, redibujándola solo si cambia el historial"""
+        key = getattr(history, 'key', None)
+        if key is not None:
+            # HistoryView: se compara sin copiar y solo se materializa si cambió
+            if self._history_cache is not None and self._history_cache[0] == key:
+                return self._history_cache[1]
+            items = history.materialize()
+        else:
+            items = list(history) if history else []
+            key = (len(items), items[-1] if items else None)
+            if self._history_cache is not None and self._history_cache[0] == key:
+                return self._history_cache[1]
+
+        x0, y0, x1, y1 = HISTORY_BOX
+        width, height = x1 - x0, y1 - y0
+        block = np.full((height, width), UI_COLORS['background'], dtype=np.uint16)
+
+        values = np.fromiter((value for _, value in items), dtype=np.float64, count=len(items))
+        if len(values) >= 2:
+            # Reducir a un punto por columna de píxeles
+            if len(values) > width:
+                values = values[np.linspace(0, len(values) - 1, width).astype(np.int32)]
+            low, high = float(values.min()), float(values.max())
+            span = max(high - low, 1.0)
+            columns = np.linspace(0, width - 1, len(values)).astype(np.int32)
+            ys = np.rint((height - 1) - (values - low) / span * (height - 1)).astype(np.int32)
+
+            # Cada columna se pinta desde el punto anterior hasta el actual, con el color de su banda
+            previous = np.concatenate(([ys[0]], ys[:-1]))
+            top, bottom = np.minimum(previous, ys), np.maximum(previous, ys)
+            rows = np.arange(height)[:, None]
+            mask = (rows >= top[None, :]) & (rows <= bottom[None, :])
+            colors = classifier.colors565(values)
+            block[:, columns] = np.where(mask, colors[None, :], block[:, columns])
+
+        self._history_cache = (key, block)
+        return block
+
+    def render_stats(self, stats_data, system_info, now=None):
+        """Compone y envía la página de estadísticas; devuelve las métricas del fotograma"""
+        start = time.perf_counter()
+        frame = self._begin_frame('stats')
+        text = self.colors['text']
+
+        self._text(frame, self.width - 6, 5, _clock_label(now), 'small', text, self.colors['accent'], 'right')
+        values = (stats_data['day_max'], stats_data['day_min'], stats_data['day_avg'], stats_data['variation'])
+        for i, value in enumerate(values):
+            self._text(frame, 150, 50 + i * 30, f"{value:.1f}°", 'medium', text, align='right')
+        for i, period in enumerate(('week', 'month')):
+            high, low = stats_data.get(f'{period}_max'), stats_data.get(f'{period}_min')
+            label = f"{high:.0f}/{low:.0f}°" if high is not None and low is not None else "--/--°"
+            self._text(frame, 150, 54 + (4 + i) * 30, label, 'small', text, align='right')
+
+        wifi = system_info['wifi_signal']
+        cpu_temp = system_info['cpu_temp']
+        rows = (
+            f"{system_info['cpu_usage']:.0f}%",
+            f"{system_info['ram_usage']:.0f}%",
+            f"{cpu_temp:.1f}°" if cpu_temp is not None else "--°",
+            f"{wifi}%" if wifi is not None else "--%",
+            system_info['uptime']
+        )
+        for i, value in enumerate(rows):
+            self._text(frame, 307, 52 + i * 36, value, 'small', text, align='right')
+
+        history = system_info.get('history') or {}
+        color = np.uint16(UI_COLORS['primary'])
+        for i, (name, value_range) in enumerate(SPARKLINES):
+            y0 = 70 + i * 36
+            self._sparkline(frame, y0, history.get(name), color, value_range)
+        return self._present(frame, start)
+
+    def _sparkline(self, frame, y0, values, color, value_range=None):
+        """Dibuja una minigráfica de una fila del panel de sistema, con lo más reciente a la derecha"""
+        if not values or len(values) < 2:
+            return
+        x0, x1 = SPARKLINE_X
+        width, height = x1 - x0, SPARKLINE_HEIGHT
+        values = np.asarray(values[-width:], dtype=np.float64)
+        low, high = value_range or (float(values.min()), float(values.max()))
+        span = max(high - low, 1.0)
+        ys = np.clip(np.rint((height - 1) - (values - low) / span * (height - 1)), 0, height - 1).astype(np.int32)
+        # Un muestreo cada dos píxeles como mucho, alineado a la derecha
+        step = max(1, min(width // len(values), 2))
+        columns = x1 - 1 - step * np.arange(len(values))[::-1]
+
+        previous = np.concatenate(([ys[0]], ys[:-1]))
+        top, bottom = np.minimum(previous, ys), np.maximum(previous, ys)
+        rows = np.arange(height)[:, None]
+        mask = (rows >= top[None, :]) & (rows <= bottom[None, :])
+        block = frame[y0:y0 + height, columns]
+        frame[y0:y0 + height, columns] = np.where(mask, color, block)
+
+    # --- Envío a la pantalla ----------------------------------------------
+
+    def invalidate(self):
+        """Fuerza un refresco completo en el siguiente fotograma"""
+        self._front_valid = False
+
+    def _dirty_tiles(self, frame):
+        """Máscara (bloques_y, bloques_x) de los bloques que difieren del fotograma frontal"""
+        tile = self.tile
+        np.not_equal(frame, self._front, out=self._changed[:self.height, :self.width].view(bool))
+        # OR por bloques sobre uint8: reducciones contiguas, mucho más baratas que any() en 4D
+        rows = np.bitwise_or.reduce(self._changed.reshape(self._tiles_y, tile, -1), axis=1)
+        return np.bitwise_or.reduce(rows.reshape(self._tiles_y, self._tiles_x, tile), axis=2).view(bool)
+
+    def _present(self, frame, start):
+        """Calcula los rectángulos sucios y envía solo esas regiones"""
+        full = [(0, 0, self.width, self.height)]
+        if not self._front_valid:
+            rects = full
+        else:
+            changed = self._dirty_tiles(frame)
+            if np.count_nonzero(changed) >= self.full_refresh_ratio * changed.size:
+                # Casi todo cambia: un único envío evita el coste por rectángulo
+                rects = full
+            else:
+                rects = find_dirty_rects(changed, self.tile)
+        render_done = time.perf_counter()
+
+        sent = 0
+        for x, y, w, h in rects:
+            # Los bloques del borde pueden salirse del panel: el corte los ajusta
+            region = frame[y:y + h, x:x + w]
+            self.blit(x, y, region)
+            sent += region.nbytes
+
+        # Intercambio de búferes: lo recién enviado pasa a ser el frontal
+        self._front, self._back = self._back, self._front
+        self._front_valid = True
+
+        end = time.perf_counter()
+        self.frames += 1
+        self.total_bytes += sent
+        self.last_frame_stats = {
+            'rects': len(rects),
+            'bytes': sent,
+            'render_ms': (render_done - start) * 1000,
+            'transfer_ms': (end - render_done) * 1000,
+            'frame_ms': (end - start) * 1000
+        }
+        return self.last_frame_stats
@@ -0,0 +1,302 @@
+"""
+Almacén persistente de series temporales para tarjeta SD
+
+Cada lectura se guarda como un registro binario de tamaño fijo en un
+segmento diario de solo-anexado. Las escrituras se agrupan en memoria y se
+vuelcan con un único fsync, y cada variable se limita a una muestra por
+intervalo para acotar el desgaste de la tarjeta.
+
+Todas las referencias a "ahora" (lectura sin fecha, retención, rango por
+defecto y recuperación al arrancar) salen del reloj de la estación, así que
+con un SimulatedClock el almacén envejece y poda al ritmo de la simulación.
+
+Con read_only=True solo se mantiene el historial reciente en memoria: lo usa
+el proceso de pantalla del modo multiproceso, donde escribe otro proceso.
+"""
+import os
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from clock import SYSTEM_CLOCK
+from config import STORAGE_CONFIG
+from logger_config import logger
+
+# timestamp (f64), valor (f32), id de variable (u16), marca de validez (u16)
+RECORD = struct.Struct('<dfHH')
+RECORD_DTYPE = np.dtype([('ts', '<f8'), ('value', '<f4'), ('var', '<u2'), ('marker', '<u2')])
+RECORD_MARKER = 0xA55A
+
+SEGMENT_PREFIX = 'series-'
+SEGMENT_SUFFIX = '.bin'
+
+class HistoryView:
+    """
+    Vista inmutable y O(1) del historial reciente de una variable, para guardar
+    en una instantánea de estado: referencia al deque vivo más la última
+    muestra en el momento de crearla. materialize() copia el deque y lo corta
+    en esa muestra, así que nunca adelanta al valor publicado junto a la vista.
+    """
+    __slots__ = ('_samples', 'last')
+
+    def __init__(self, samples, last):
+        object.__setattr__(self, '_samples', samples)
+        object.__setattr__(self, 'last', last)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("HistoryView es inmutable")
+
+    @property
+    def key(self):
+        """Identifica el contenido sin copiarlo (cambia con cada muestra nueva)"""
+        return self.last
+
+    def materialize(self):
+        """Tupla (timestamp, valor) hasta la última muestra de la vista"""
+        # Copia del deque en una sola llamada en C: el hilo escritor no la interrumpe
+        items = tuple(self._samples)
+        last = self.last
+        if last is None or (items and items[-1] == last):
+            return items
+        # El escritor añadió o sustituyó muestras después: se descartan
+        end = len(items)
+        while end and items[end - 1][0] >= last[0]:
+            end -= 1
+        return items[:end] + (last,)
+
+    def __iter__(self):
+        return iter(self.materialize())
+
+    def __bool__(self):
+        return self.last is not None
+
+class TimeSeriesStore:
+    def __init__(self, data_dir=None, variables=None, read_only=False, clock=None):
+        self.clock = clock or SYSTEM_CLOCK
+        self.data_dir = data_dir or STORAGE_CONFIG['data_dir']
+        self.variables = variables or STORAGE_CONFIG['variables']
+        self.min_interval = STORAGE_CONFIG['min_interval']
+        self.history_seconds = STORAGE_CONFIG['history_hours'] * 3600
+        self.retention_days = STORAGE_CONFIG['retention_days']
+        self.max_batch = STORAGE_CONFIG['max_batch']
+        self.read_only = read_only
+
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._buffer = []
+        self._buffer_index = {}
+        self._last_slot = {}
+        self._segment_day = None
+        self._segment_file = None
+
+        # Historial reciente en memoria: deque de (timestamp, valor) por variable
+        history_len = int(self.history_seconds // self.min_interval) + 1
+        self._recent = {name: deque(maxlen=history_len) for name in self.variables}
+
+        self.records_written = 0
+        self.fsync_count = 0
+        self.enabled = True
+        if read_only:
+            return
+        try:
+            os.makedirs(self.data_dir, exist_ok=True)
+        except OSError as e:
+            logger.error(f"Error creando directorio de datos {self.data_dir}: {e}")
+            self.enabled = False
+
+    def recent(self, name):
+        """Devuelve el deque (timestamp, valor) de las últimas horas de una variable"""
+        return self._recent[name]
+
+    def view(self, name):
+        """HistoryView del historial actual (llamar desde el hilo que hace append)"""
+        history = self._recent[name]
+        return HistoryView(history, history[-1] if history else None)
+
+    def append(self, name, value, timestamp=None):
+        """Añade una lectura; dentro del mismo intervalo mínimo sustituye a la anterior"""
+        var_id = self.variables.get(name)
+        if var_id is None:
+            return
+        if timestamp is None:
+            timestamp = self.clock.time()
+        value = float(value)
+        slot = int(timestamp // self.min_interval)
+        history = self._recent[name]
+
+        with self._lock:
+            same_slot = self._last_slot.get(name) == slot
+            self._last_slot[name] = slot
+            if same_slot and history:
+                history[-1] = (timestamp, value)
+            else:
+                history.append((timestamp, value))
+            cutoff = timestamp - self.history_seconds
+            while history and history[0][0] < cutoff:
+                history.popleft()
+            if self.read_only:
+                return
+
+            record = (timestamp, value, var_id)
+            if same_slot and name in self._buffer_index:
+                self._buffer[self._buffer_index[name]] = record
+            else:
+                self._buffer_index[name] = len(self._buffer)
+                self._buffer.append(record)
+            pending = len(self._buffer)
+
+        if pending >= self.max_batch:
+            self.flush()
+
+    def flush(self):
+        """Vuelca las lecturas pendientes al segmento del día con un único fsync"""
+        with self._lock:
+            if not self._buffer:
+                return 0
+            batch = self._buffer
+            self._buffer = []
+            self._buffer_index = {}
+
+        if not self.enabled:
+            return 0
+
+        with self._io_lock:
+            try:
+                written = 0
+                chunk = []
+                for timestamp, value, var_id in batch:
+                    day = self._day_key(timestamp)
+                    if day != self._segment_day:
+                        written += self._write_chunk(chunk)
+                        chunk = []
+                        self._open_segment(day)
+                    chunk.append(RECORD.pack(timestamp, value, var_id, RECORD_MARKER))
+                written += self._write_chunk(chunk)
+                self.records_written += written
+                return written
+            except OSError as e:
+                logger.error(f"Error escribiendo series temporales: {e}")
+                return 0
+
+    def _write_chunk(self, chunk):
+        if not chunk or self._segment_file is None:
+            return 0
+        self._segment_file.write(b''.join(chunk))
+        self._segment_file.flush()
+        os.fsync(self._segment_file.fileno())
+        self.fsync_count += 1
+        return len(chunk)
+
+    def _day_key(self, timestamp):
+        return time.strftime('%Y%m%d', time.gmtime(timestamp))
+
+    def _segment_path(self, day):
+        return os.path.join(self.data_dir, f"{SEGMENT_PREFIX}{day}{SEGMENT_SUFFIX}")
+
+    def _open_segment(self, day):
+        """Abre (o crea) el segmento del día descartando un registro final incompleto"""
+        if self._segment_file:
+            self._segment_file.close()
+        path = self._segment_path(day)
+        created = not os.path.exists(path)
+        self._segment_file = open(path, 'ab')
+        size = self._segment_file.tell()
+        if size % RECORD.size:
+            self._segment_file.truncate(size - size % RECORD.size)
+            self._segment_file.seek(0, os.SEEK_END)
+            logger.warning(f"Registro incompleto descartado en {path}")
+        if created:
+            self._fsync_dir()
+            self._prune_segments()
+        self._segment_day = day
+
+    def _fsync_dir(self):
+        try:
+            fd = os.open(self.data_dir, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+
+    def _list_segments(self):
+        try:
+            names = os.listdir(self.data_dir)
+        except OSError:
+            return []
+        return sorted(
+            name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]
+            for name in names
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _prune_segments(self):
+        """Elimina los segmentos más antiguos que el periodo de retención"""
+        oldest = self._day_key(self.clock.time() - self.retention_days * 86400)
+        for day in self._list_segments():
+            if day < oldest:
+                try:
+                    os.remove(self._segment_path(day))
+                except OSError as e:
+                    logger.error(f"Error eliminando segmento {day}: {e}")
+
+    def read_range(self, since, until=None):
+        """Devuelve un array estructurado con los registros válidos entre dos instantes"""
+        until = until if until is not None else self.clock.time()
+        first, last = self._day_key(since), self._day_key(until)
+        arrays = []
+        for day in self._list_segments():
+            if first <= day <= last:
+                arrays.append(self._load_segment(self._segment_path(day)))
+        if not arrays:
+            return np.empty(0, dtype=RECORD_DTYPE)
+        records = np.concatenate(arrays)
+        mask = (records['ts'] >= since) & (records['ts'] <= until)
+        return records[mask]
+
+    def _load_segment(self, path):
+        try:
+            count = os.path.getsize(path) // RECORD.size
+            records = np.fromfile(path, dtype=RECORD_DTYPE, count=count)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error leyendo segmento {path}: {e}")
+            return np.empty(0, dtype=RECORD_DTYPE)
+        # Bloques sin escribir tras un corte de corriente quedan sin marca
+        return records[records['marker'] == RECORD_MARKER]
+
+    def warm_start(self):
+        """Recarga en memoria el historial de las últimas horas desde disco"""
+        if not self.enabled:
+            return 0
+        start = time.perf_counter()
+        now = self.clock.time()
+        records = self.read_range(now - self.history_seconds, now)
+        records = records[np.argsort(records['ts'], kind='stable')]
+
+        loaded = 0
+        with self._lock:
+            for name, var_id in self.variables.items():
+                selected = records[records['var'] == var_id]
+                history = self._recent[name]
+                history.clear()
+                history.extend(zip(selected['ts'].tolist(), selected['value'].tolist()))
+                if len(selected):
+                    self._last_slot[name] = int(selected['ts'][-1] // self.min_interval)
+                loaded += len(selected)
+
+        elapsed = (time.perf_counter() - start) * 1000
+        logger.info(f"💾 Historial recuperado: {loaded} lecturas en {elapsed:.1f} ms")
+        return loaded
+
+    def close(self):
+        """Vuelca lo pendiente y cierra el segmento abierto"""
+        self.flush()
+        with self._io_lock:
+            if self._segment_file:
+                self._segment_file.close()
+                self._segment_file = None
+                self._segment_day = None
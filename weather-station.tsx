@@ -26,6 +26,36 @@ interface WeatherData {
   }>
 }
 
+// API en vivo de la estación (live_api.py), p. ej. http://estacion.local:8080; sin ella se simulan los datos
+const STATION_URL = process.env.NEXT_PUBLIC_STATION_URL
+
+type LiveData = Record<string, any>
+
+// Agrupa el historial de la estación en las 24 últimas horas (media, mínimo y máximo por hora)
+const hourlyFromHistory = (t: number[], v: number[]) => {
+  const end = t[t.length - 1]
+  const buckets = Array.from({ length: 24 }, () => ({ sum: 0, count: 0, min: Infinity, max: -Infinity }))
+  for (let i = 0; i < t.length; i++) {
+    const slot = 23 - Math.floor((end - t[i]) / 3600)
+    if (slot < 0 || v[i] === null) continue
+    const bucket = buckets[slot]
+    bucket.sum += v[i]
+    bucket.count += 1
+    bucket.min = Math.min(bucket.min, v[i])
+    bucket.max = Math.max(bucket.max, v[i])
+  }
+  const firstHour = new Date((end - 23 * 3600) * 1000).getHours()
+  const history: number[] = []
+  const stats: WeatherData["hourlyStats"] = []
+  buckets.forEach((bucket, slot) => {
+    if (!bucket.count) return
+    const avg = bucket.sum / bucket.count
+    history.push(avg)
+    stats.push({ hour: (firstHour + slot) % 24, min: bucket.min, max: bucket.max, avg })
+  })
+  return { history, stats }
+}
+
 interface SystemInfo {
   cpuTemp: number
   cpuUsage: number
@@ -74,6 +104,9 @@ export default function WeatherStation() {
     wifiSignal: 85,
   })
 
+  const liveRef = useRef<LiveData>({})
+  const liveHistoryRef = useRef<{ t: number[]; v: number[] }>({ t: [], v: [] })
+
   // Generar estadísticas por hora
   const generateHourlyStats = () => {
     const stats = []
@@ -458,6 +491,56 @@ export default function WeatherStation() {
     }))
   }
 
+  // Aplica la instantánea o un delta de la API en vivo
+  const applyLiveData = (changes: LiveData) => {
+    const live = { ...liveRef.current, ...changes }
+    liveRef.current = live
+    setWeatherData((prev) => ({
+      ...prev,
+      interior: {
+        temperature: live.interior_temp,
+        humidity: live.interior_humidity,
+        tempTrend: calculateTrend(live.interior_temp, prev.interior.temperature),
+      },
+      exterior: {
+        temperature: live.exterior_temp,
+        humidity: live.exterior_humidity,
+        pressure: live.exterior_pressure,
+        feelsLike: live.exterior_feels_like,
+        isOnline: live.exterior_online,
+        tempTrend: calculateTrend(live.exterior_temp, prev.exterior.temperature),
+      },
+    }))
+    if (live.system) {
+      setSystemInfo({
+        cpuTemp: live.system.cpu_temp ?? 0,
+        cpuUsage: live.system.cpu_usage ?? 0,
+        ramUsage: live.system.ram_usage ?? 0,
+        uptime: live.system.uptime ?? "",
+        wifiSignal: live.system.wifi_signal ?? 0,
+      })
+    }
+    setTempAlarm((live.alerts ?? []).length > 0)
+  }
+
+  // Añade puntos (timestamp, valor) al historial en vivo y recalcula la gráfica de 24 h
+  const applyLiveHistory = (points: Array<[number, number]>) => {
+    const { t, v } = liveHistoryRef.current
+    for (const [ts, value] of points) {
+      if (t.length === 0 || ts > t[t.length - 1]) {
+        t.push(ts)
+        v.push(value)
+      }
+    }
+    if (!t.length) return
+    const cutoff = t[t.length - 1] - 86400
+    const first = t.findIndex((ts) => ts >= cutoff)
+    t.splice(0, first)
+    v.splice(0, first)
+    const { history, stats } = hourlyFromHistory(t, v)
+    setWeatherData((prev) => ({ ...prev, temperatureHistory: history, hourlyStats: stats }))
+  }
+
   const updateTemperatureHistory = () => {
     setWeatherData((prev) => {
       const newHistory = [...prev.temperatureHistory]
@@ -479,8 +562,9 @@ export default function WeatherStation() {
 
     const timeInterval = setInterval(updateTime, 1000)
     const blinkInterval = setInterval(() => setBlink((prev) => !prev), 1000)
-    const dataInterval = setInterval(simulateDataChanges, 5000)
-    const chartInterval = setInterval(updateTemperatureHistory, 30000)
+    // Con la API en vivo los datos llegan por WebSocket y no se simulan
+    const dataInterval = STATION_URL ? undefined : setInterval(simulateDataChanges, 5000)
+    const chartInterval = STATION_URL ? undefined : setInterval(updateTemperatureHistory, 30000)
 
     return () => {
       clearInterval(timeInterval)
@@ -490,6 +574,41 @@ export default function WeatherStation() {
     }
   }, [])
 
+  // Conexión a la API en vivo: historial por HTTP (con ETag) y cambios por WebSocket
+  useEffect(() => {
+    if (!STATION_URL) return
+    let socket: WebSocket | null = null
+    let retry: ReturnType<typeof setTimeout> | undefined
+    let closed = false
+
+    const connect = () => {
+      fetch(`${STATION_URL}/api/history?variable=exterior_temp`)
+        .then((response) => response.json())
+        .then((history) => applyLiveHistory(history.t.map((ts: number, i: number) => [ts, history.v[i]])))
+        .catch(() => {})
+      socket = new WebSocket(`${STATION_URL.replace(/^http/, "ws")}/ws`)
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data)
+        if (message.type === "snapshot") {
+          applyLiveData(message.data)
+          return
+        }
+        if (message.changes) applyLiveData(message.changes)
+        if (message.history?.exterior_temp) applyLiveHistory(message.history.exterior_temp)
+      }
+      socket.onclose = () => {
+        if (!closed) retry = setTimeout(connect, 5000)
+      }
+    }
+
+    connect()
+    return () => {
+      closed = true
+      clearTimeout(retry)
+      socket?.close()
+    }
+  }, [])
+
   useEffect(() => {
     if (currentPage === "main") {
       drawTemperatureChart()